@@ -0,0 +1,140 @@
+"""
+Benchmark: cross-course questions through the local Canvas mirror.
+
+Runs the REST transport against the fake Canvas server (C courses x A
+assignments, per-request latency) and answers "which assignments are due
+this week across all my courses":
+- fan-out: get_canvas_courses + get_course_assignments per course (what the
+  executor did before), 4 calls at a time, results filtered by due date
+- mirror cold: get_assignments_due on an empty mirror (syncs courses and
+  assignments once)
+- mirror warm: the same question again (one SQL query)
+Then checks incremental behavior:
+- refresh after the TTL with one assignment renamed: one row rewritten
+- create_canvas_assignment through the agent tool: only that course's
+  assignments are re-synced by the next question
+Verifies the mirror's answer matches the fake data set.
+
+Usage:
+    python benchmarks/bench_canvas_mirror.py --courses 25 --assignments 15 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_canvas import FakeCanvasData, FakeCanvasServer  # noqa: E402
+
+WEEK = ("2024-10-07T00:00:00Z", "2024-10-14T00:00:00Z")
+
+
+def expected_due(data: FakeCanvasData):
+    return sorted(a["id"] for c in data.courses for a in data.assignments(c["id"])
+                  if WEEK[0] <= a["due_at"] < WEEK[1])
+
+
+async def fan_out(tools) -> int:
+    """The per-course path: list courses, then each course's assignments; returns chars sent to the LLM."""
+    semaphore = asyncio.Semaphore(4)
+    courses = json.loads(await tools.run_mcp_tool("canvas_list_courses", {"include_ended": False}, project=False))
+
+    async def course_assignments(course):
+        async with semaphore:
+            return await tools.get_course_assignments.ainvoke({"course_id": str(course["id"])})
+
+    return sum(len(text) for text in await asyncio.gather(*(course_assignments(c) for c in courses)))
+
+
+def due_ids(output: str):
+    lines = output.splitlines()
+    header = lines[0].split(" | ")
+    column = header.index("assignment_id")
+    return sorted(int(line.split(" | ")[column]) for line in lines[1:] if " | " in line)
+
+
+async def main(args):
+    from src import server  # noqa: F401  (initializes tracing like the API process)
+    from src.agents import tools
+    from src.memory.canvas_mirror import canvas_mirror
+    from src.tools import canvas_transport
+    from src.tools.canvas_transport import RestTransport
+
+    data = FakeCanvasData(courses=args.courses, assignments_per_course=args.assignments)
+    failures = 0
+    with FakeCanvasServer(data, latency_ms=args.latency_ms) as canvas:
+        canvas_transport.set_transport(RestTransport(base_url=canvas.base_url, token="bench-token"))
+        expected = expected_due(data)
+        question = {"start_date": WEEK[0], "end_date": WEEK[1]}
+        print(f"{args.courses} courses x {args.assignments} assignments, {args.latency_ms:.0f}ms per Canvas request, "
+              f"{len(expected)} assignments due in the week")
+
+        # Fan-out (runs before the mirror is opened, so its listings are not ingested)
+        before = data.request_count
+        start = time.perf_counter()
+        chars = await fan_out(tools)
+        print(f"  fan-out      {(time.perf_counter() - start) * 1000:8.1f}ms  {data.request_count - before:4d} Canvas "
+              f"requests  {args.courses + 1:3d} tool calls  {chars:7d} chars to the LLM")
+
+        for label in ("mirror cold", "mirror warm"):
+            before = data.request_count
+            start = time.perf_counter()
+            output = await tools.get_assignments_due.ainvoke(question)
+            ok = due_ids(output) == expected
+            failures += not ok
+            print(f"  {label:<12} {(time.perf_counter() - start) * 1000:8.1f}ms  {data.request_count - before:4d} "
+                  f"Canvas requests    1 tool call   {len(output):7d} chars to the LLM  correct={ok}")
+
+        # Refresh after the TTL: one assignment changed upstream
+        original = data.assignments
+
+        def renamed(course_id):
+            rows = original(course_id)
+            if course_id == 1:
+                rows[0] = {**rows[0], "name": "Renamed essay", "updated_at": "2024-10-01T00:00:00Z"}
+            return rows
+
+        data.assignments = renamed
+        for key in list(canvas_mirror._synced):
+            canvas_mirror._synced[key] = 0.0
+        stats = dict(canvas_mirror.stats())
+        before = data.request_count
+        await canvas_mirror.ensure_fresh(("assignments",))
+        after = canvas_mirror.stats()
+        written = after["rows_written"] - stats["rows_written"]
+        print(f"  refresh      {data.request_count - before:4d} Canvas requests, rows written={written} "
+              f"unchanged={after['rows_unchanged'] - stats['rows_unchanged']}")
+        failures += written != 1
+
+        # A write through the agent re-syncs only the affected course
+        await tools.create_canvas_assignment.ainvoke({"course_id": "3", "assignment_name": "Lab"})
+        before = data.request_count
+        await tools.get_assignments_due.ainvoke(question)
+        resynced = data.request_count - before
+        print(f"  after write  {resynced:4d} Canvas request(s) for the next question (course 3 only)")
+        failures += resynced != 1
+
+    print(f"  mirror stats: {canvas_mirror.stats()}")
+    await canvas_mirror.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=25)
+    parser.add_argument("--assignments", type=int, default=15)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    os.environ["CANVAS_MIRROR_PATH"] = os.path.join(tempfile.mkdtemp(), "canvas_mirror.db")
+    os.environ["TOOL_CACHE_ENABLED"] = "false"
+    os.environ["MIRROR_SYNC_INTERVAL"] = "0"
+    os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+    os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+    asyncio.run(main(args))
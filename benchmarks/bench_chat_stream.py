@@ -0,0 +1,130 @@
+"""
+Benchmark: time to first feedback for /chat/stream vs. the buffered /chat.
+
+Runs the real app against a fake LLM that streams its reply word by word
+(--token-delay-ms per word) and reports, per endpoint, when the first byte
+and the first token reached the client and when the run completed. Then
+checks that disconnecting mid-stream cancels the in-flight graph run (no
+further LLM calls, no leftover tasks).
+
+Usage:
+    python benchmarks/bench_chat_stream.py --chats 5 --latency-ms 200 --token-delay-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+def long_reply(body):
+    """Supervisor routes to Content_Specialist, which writes a 60-word draft."""
+    from fake_llm import default_reply
+    reply = default_reply(body)
+    if reply.startswith("Draft for:"):
+        return reply + " " + " ".join(f"word{i}" for i in range(60))
+    return reply
+
+
+async def asgi_post(app, path: str, payload: dict, disconnect_after: float = None):
+    """POST straight into the ASGI app, timestamping each body chunk.
+
+    Returns (list of (seconds since start, chunk bytes), total seconds).
+    With disconnect_after, the client reports http.disconnect after that many
+    seconds (as a browser closing the EventSource would).
+    """
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json"),
+                                     (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1), "server": ("agent", 80),
+    }
+    chunks = []
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    start = time.perf_counter()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(max(0.0, disconnect_after - (time.perf_counter() - start)))
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append((time.perf_counter() - start, message["body"]))
+
+    await app(scope, receive, send)
+    return chunks, time.perf_counter() - start
+
+
+async def run(args, llm: FakeLLMServer):
+    from src import server
+    from src.agents import graph
+
+    graph.kw_client = None
+    server.telemetry = None
+
+    first_byte = {"/chat": [], "/chat/stream": []}
+    first_token = {"/chat": [], "/chat/stream": []}
+    total = {"/chat": [], "/chat/stream": []}
+
+    async with server.lifespan(server.api):
+        for i in range(args.chats):
+            for path in ("/chat", "/chat/stream"):
+                chunks, elapsed = await asgi_post(server.api, path, {
+                    "message": f"request {i}", "thread_id": f"t-{path}-{i}"
+                })
+                text = b"".join(c for _, c in chunks).decode()
+                assert "word59" in text, text[-300:]
+                first_byte[path].append(chunks[0][0])
+                token_at = next((t for t, c in chunks if b"event: token" in c), chunks[0][0])
+                first_token[path].append(token_at)
+                total[path].append(elapsed)
+
+        for path in ("/chat", "/chat/stream"):
+            print(f"{path:<13} first byte mean={statistics.mean(first_byte[path]) * 1000:8.1f}ms  "
+                  f"first token mean={statistics.mean(first_token[path]) * 1000:8.1f}ms  "
+                  f"complete mean={statistics.mean(total[path]) * 1000:8.1f}ms")
+
+        # Disconnect while the Content_Specialist is still producing tokens
+        server.CHAT_STREAM_HEARTBEAT = 0.05
+        calls_before = len(llm.requests)
+        tasks_before = len(asyncio.all_tasks())
+        chunks, elapsed = await asgi_post(server.api, "/chat/stream", {
+            "message": "disconnect me", "thread_id": "t-disconnect"
+        }, disconnect_after=args.latency_ms / 1000.0 * 1.5)
+        await asyncio.sleep(1.0)
+        text = b"".join(c for _, c in chunks).decode()
+        calls = len(llm.requests) - calls_before
+        leftover = len(asyncio.all_tasks()) - tasks_before
+        ok = "event: done" not in text and calls < 3 and leftover <= 0
+        print(f"disconnect    returned after {elapsed * 1000:.1f}ms, LLM calls={calls} (full run = 3), "
+              f"leftover tasks={leftover} -> {'ok' if ok else 'FAIL'}")
+        return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    args = parser.parse_args()
+    with FakeLLMServer(latency_ms=args.latency_ms, reply=long_reply, token_delay_ms=args.token_delay_ms) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        os.environ.setdefault("MCP_POOL_ENABLED", "false")
+        sys.exit(0 if asyncio.run(run(args, llm)) else 1)
@@ -0,0 +1,191 @@
+"""
+Benchmark: checkpoint store size with and without retention + blob offloading.
+
+Runs T threads x N turns through a graph with the agent's state and topology
+(supervisor -> Canvas_Executor -> supervisor -> FINISH per turn) on a SQLite
+checkpointer. Each executor hop adds a tool call with a large Canvas-sized
+result and an answer; the nodes build their prompt with the agent's
+history_window(), so turns that fall out of the window are folded into the
+running summary (on a fake LLM endpoint) and persisted in the state.
+- baseline: results inline, every checkpoint kept
+- maintained: results offloaded to the blob store, compaction after every
+  turn batch (CHECKPOINT_KEEP_LAST)
+Reports stored bytes, prompt size per hop as the thread grows, and checks
+that history, summary and the latest tool result survive a restart.
+
+Usage:
+    python benchmarks/bench_checkpoint_retention.py --threads 10 --turns 30 --result-chars 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+def tool_result(turn: int, chars: int) -> str:
+    rows = "\n".join(f"{1000 + i} | Assignment {i} | 2024-10-{i % 28 + 1:02d} | 10.0 | published"
+                     for i in range(chars // 40))
+    return f"turn {turn}\n{rows}"[:chars]
+
+
+def summary_reply(body):
+    return "Summary: the user asked about assignments in course 1; results were listed."
+
+
+async def stored_bytes(conn):
+    total = 0
+    for query in ("SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0), COUNT(*) FROM checkpoints",
+                  "SELECT COALESCE(SUM(LENGTH(value)), 0), COUNT(*) FROM writes"):
+        async with conn.execute(query) as cur:
+            size, _ = await cur.fetchone()
+            total += size
+    async with conn.execute("SELECT name FROM sqlite_master WHERE name = 'tool_blobs'") as cur:
+        if await cur.fetchone():
+            async with conn.execute("SELECT COALESCE(SUM(size), 0) FROM tool_blobs") as cur2:
+                total += (await cur2.fetchone())[0]
+    async with conn.execute("SELECT COUNT(*) FROM checkpoints") as cur:
+        checkpoints = (await cur.fetchone())[0]
+    return total, checkpoints
+
+
+def build(maintained: bool, result_chars: int, prompt_tokens: list):
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langgraph.graph import END, StateGraph
+    from src.agents import graph
+    from src.agents.checkpoint_maintenance import tool_blobs
+    from src.agents.windowing import count_message_tokens
+
+    async def supervisor(state):
+        last = state["messages"][-1]
+        next_step = "Canvas_Executor" if isinstance(last, HumanMessage) else "FINISH"
+        return {"messages": [AIMessage(content=json.dumps({"next": next_step}))], "next": next_step,
+                **graph.summary_update(state)}
+
+    async def executor(state):
+        window = await graph.history_window(state, "gpt-4o-mini")
+        prompt_tokens.append(sum(count_message_tokens(m) for m in window))
+        turn = sum(isinstance(m, HumanMessage) for m in state["messages"]) - 1
+        call_id = f"call_{turn}"
+        new = [
+            AIMessage(content="", tool_calls=[{"name": "list_assignments", "args": {"course_id": 1}, "id": call_id}]),
+            ToolMessage(content=tool_result(turn, result_chars), tool_call_id=call_id, name="list_assignments"),
+            AIMessage(content=f"Turn {turn}: course 1 has {result_chars // 40} assignments."),
+        ]
+        if maintained:
+            new = await tool_blobs.offload(new)
+        return {"messages": new, "next": "supervisor"}
+
+    workflow = StateGraph(graph.AgentState)
+    workflow.add_node("supervisor", supervisor)
+    workflow.add_node("Canvas_Executor", executor)
+    workflow.add_conditional_edges("supervisor", lambda s: s["next"],
+                                   {"Canvas_Executor": "Canvas_Executor", "FINISH": END})
+    workflow.add_edge("Canvas_Executor", "supervisor")
+    workflow.set_entry_point("supervisor")
+    return workflow
+
+
+async def run_config(args, maintained: bool, db_path: str):
+    from langchain_core.messages import HumanMessage
+    from src.agents.checkpointing import CheckpointerManager
+    from src.agents.checkpoint_maintenance import checkpoint_compactor, tool_blobs
+    from src.agents.context import request_context
+    from src.agents.windowing import running_summary
+
+    prompt_tokens = []
+    workflow = build(maintained, args.result_chars, prompt_tokens)
+    manager = CheckpointerManager()
+    app = workflow.compile(checkpointer=await manager.start("sqlite", sqlite_path=db_path))
+    if maintained:
+        checkpoint_compactor.interval = 0  # run it explicitly between batches
+        checkpoint_compactor.keep_last = args.keep_last
+        await checkpoint_compactor.start(manager)
+
+    async def thread_run(t, turn):
+        with request_context(customer_identifier="bench", thread_identifier=f"{maintained}-{t}"):
+            await app.ainvoke({"messages": [HumanMessage(content=f"thread {t} turn {turn}: list assignments")],
+                               "next": ""}, config={"configurable": {"thread_id": f"t{t}"}})
+
+    start = time.perf_counter()
+    reclaimed = 0
+    for turn in range(args.turns):
+        await asyncio.gather(*(thread_run(t, turn) for t in range(args.threads)))
+        await running_summary.wait()
+        if maintained and (turn + 1) % args.compact_every == 0:
+            reclaimed += (await checkpoint_compactor.run_once())["bytes_reclaimed"]
+    wall = time.perf_counter() - start
+    size, checkpoints = await stored_bytes(manager.connection)
+    if maintained:
+        await checkpoint_compactor.close()
+    await manager.close()
+
+    # Restart on the same file: history, summary and the latest tool result are intact
+    manager = CheckpointerManager()
+    app = workflow.compile(checkpointer=await manager.start("sqlite", sqlite_path=db_path))
+    if maintained:
+        await checkpoint_compactor.start(manager)
+    failures = summarized = 0
+    for t in range(args.threads):
+        values = (await app.aget_state({"configurable": {"thread_id": f"t{t}"}})).values
+        humans = [m for m in values["messages"] if isinstance(m, HumanMessage)]
+        restored = await tool_blobs.restore_current_turn(values["messages"])
+        latest_result = restored[-3].content
+        if args.verbose:
+            print(f"  t{t}: humans={len(humans)} result={latest_result[:12]!r} ({len(latest_result)} chars) "
+                  f"summary={values.get('summary_count')}")
+        summarized += values.get("summary_count") or 0
+        if len(humans) != args.turns or latest_result != tool_result(args.turns - 1, args.result_chars):
+            failures += 1
+    if maintained:
+        await checkpoint_compactor.close()
+    await manager.close()
+    return {"bytes": size, "checkpoints": checkpoints, "file": os.path.getsize(db_path), "wall": wall,
+            "reclaimed": reclaimed, "prompt": prompt_tokens, "failures": failures,
+            "summarized": summarized / args.threads}
+
+
+async def main(args):
+    print(f"{args.threads} threads x {args.turns} turns, {args.result_chars}-char tool results, "
+          f"keep_last={args.keep_last}, compaction every {args.compact_every} turns")
+    tmp = tempfile.mkdtemp()
+    failures = 0
+    for label, maintained in (("baseline", False), ("maintained", True)):
+        r = await run_config(args, maintained, os.path.join(tmp, f"{label}.db"))
+        prompt = r["prompt"]
+        per_thread = len(prompt) // args.threads
+        first = prompt[:args.threads * 3]
+        last = prompt[-args.threads * 3:]
+        print(f"{label:<11} stored={r['bytes'] / 1e6:7.2f}MB file={r['file'] / 1e6:7.2f}MB checkpoints={r['checkpoints']:5d} "
+              f"reclaimed={r['reclaimed'] / 1e6:7.2f}MB wall={r['wall']:.2f}s "
+              f"prompt tokens first3={sum(first) / len(first):.0f} last3={sum(last) / len(last):.0f} "
+              f"({per_thread} hops/thread) summary covers {r['summarized']:.0f} msgs/thread, "
+              f"restart failures={r['failures']}")
+        failures += r["failures"]
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--result-chars", type=int, default=20000)
+    parser.add_argument("--keep-last", type=int, default=20)
+    parser.add_argument("--compact-every", type=int, default=5)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    with FakeLLMServer(reply=summary_reply) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        os.environ.setdefault("CONTEXT_BUDGETS", "gpt-4o-mini=4000")
+        asyncio.run(main(args))
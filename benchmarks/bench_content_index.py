@@ -0,0 +1,193 @@
+"""
+Benchmark: finding one detail in course content with the content index.
+
+Runs the REST transport against the fake Canvas server with one course of
+P filler pages plus a few pages, a syllabus and an announcement that hold
+the answers, and compares for a set of detail questions:
+- read all: list_canvas_pages + get_canvas_page for every page, the
+  syllabus and list_announcements (what the executor had to read when the
+  answer could be anywhere)
+- search cold: the first search_course_content call (crawls the course)
+- search warm: later calls (one FTS5 query)
+Then checks the index:
+- re-crawl after the TTL with one page edited: only that page is fetched
+  and re-indexed, and its new text is found
+- LIKE fallback (FTS5 disabled) answers the same questions
+Verifies the top passage of every question comes from the expected source.
+
+Usage:
+    python benchmarks/bench_content_index.py --pages 40 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_canvas import FILLER, FakeCanvasData, FakeCanvasServer, make_page  # noqa: E402
+
+COURSE = 1
+FACT_PAGES = {
+    "Late policy": "<p>Late work loses 10 percent per day and is not accepted after three days.</p>",
+    "Office hours": "<p>Office hours are Tuesdays 2-4pm in Room 214 of the Science Building.</p>",
+    "Lab safety": "<p>Safety goggles and closed-toe shoes are required for every lab session.</p>",
+}
+SYLLABUS = ("<h1>Syllabus</h1>" + ("<p>" + FILLER + "</p>") * 20 +
+            "<h2>Final exam</h2><p>The final exam is held in Hall B on December 12.</p>")
+ANNOUNCEMENT = {"id": 777, "title": "Midterm update",
+                "message": "<p>The midterm has moved to Thursday in Room 105.</p>",
+                "posted_at": "2024-10-10T12:00:00Z", "html_url": "https://canvas.example/courses/1/discussion_topics/777"}
+
+# (question, title of the source expected first)
+QUESTIONS = [
+    ("What is the penalty for late work?", "Late policy"),
+    ("When are office hours?", "Office hours"),
+    ("Do I need goggles in the lab?", "Lab safety"),
+    ("Where is the final exam?", "Syllabus"),
+    ("Which room is the midterm in?", "Midterm update"),
+]
+
+
+class ContentData(FakeCanvasData):
+    """One course with filler pages plus the fact pages, syllabus and announcement."""
+
+    def __init__(self, pages: int):
+        super().__init__(courses=1, assignments_per_course=1, pages_per_course=pages)
+        self.syllabus_body = SYLLABUS
+        self.edited = {}
+
+    def pages(self, course_id):
+        pages = super().pages(course_id)
+        for i, (title, body) in enumerate(FACT_PAGES.items(), len(pages) + 1):
+            pages.append(make_page(course_id, i, title, "<h2>" + title + "</h2>" + ("<p>" + FILLER + "</p>") * 8 + body))
+        return [self.edited.get(p["url"], p) for p in pages]
+
+    def announcements(self, course_id):
+        return super().announcements(course_id) + [ANNOUNCEMENT]
+
+
+def top_title(rows):
+    return rows[0]["title"] if rows else None
+
+
+async def read_all(tools) -> int:
+    """Chars the executor reads to cover every page, the syllabus and the announcements."""
+    listing = await tools.list_canvas_pages.ainvoke({"course_id": COURSE})
+    chars = len(listing)
+    for page in json.loads(await tools.run_mcp_tool("canvas_list_pages", {"course_id": COURSE}, project=False)):
+        chars += len(await tools.get_canvas_page.ainvoke({"course_id": COURSE, "page_url": page["url"]}))
+    chars += len(await tools.run_mcp_tool("canvas_get_syllabus", {"course_id": COURSE}))
+    chars += len(await tools.list_announcements.ainvoke({"course_id": COURSE}))
+    return chars
+
+
+async def check_questions(index, label: str) -> int:
+    failures = 0
+    for question, expected in QUESTIONS:
+        rows = await index.search(COURSE, question)
+        ok = top_title(rows) == expected
+        failures += not ok
+        if not ok:
+            print(f"  [FAIL] {label}: {question!r} -> {top_title(rows)!r} (expected {expected!r})")
+    return failures
+
+
+async def main(args):
+    from src import server  # noqa: F401  (initializes tracing like the API process)
+    from src.agents import tools
+    from src.memory import content_index as content_module
+    from src.memory.content_index import ContentIndex, content_index
+    from src.tools import canvas_transport
+    from src.tools.canvas_transport import RestTransport
+    from src.tools.tool_cache import cache_identity
+
+    data = ContentData(args.pages)
+    failures = 0
+    with FakeCanvasServer(data, latency_ms=args.latency_ms) as canvas:
+        canvas_transport.set_transport(RestTransport(base_url=canvas.base_url, token="bench-token"))
+        pages = len(data.pages(COURSE))
+        print(f"1 course, {pages} pages, {len(QUESTIONS)} detail questions, {args.latency_ms:.0f}ms per Canvas request")
+
+        # Read everything (runs before the index is opened, so nothing is ingested)
+        before = data.request_count
+        start = time.perf_counter()
+        chars = await read_all(tools)
+        print(f"  read all     {(time.perf_counter() - start) * 1000:8.1f}ms  {data.request_count - before:4d} "
+              f"Canvas requests  {pages + 3:3d} tool calls  {chars:8d} chars to the LLM")
+
+        before = data.request_count
+        start = time.perf_counter()
+        output = await tools.search_course_content.ainvoke({"course_id": str(COURSE), "query": QUESTIONS[0][0]})
+        print(f"  search cold  {(time.perf_counter() - start) * 1000:8.1f}ms  {data.request_count - before:4d} "
+              f"Canvas requests    1 tool call   {len(output):8d} chars to the LLM")
+
+        before = data.request_count
+        walls, sizes = [], []
+        for _ in range(args.rounds):
+            for question, _ in QUESTIONS:
+                start = time.perf_counter()
+                output = await tools.search_course_content.ainvoke({"course_id": str(COURSE), "query": question})
+                walls.append((time.perf_counter() - start) * 1e6)
+                sizes.append(len(output))
+        print(f"  search warm  p50={statistics.median(walls):7.1f}us  {data.request_count - before:4d} Canvas "
+              f"requests    1 tool call   {sum(sizes) / len(sizes):8.0f} chars to the LLM (avg)")
+        if args.verbose:
+            for question, _ in QUESTIONS:
+                print(await tools.search_course_content.ainvoke({"course_id": str(COURSE), "query": question}))
+        failures += await check_questions(content_index, "fts5")
+
+        # Re-crawl after the TTL with one page edited
+        late = next(p for p in data.pages(COURSE) if p["title"] == "Late policy")
+        data.edited[late["url"]] = {**late, "updated_at": "2024-10-15T00:00:00Z",
+                                    "body": late["body"] + "<p>Extensions require a doctor's note.</p>"}
+        identity = cache_identity()
+        content_index._crawled[(identity, COURSE)] = 0.0
+        stats = dict(content_index.stats())
+        before = data.request_count
+        await content_index._crawl(identity, COURSE)
+        after = content_index.stats()
+        requests = data.request_count - before
+        reindexed = after["docs_indexed"] - stats["docs_indexed"]
+        found = top_title(await content_index.search(COURSE, "doctor's note extension")) == "Late policy"
+        print(f"  re-crawl     {requests:4d} Canvas requests, pages skipped={after['pages_skipped'] - stats['pages_skipped']}"
+              f" docs re-indexed={reindexed} edit found={found}")
+        failures += requests != 4 or reindexed != 1 or not found
+
+        # LIKE fallback without FTS5
+        content_module.FTS_SCHEMA = "CREATE VIRTUAL TABLE content_fts USING no_such_module(title);"
+        fallback = ContentIndex(path=os.path.join(tempfile.mkdtemp(), "content_index.db"), interval=0)
+        await fallback.open()
+        start = time.perf_counter()
+        like_failures = await check_questions(fallback, "like")
+        print(f"  like search  backend={fallback.stats()['backend']} "
+              f"{(time.perf_counter() - start) * 1000:6.1f}ms for {len(QUESTIONS)} questions (incl. crawl), "
+              f"correct {len(QUESTIONS) - like_failures}/{len(QUESTIONS)}")
+        failures += like_failures + (fallback.fts is not False)
+        await fallback.close()
+
+    print(f"  index stats: {content_index.stats()}")
+    await content_index.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    os.environ["CONTENT_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "content_index.db")
+    os.environ["TOOL_CACHE_ENABLED"] = "false"
+    os.environ["CONTENT_CRAWL_INTERVAL"] = "0"
+    os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+    os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+    asyncio.run(main(args))
@@ -0,0 +1,151 @@
+"""
+Benchmark: resolving course names with the local course index.
+
+Uses a fake Canvas transport with C courses (per-call latency) and compares,
+for a set of user-style course references:
+- listing: get_canvas_courses (one Canvas call, the whole list goes to the
+  LLM, which then has to pick the course in another turn)
+- resolve: resolve_course (the first call builds the index from one listing,
+  later calls are answered locally)
+Checks each reference resolves to the expected course (exact names, codes,
+different spacing/case, typos, term disambiguation) and that ambiguous
+names return candidates instead of a guess.
+
+Usage:
+    python benchmarks/bench_course_index.py --courses 40 --latency-ms 150 --rounds 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+SUBJECTS = ["History", "Biology", "Chemistry", "Physics", "Economics", "Psychology", "Philosophy", "Statistics",
+            "Literature", "Sociology"]
+TERMS = ["Fall 2024", "Spring 2025"]
+
+
+def make_courses(count: int):
+    courses = []
+    for i in range(count):
+        subject = SUBJECTS[i % len(SUBJECTS)]
+        number = 101 + 100 * (i // (len(SUBJECTS) * len(TERMS)))
+        term = TERMS[(i // len(SUBJECTS)) % len(TERMS)]
+        courses.append({"id": 1000 + i, "name": f"{subject} {number}", "course_code": f"{subject[:4].upper()}{number}",
+                        "workflow_state": "available", "term": {"name": term},
+                        "public_description": "x" * 300, "enrollments": [{"type": "student"}]})
+    return courses
+
+
+def expectations(courses):
+    """(query, expected course id or None when the answer must be ambiguous)."""
+    by_key = {(c["name"], c["term"]["name"]): c["id"] for c in courses}
+    history_fall = by_key[("History 101", "Fall 2024")]
+    bio_spring = by_key.get(("Biology 101", "Spring 2025"))
+    cases = [
+        ("History 101 Fall 2024", history_fall),
+        ("history101 fall", history_fall),
+        ("HIST101 Fall 2024", history_fall),
+        ("Histroy 101 fall 2024", history_fall),
+        ("History 101", None),  # offered in both terms
+    ]
+    if bio_spring:
+        cases += [("biology 101 spring", bio_spring), ("BIOL 101 Spring 2025", bio_spring)]
+    return cases
+
+
+def make_transport(courses, latency: float):
+    from src.tools.canvas_transport import CanvasTransport
+
+    class CourseTransport(CanvasTransport):
+        name = "courses-fake"
+
+        def __init__(self):
+            self.calls = 0
+
+        async def call_tool(self, tool_name, arguments):
+            self.calls += 1
+            await asyncio.sleep(latency)
+            return json.dumps(courses)
+
+    return CourseTransport()
+
+
+async def main(args):
+    from src import server  # noqa: F401  (initializes tracing like the API process)
+    from src.agents import tools
+    from src.tools import canvas_transport
+    from src.tools.course_index import course_index
+
+    courses = make_courses(args.courses)
+    transport = make_transport(courses, args.latency_ms / 1000)
+    canvas_transport.set_transport(transport)
+    cases = expectations(courses)
+
+    start = time.perf_counter()
+    listing = await tools.get_canvas_courses.ainvoke({})
+    listing_ms = (time.perf_counter() - start) * 1000
+
+    tools.tool_cache.clear()
+    course_index.invalidate()
+    transport.calls = 0
+    start = time.perf_counter()
+    first = await tools.resolve_course.ainvoke({"course_name": cases[0][0]})
+    first_ms = (time.perf_counter() - start) * 1000
+
+    failures = 0
+    outputs = {}
+    for query, expected in cases:
+        output = await tools.resolve_course.ainvoke({"course_name": query})
+        outputs[query] = output
+        ok = output.startswith(f"course_id={expected} ") if expected else output.startswith("Several courses")
+        failures += not ok
+        if args.verbose or not ok:
+            print(f"  [{'ok' if ok else 'FAIL'}] {query!r} -> {output.splitlines()[0]}")
+
+    # Warm lookups, through the tool and directly against the index
+    identity = tools.cache_identity()
+    tool_us, index_us = [], []
+    for i in range(args.rounds):
+        query = cases[i % len(cases)][0]
+        start = time.perf_counter()
+        await tools.resolve_course.ainvoke({"course_name": query})
+        tool_us.append((time.perf_counter() - start) * 1e6)
+        start = time.perf_counter()
+        await course_index.resolve(query, tools._list_courses_for_index, identity=identity)
+        index_us.append((time.perf_counter() - start) * 1e6)
+
+    print(f"{args.courses} courses, {args.latency_ms:.0f}ms per Canvas call, {len(cases)} references")
+    print(f"  get_canvas_courses   {listing_ms:8.1f}ms  {len(listing):6d} chars to the LLM (plus a turn to pick the id)")
+    print(f"  resolve_course cold  {first_ms:8.1f}ms  {len(first):6d} chars (builds the index from one listing)")
+    print(f"  resolve_course warm  p50={statistics.median(tool_us):7.1f}us via the tool, "
+          f"index lookup p50={statistics.median(index_us):5.1f}us, "
+          f"avg output {sum(len(o) for o in outputs.values()) / len(outputs):.0f} chars")
+    cold_us = []
+    for query, _ in cases:
+        course_index._user(identity).resolutions.clear()
+        start = time.perf_counter()
+        course_index.match(query, identity)
+        cold_us.append((time.perf_counter() - start) * 1e6)
+    print(f"  uncached match       p50={statistics.median(cold_us):7.1f}us max={max(cold_us):.1f}us")
+    print(f"  Canvas calls for {len(cases) + args.rounds * 2 + 1} resolutions: {transport.calls}, "
+          f"correct {len(cases) - failures}/{len(cases)}")
+    print(f"  index stats: {course_index.stats()}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true")
+    os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+    os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+    asyncio.run(main(parser.parse_args()))
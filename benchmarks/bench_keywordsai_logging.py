@@ -0,0 +1,82 @@
+"""
+Benchmark: event-loop blocking of Keywords AI logging, sync vs background.
+
+Emits a burst of log_custom_event / log_with_score calls from async code
+(as run_mcp_tool and the Content Specialist do) against a slow fake
+Keywords AI endpoint, and reports how long the calls took and the worst
+event-loop stall seen by a 10ms ticker running alongside them.
+
+Usage:
+    python benchmarks/bench_keywordsai_logging.py --logs 20 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def burst(label: str, client, logs: int):
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    for i in range(logs):
+        client.log_custom_event(event_name=f"tool_execution_bench_{i}", metadata={"i": i})
+        client.log_with_score(
+            input_messages=[{"role": "user", "content": "Draft content"}],
+            output_message={"role": "assistant", "content": "draft"},
+            score=1.0
+        )
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    print(f"{label:<22} calls={logs * 2:<4} caller time={elapsed * 1000:9.1f}ms "
+          f"max loop stall={max(lags) * 1000:8.1f}ms")
+
+
+async def main(args, server: FakeLLMServer):
+    from src import keywordsai_utils as kw
+
+    client = kw.KeywordsAIClient(api_key="bench-key")
+    client.base_url = server.base_url.rstrip("/")
+    # log_with_score posts to a fixed URL; point it at the fake endpoint too
+    original_submit = client._submit_log
+    client._submit_log = lambda url, payload: original_submit(
+        url.replace("https://api.keywordsai.co/api", client.base_url), payload)
+
+    kw.KEYWORDSAI_LOG_ASYNC = False
+    await burst("synchronous requests", client, args.logs)
+
+    kw.KEYWORDSAI_LOG_ASYNC = True
+    kw.log_exporter.start()  # the server starts it in the lifespan
+    before = len(server.requests)
+    await burst("background exporter", client, args.logs)
+    start = time.perf_counter()
+    await kw.log_exporter.shutdown()
+    print(f"{'':<22} drained {len(server.requests) - before} logs in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"stats={kw.log_exporter.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    args = parser.parse_args()
+    with FakeLLMServer(latency_ms=args.latency_ms) as fake:
+        asyncio.run(main(args, fake))
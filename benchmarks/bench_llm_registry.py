@@ -0,0 +1,79 @@
+"""
+Microbenchmark: per-turn agent setup overhead before and after the registries.
+
+A turn that goes Supervisor -> Canvas_Executor -> Supervisor used to build
+three ChatOpenAI clients and compile a ReAct executor over every tool on
+each hop. With the registries those objects are built once and looked up.
+Only setup is timed; no LLM calls are made.
+
+Usage:
+    python benchmarks/bench_llm_registry.py --turns 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+from langgraph.prebuilt import create_react_agent  # noqa: E402
+
+from src.agents.graph import create_llm, get_canvas_executor  # noqa: E402
+from src.agents.prompt_templates import CANVAS_EXECUTOR_PROMPT  # noqa: E402
+from src.agents.tools import all_tools  # noqa: E402
+
+
+def old_llm(agent_name: str, model_name: str) -> ChatOpenAI:
+    """What create_llm did per hop: a fresh client with headers baked in."""
+    return ChatOpenAI(
+        base_url=os.getenv('KEYWORDSAI_BASE_URL', 'https://api.keywordsai.co/api/'),
+        api_key=os.getenv('KEYWORDSAI_API_KEY'),
+        model=model_name,
+        temperature=0,
+        default_headers={
+            'X-Keywords-Source': 'CanvasAI-MultiAgent',
+            'X-Keywords-Cache-TTL': '3600',
+            'X-Keywords-Agent': agent_name,
+            'X-Keywords-Customer-Id': 'customer',
+            'X-Keywords-Thread-Id': 'thread',
+        }
+    )
+
+
+def old_turn():
+    old_llm("Supervisor", "gpt-4o-mini")
+    create_react_agent(old_llm("Canvas_Executor", "gpt-4o-mini"), all_tools, prompt=CANVAS_EXECUTOR_PROMPT)
+    old_llm("Supervisor", "gpt-4o-mini")
+
+
+def new_turn():
+    create_llm(agent_name="Supervisor", model_name="gpt-4o-mini")
+    get_canvas_executor("gpt-4o-mini")
+    create_llm(agent_name="Supervisor", model_name="gpt-4o-mini")
+
+
+def measure(label: str, fn, turns: int):
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    print(f"{label:<26} turns={turns:<4} mean={statistics.mean(samples) * 1000:8.2f}ms "
+          f"p50={statistics.median(samples) * 1000:8.2f}ms max={max(samples) * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+    print(f"{len(all_tools)} tools bound to the executor\n")
+    measure("before (rebuild per hop)", old_turn, args.turns)
+    new_turn()  # first turn builds the registry entries
+    measure("after (registries)", new_turn, args.turns)
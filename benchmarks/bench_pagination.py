@@ -0,0 +1,89 @@
+"""
+Benchmark: fetching every course of a 1,000-course account.
+
+Compares following rel="next" links one page at a time with the concurrent
+Link-header paginator used by /api/courses (src.tools.canvas_http.iter_pages)
+at several concurrency limits, against a local fake Canvas server.
+
+Usage:
+    python benchmarks/bench_pagination.py --courses 1000 --per-page 100 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_canvas import FakeCanvasData, FakeCanvasServer  # noqa: E402
+from src.tools.canvas_http import canvas_clients, iter_pages  # noqa: E402
+
+
+async def first_page(domain: str, per_page: int):
+    return await canvas_clients.request(
+        domain, "GET", "/api/v1/courses", route="courses",
+        params={"enrollment_state": "active", "per_page": per_page}
+    )
+
+
+async def sequential(domain: str, per_page: int) -> int:
+    response = await first_page(domain, per_page)
+    courses = response.json()
+    next_url = response.links.get("next", {}).get("url")
+    while next_url:
+        response = await canvas_clients.request(domain, "GET", next_url, route="courses")
+        courses.extend(response.json())
+        next_url = response.links.get("next", {}).get("url")
+    return len(courses)
+
+
+async def concurrent(domain: str, per_page: int, concurrency: int) -> int:
+    response = await first_page(domain, per_page)
+    count = 0
+    async for page in iter_pages(domain, response, route="courses", concurrency=concurrency):
+        count += len(page)
+    return count
+
+
+async def measure(label: str, fn, repeat: int):
+    samples, count = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = await fn()
+        samples.append(time.perf_counter() - start)
+    print(f"{label:<28} courses={count:<6} mean={statistics.mean(samples) * 1000:8.1f}ms "
+          f"min={min(samples) * 1000:8.1f}ms")
+
+
+async def main(args):
+    data = FakeCanvasData(courses=args.courses, assignments_per_course=0)
+    with FakeCanvasServer(data=data, latency_ms=args.latency_ms) as server:
+        domain = server.base_url
+        pages = -(-args.courses // args.per_page)
+        print(f"{args.courses} courses, {pages} pages of {args.per_page}, {args.latency_ms}ms per request\n")
+
+        await first_page(domain, args.per_page)  # warm the connection
+        await measure("single page (old behavior)", lambda: _count_first(domain, args.per_page), args.repeat)
+        await measure("sequential rel=next", lambda: sequential(domain, args.per_page), args.repeat)
+        for concurrency in (1, 4, 8, 16):
+            await measure(f"concurrent limit={concurrency}",
+                          lambda c=concurrency: concurrent(domain, args.per_page, c), args.repeat)
+        await canvas_clients.close()
+
+
+async def _count_first(domain: str, per_page: int) -> int:
+    return len((await first_page(domain, per_page)).json())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=1000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
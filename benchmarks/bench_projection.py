@@ -0,0 +1,204 @@
+"""
+Report: LLM input tokens of raw vs. projected Canvas tool results, per tool.
+
+Builds Canvas-shaped responses with the full field sets the REST API returns
+(assignments, submissions, enrollments/grades, users, quizzes, ...), runs
+them through project_result() and counts tokens of both forms. Also checks
+that get_full_canvas_record returns the untrimmed record.
+
+Tokens are counted with tiktoken (o200k_base) when the encoding can be
+loaded, otherwise estimated at 4 characters per token (labeled).
+
+Usage:
+    python benchmarks/bench_projection.py --records 25
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_canvas import make_assignment, make_course  # noqa: E402
+from src.tools.projection import full_record, project_result  # noqa: E402
+
+LOREM = "<p>Lorem ipsum <strong>dolor</strong> sit amet, consectetur adipiscing elit. </p>"
+
+
+def full_assignment(course_id, i):
+    a = make_assignment(course_id, i)
+    a.update({
+        "created_at": "2024-08-01T00:00:00Z", "lock_at": None, "unlock_at": None, "has_overrides": False,
+        "all_dates": None, "assignment_group_id": 12, "due_date_required": False, "allowed_extensions": [],
+        "max_name_length": 255, "turnitin_enabled": False, "vericite_enabled": False, "grade_group_students_individually": False,
+        "external_tool_tag_attributes": None, "peer_reviews": False, "automatic_peer_reviews": False,
+        "group_category_id": None, "needs_grading_count": 4, "position": i % 10, "post_to_sis": False,
+        "integration_id": None, "integration_data": {}, "allowed_attempts": -1, "grading_type": "points",
+        "grading_standard_id": None, "unpublishable": False, "only_visible_to_overrides": False,
+        "locked_for_user": False, "submissions_download_url": f"https://canvas.example/courses/{course_id}/assignments/{i}/submissions?zip=1",
+        "anonymize_students": False, "require_lockdown_browser": False, "omit_from_final_grade": False,
+        "moderated_grading": False, "grader_count": 0, "graders_anonymous_to_graders": False,
+        "anonymous_grading": False, "is_quiz_assignment": False, "can_duplicate": True, "original_course_id": None,
+        "workflow_state": "published", "secure_params": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9." + "x" * 120,
+        "lti_context_id": "3f2a9c1e-" + "0" * 27, "rubric_settings": {"points_possible": 10},
+        "use_rubric_for_grading": False, "free_form_criterion_comments": False,
+    })
+    return a
+
+
+def submission(i):
+    return {
+        "id": 5000 + i, "user_id": 200 + i, "assignment_id": 1001, "body": None, "url": None, "grade": "9",
+        "score": 9.0, "submitted_at": "2024-10-01T20:11:00Z", "graded_at": "2024-10-03T10:00:00Z",
+        "grader_id": 7, "attempt": 1, "cached_due_date": "2024-10-01T23:59:00Z", "excused": False,
+        "late_policy_status": None, "points_deducted": None, "grading_period_id": None, "extra_attempts": None,
+        "posted_at": "2024-10-03T10:00:00Z", "redo_request": False, "late": False, "missing": False,
+        "seconds_late": 0, "workflow_state": "graded", "grade_matches_current_submission": True,
+        "preview_url": f"https://canvas.example/courses/1/assignments/1001/submissions/{200 + i}?preview=1&version=1",
+        "submission_type": "online_text_entry", "entered_grade": "9", "entered_score": 9.0,
+        "anonymous_id": "aB3dE", "submission_comments": [], "attachments": [],
+    }
+
+
+def enrollment(i):
+    return {
+        "id": 9000 + i, "user_id": 200 + i, "course_id": 1, "type": "StudentEnrollment",
+        "created_at": "2024-08-01T00:00:00Z", "updated_at": "2024-10-01T00:00:00Z", "associated_user_id": None,
+        "start_at": None, "end_at": None, "course_section_id": 3, "root_account_id": 1,
+        "limit_privileges_to_course_section": False, "enrollment_state": "active", "role": "StudentEnrollment",
+        "role_id": 3, "last_activity_at": "2024-10-05T12:00:00Z", "last_attended_at": None,
+        "total_activity_time": 36000, "sis_import_id": None,
+        "grades": {"html_url": f"https://canvas.example/courses/1/grades/{200 + i}", "current_grade": "B+",
+                   "current_score": 88.5, "final_grade": "B", "final_score": 85.1, "unposted_current_score": 88.5,
+                   "unposted_final_score": 85.1, "unposted_current_grade": "B+", "unposted_final_grade": "B"},
+        "html_url": f"https://canvas.example/courses/1/users/{200 + i}",
+        "user": {"id": 200 + i, "name": f"Student {i}", "created_at": "2024-01-01T00:00:00Z",
+                 "sortable_name": f"{i}, Student", "short_name": f"Student {i}", "sis_user_id": None,
+                 "integration_id": None, "login_id": f"student{i}@example.edu"},
+    }
+
+
+def user(i):
+    return {
+        "id": 200 + i, "name": f"Student {i}", "created_at": "2024-01-01T00:00:00Z", "sortable_name": f"{i}, Student",
+        "short_name": f"Student {i}", "sis_user_id": f"SIS{i:05d}", "integration_id": None, "sis_import_id": 4,
+        "login_id": f"student{i}@example.edu", "email": f"student{i}@example.edu",
+        "avatar_url": f"https://canvas.example/images/thumbnails/{i}/abcdefabcdef", "locale": None,
+        "effective_locale": "en", "last_login": "2024-10-05T12:00:00Z", "time_zone": "America/Chicago",
+        "bio": None, "pronouns": None,
+    }
+
+
+def quiz(i):
+    return {
+        "id": 300 + i, "title": f"Quiz {i}", "html_url": f"https://canvas.example/courses/1/quizzes/{300 + i}",
+        "mobile_url": f"https://canvas.example/courses/1/quizzes/{300 + i}?force_user=1&persist_headless=1",
+        "description": LOREM * 3, "quiz_type": "assignment", "time_limit": 30, "timer_autosubmit_disabled": False,
+        "shuffle_answers": True, "show_correct_answers": True, "scoring_policy": "keep_highest",
+        "allowed_attempts": 1, "one_question_at_a_time": False, "question_count": 10, "points_possible": 20.0,
+        "cant_go_back": False, "has_access_code": False, "ip_filter": None, "due_at": "2024-10-12T23:59:00Z",
+        "lock_at": None, "unlock_at": None, "published": True, "unpublishable": False, "locked_for_user": False,
+        "hide_results": None, "show_correct_answers_at": None, "hide_correct_answers_at": None,
+        "all_dates": [], "can_update": True, "require_lockdown_browser": False, "anonymous_submissions": False,
+        "permissions": {"read": True, "submit": True, "create": True, "manage": True, "read_statistics": True,
+                        "review_grades": True, "update": True},
+        "quiz_reports_url": "https://canvas.example/api/v1/courses/1/quizzes/301/reports",
+        "quiz_statistics_url": "https://canvas.example/api/v1/courses/1/quizzes/301/statistics",
+        "quiz_submission_versions_html_url": "https://canvas.example/courses/1/quizzes/301/submission_versions",
+        "assignment_id": 1001, "version_number": 3, "question_types": ["multiple_choice_question"],
+    }
+
+
+def announcement(i):
+    return {
+        "id": 400 + i, "title": f"Week {i} update", "message": LOREM * 6, "posted_at": "2024-10-01T09:00:00Z",
+        "delayed_post_at": None, "last_reply_at": None, "require_initial_post": None, "user_can_see_posts": True,
+        "discussion_subentry_count": 0, "read_state": "read", "unread_count": 0, "subscribed": False,
+        "attachments": [], "published": True, "can_unpublish": False, "locked": False, "can_lock": True,
+        "comments_disabled": False, "author": {"id": 7, "display_name": "Prof. X",
+                                               "avatar_image_url": "https://canvas.example/images/messages/avatar-50.png",
+                                               "html_url": "https://canvas.example/courses/1/users/7"},
+        "html_url": f"https://canvas.example/courses/1/discussion_topics/{400 + i}",
+        "url": f"https://canvas.example/courses/1/discussion_topics/{400 + i}", "pinned": False,
+        "position": None, "podcast_has_student_posts": False, "discussion_type": "side_comment",
+        "is_announcement": True, "permissions": {"attach": True, "update": True, "reply": True, "delete": True},
+    }
+
+
+def module_item(i):
+    return {
+        "id": 700 + i, "title": f"Reading {i}", "position": i, "indent": 0, "quiz_lti": False, "type": "Page",
+        "module_id": 70, "html_url": f"https://canvas.example/courses/1/modules/items/{700 + i}",
+        "page_url": f"reading-{i}", "url": f"https://canvas.example/api/v1/courses/1/pages/reading-{i}",
+        "published": True, "unpublishable": True, "content_id": 0,
+        "completion_requirement": {"type": "must_view", "completed": False},
+        "content_details": {"locked_for_user": False},
+    }
+
+
+def samples(n):
+    return {
+        "canvas_list_courses": [dict(make_course(i), **{"enrollments": [{"type": "teacher", "role": "TeacherEnrollment",
+                                                                        "role_id": 4, "user_id": 7,
+                                                                        "enrollment_state": "active"}],
+                                                       "default_view": "modules", "is_public": False,
+                                                       "calendar": {"ics": f"https://canvas.example/feeds/calendars/course_{i}.ics"},
+                                                       "time_zone": "America/Chicago", "blueprint": False,
+                                                       "apply_assignment_group_weights": False})
+                                for i in range(1, n + 1)],
+        "canvas_list_assignments": [full_assignment(1, 1000 + i) for i in range(n)],
+        "canvas_get_assignment": full_assignment(1, 1001),
+        "canvas_get_submission": submission(1),
+        "canvas_get_course_grades": [enrollment(i) for i in range(n)],
+        "canvas_list_account_users": [user(i) for i in range(n)],
+        "canvas_list_quizzes": [quiz(i) for i in range(n // 2 or 1)],
+        "canvas_list_announcements": [announcement(i) for i in range(n // 3 or 1)],
+        "canvas_list_module_items": [module_item(i) for i in range(n)],
+    }
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+    except Exception as e:  # encoding files are downloaded on first use
+        print(f"[WARN] tiktoken encoding unavailable ({type(e).__name__}); estimating tokens as chars/4")
+        return (lambda text: (len(text) + 3) // 4), "estimate chars/4"
+
+
+def main(args):
+    count, label = token_counter()
+    total_raw = total_projected = 0
+    print(f"{'tool':<32} {'raw tok':>8} {'projected':>10} {'saved':>6}")
+    for tool_name, data in samples(args.records).items():
+        raw = json.dumps(data, indent=2)  # as the transports return it
+        projected = project_result(tool_name, {"course_id": 1}, raw, identity="bench")
+        raw_tokens, projected_tokens = count(raw), count(projected)
+        total_raw += raw_tokens
+        total_projected += projected_tokens
+        print(f"{tool_name:<32} {raw_tokens:8d} {projected_tokens:10d} {1 - projected_tokens / raw_tokens:6.0%}")
+
+        # Escape hatch: the untrimmed record is still reachable
+        ref = projected.rsplit('ref="', 1)[1].split('"', 1)[0]
+        first = data[0] if isinstance(data, list) else data
+        record_id = first.get("id")
+        assert json.loads(full_record(ref, record_id, identity="bench")) == first, tool_name
+        assert full_record(ref, record_id, identity="someone-else").startswith("Error"), tool_name
+
+    print(f"{'total':<32} {total_raw:8d} {total_projected:10d} {1 - total_projected / total_raw:6.0%}")
+    print(f"token counter: {label}; get_full_canvas_record round-trip ok for every tool")
+    if args.show:
+        print()
+        print(project_result("canvas_list_assignments", {"course_id": 1},
+                             json.dumps(samples(5)["canvas_list_assignments"]), identity="bench"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=25)
+    parser.add_argument("--show", action="store_true", help="print a sample projection")
+    main(parser.parse_args())
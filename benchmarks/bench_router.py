@@ -0,0 +1,166 @@
+"""
+Benchmark: Supervisor LLM calls saved by the fast-path router, and its accuracy.
+
+Uses a labeled prompt set (the worker sequence a correct Supervisor would
+choose). Two parts:
+- Offline: replays every routing step of every prompt through fast_route()
+  and reports coverage (steps decided locally) and accuracy of those
+  decisions against the labels.
+- End to end: runs the prompts through the real graph against a fake LLM
+  whose Supervisor answers from the labels, with the router off and on, and
+  reports LLM calls per request and whether the worker sequence changed.
+
+Usage:
+    python benchmarks/bench_router.py --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+E, C, F = "Canvas_Executor", "Content_Specialist", "FINISH"
+
+LABELED_PROMPTS = [
+    ("List my courses", [E, F]),
+    ("Show me the assignments due this week in Biology 101", [E, F]),
+    ("What are my upcoming deadlines?", [E, F]),
+    ("What assignments are due tomorrow?", [E, F]),
+    ("Check submissions for Essay 2 in History 101", [E, F]),
+    ("Find the course ID for Chemistry 200", [E, F]),
+    ("How many students are enrolled in Physics 1?", [E, F]),
+    ("When is the midterm due in CS 101?", [E, F]),
+    ("Get my announcements from this week", [E, F]),
+    ("Create an announcement in History 101 saying class is cancelled tomorrow", [E, F]),
+    ("Update the due date of Lab 3 to Friday at 5pm", [E, F]),
+    ("Delete the draft quiz in Math 120", [E, F]),
+    ("Publish module 4 in Biology 101", [E, F]),
+    ("Add a 10 point extra credit assignment to CS 101", [E, F]),
+    ("Send a message to all students in CS 101 reminding them about the exam", [E, F]),
+    ("List my courses, then create an announcement in the first one", [E, F]),
+    ("Draft an essay prompt on the causes of World War I", [C, F]),
+    ("Write a rubric for a 5-paragraph persuasive essay", [C, F]),
+    ("Summarize the key points of this discussion: students disagree about grading curves", [C, F]),
+    ("Explain the difference between formative and summative assessment", [C, F]),
+    ("Compose a welcome message for the new semester", [C, F]),
+    ("Analyze these quiz scores and suggest interventions: 55, 62, 90", [C, F]),
+    ("What is Bloom's taxonomy?", [C, F]),
+    ("Check whether my rubric wording is clear: 'Excellent: fully meets criteria'", [C, F]),
+    ("Show me how to write a good discussion prompt", [C, F]),
+    ("Check missing work in CS 101 and draft a polite nudge email", [E, C, F]),
+    ("Draft an announcement about the field trip and post it to History 101", [C, E, F]),
+    ("Read the syllabus I uploaded and create the assignments from it", [E, C, E, F]),
+    ("Get the grades for Lab 2 then summarize how the class did", [E, C, F]),
+    ("Create an assignment for Essay 3 and write the instructions for it", [C, E, F]),
+    ("Hi!", [F]),
+    ("Thanks, that's all", [F]),
+]
+LABELS = dict(LABELED_PROMPTS)
+
+
+def transcript(prompt, routes):
+    """State messages after the given routing decisions (workers answer in plain text)."""
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    messages = [HumanMessage(content=prompt)]
+    for route in routes:
+        messages.append(AIMessage(content=json.dumps({"next": route})))
+        if route == E:
+            messages.append(AIMessage(content="", tool_calls=[{"name": "get_canvas_courses", "args": {}, "id": "c1"}]))
+            messages.append(ToolMessage(content='[{"id": 1, "name": "Biology 101"}]', tool_call_id="c1"))
+            messages.append(AIMessage(content="Here is what I found in Canvas: Biology 101."))
+        else:
+            messages.append(AIMessage(content="Here is the draft: ..."))
+    return messages
+
+
+def offline():
+    from src.agents.router import fast_route
+
+    steps = decided = correct = 0
+    for prompt, routes in LABELED_PROMPTS:
+        for k, expected in enumerate(routes):
+            steps += 1
+            decision = fast_route(transcript(prompt, routes[:k]))
+            if decision is None:
+                continue
+            decided += 1
+            if decision.next == expected:
+                correct += 1
+            else:
+                print(f"  [MISROUTE] {prompt!r} step {k}: fast path chose {decision.next}, label {expected}")
+    print(f"offline: {len(LABELED_PROMPTS)} prompts, {steps} supervisor steps, "
+          f"decided locally {decided} ({decided / steps:.0%}), accuracy {correct}/{decided} "
+          f"({correct / max(decided, 1):.1%}), LLM calls saved/request {decided / len(LABELED_PROMPTS):.2f}")
+
+
+def oracle_reply(body):
+    """Supervisor follows the labels; workers answer in plain text."""
+    messages = body.get("messages", [])
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user_index = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=0)
+    prompt = messages[user_index].get("content") or ""
+    if system.startswith("You are the Supervisor"):
+        step = sum(1 for m in messages[user_index + 1:]
+                   if m.get("role") == "assistant" and (m.get("content") or "").startswith('{"next"'))
+        routes = LABELS.get(prompt, [F])
+        return json.dumps({"next": routes[min(step, len(routes) - 1)]})
+    return f"Answer for: {prompt}"
+
+
+async def end_to_end(llm: FakeLLMServer):
+    from src.agents import graph, router
+
+    graph.kw_client = None
+
+    async def run_all(enabled: bool):
+        router.ROUTER_FAST_PATH = enabled
+        llm.requests.clear()
+        sequences = {}
+        start = time.perf_counter()
+        for i, (prompt, _) in enumerate(LABELED_PROMPTS):
+            result = await graph.app.ainvoke(
+                {"messages": [graph.HumanMessage(content=prompt)]},
+                config={"configurable": {"thread_id": f"router-{enabled}-{i}"}}
+            )
+            sequences[prompt] = [router.parse_route(m.content) for m in result["messages"]
+                                 if isinstance(m, graph.AIMessage) and router.parse_route(m.content)]
+        wall = time.perf_counter() - start
+        supervisor_calls = sum(1 for r in llm.requests
+                               if (r["body"]["messages"][0].get("content") or "").startswith("You are the Supervisor"))
+        return sequences, len(llm.requests), supervisor_calls, wall
+
+    n = len(LABELED_PROMPTS)
+    router.router_stats.update(first_hop=0, finish=0, deferred=0)
+    base_seq, base_calls, base_sup, base_wall = await run_all(False)
+    fast_seq, fast_calls, fast_sup, fast_wall = await run_all(True)
+    diverged = [p for p in base_seq if base_seq[p] != fast_seq[p]]
+    print(f"router off: {base_calls / n:.2f} LLM calls/request ({base_sup / n:.2f} supervisor), "
+          f"{base_wall / n * 1000:.0f}ms/request")
+    print(f"router on:  {fast_calls / n:.2f} LLM calls/request ({fast_sup / n:.2f} supervisor), "
+          f"{fast_wall / n * 1000:.0f}ms/request")
+    print(f"saved {(base_calls - fast_calls) / n:.2f} LLM calls/request; "
+          f"worker sequence unchanged for {n - len(diverged)}/{n} prompts")
+    for prompt in diverged:
+        print(f"  [DIVERGED] {prompt!r}: {base_seq[prompt]} -> {fast_seq[prompt]}")
+    print("router stats:", router.get_router_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    with FakeLLMServer(latency_ms=args.latency_ms, reply=oracle_reply) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        offline()
+        asyncio.run(end_to_end(llm))
@@ -0,0 +1,139 @@
+"""
+Benchmark: repeated course lookups within one multi-step chat run.
+
+Drives /chat (real graph, real tool wrappers) against a fake LLM endpoint
+whose executor follows the prompt's "resolve the course first" rule on
+every step: get_canvas_courses, create assignment 1, get_canvas_courses,
+create assignment 2, ... and a fake Canvas transport that adds a fixed
+latency per call and counts calls per tool. The response cache is off,
+so only the per-run memo can absorb the repeats.
+- off: RUN_MEMO_ENABLED=false
+- on: per-run memoization
+Reports upstream calls per run, deduplicated calls and wall-clock time,
+and checks that every assignment was still created.
+
+Usage:
+    python benchmarks/bench_run_memo.py --runs 10 --steps 3 --latency-ms 150
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+STEPS = 3
+
+
+def executor_reply(body):
+    messages = body.get("messages", [])
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    if system.startswith("You are the Supervisor"):
+        if messages and messages[-1].get("role") == "user":
+            return json.dumps({"next": "Canvas_Executor"})
+        return json.dumps({"next": "FINISH"})
+    last_user = max(i for i, m in enumerate(messages) if m.get("role") == "user")
+    step = sum(m.get("role") == "tool" for m in messages[last_user:])
+    if step >= 2 * STEPS:
+        return f"Created {STEPS} assignments."
+    if step % 2 == 0:
+        call = ("get_canvas_courses", {})
+    else:
+        call = ("create_canvas_assignment", {"course_id": "101", "assignment_name": f"Essay {step // 2 + 1}"})
+    return {"content": None, "tool_calls": [
+        {"id": f"call_{step}", "type": "function",
+         "function": {"name": call[0], "arguments": json.dumps(call[1])}}
+    ]}
+
+
+def make_transport(latency: float):
+    from src.tools.canvas_transport import CanvasTransport
+
+    class CountingTransport(CanvasTransport):
+        name = "counting-fake"
+
+        def __init__(self):
+            self.calls = {}
+            self.created = []
+
+        async def call_tool(self, tool_name, arguments):
+            self.calls[tool_name] = self.calls.get(tool_name, 0) + 1
+            await asyncio.sleep(latency)
+            if tool_name == "canvas_list_courses":
+                return json.dumps([{"id": 101, "name": "History 101", "course_code": "HIST101"},
+                                   {"id": 102, "name": "Biology 110", "course_code": "BIO110"}])
+            self.created.append(arguments.get("name"))
+            return json.dumps({"id": len(self.created), "name": arguments.get("name"),
+                               "html_url": "https://canvas.example/a/1"})
+
+    return CountingTransport()
+
+
+async def run_mode(args, enabled: bool):
+    import httpx
+    from src import server
+    from src.agents import run_memo
+    from src.tools import canvas_transport
+
+    run_memo.RUN_MEMO_ENABLED = enabled
+    transport = make_transport(args.latency_ms / 1000)
+    canvas_transport.set_transport(transport)
+    before = dict(run_memo.run_memo_stats)
+    walls = []
+    client_transport = httpx.ASGITransport(app=server.api)
+    async with httpx.AsyncClient(transport=client_transport, base_url="http://agent", timeout=120) as client:
+        for run in range(args.runs):
+            start = time.perf_counter()
+            response = await client.post("/chat", json={
+                "message": f"Create {STEPS} assignments in History 101",
+                "thread_id": f"memo-{enabled}-{run}",
+                "customer_id": "bench"
+            })
+            response.raise_for_status()
+            walls.append((time.perf_counter() - start) * 1000)
+    deduplicated = run_memo.run_memo_stats["deduplicated"] - before["deduplicated"]
+    return transport, walls, deduplicated
+
+
+async def main(args):
+    from src.agents import graph
+
+    graph.kw_client = None
+    print(f"{args.runs} runs x {STEPS} lookup+create steps, {args.latency_ms:.0f}ms per Canvas call, "
+          f"LLM {args.llm_ms:.0f}ms, response cache off")
+    failures = 0
+    for label, enabled in (("off", False), ("on", True)):
+        transport, walls, deduplicated = await run_mode(args, enabled)
+        walls.sort()
+        lookups = transport.calls.get("canvas_list_courses", 0) / args.runs
+        creates = len(transport.created)
+        print(f"  memo {label:<4} list_courses per run={lookups:.1f} deduplicated={deduplicated} "
+              f"assignments created={creates}/{args.runs * STEPS} "
+              f"wall p50={walls[len(walls) // 2]:7.1f}ms mean={sum(walls) / len(walls):7.1f}ms")
+        failures += creates != args.runs * STEPS
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--llm-ms", type=float, default=20)
+    args = parser.parse_args()
+    STEPS = args.steps
+    os.environ["TOOL_CACHE_ENABLED"] = "false"
+    os.environ["MCP_POOL_ENABLED"] = "false"
+    os.environ["EXECUTOR_PREBUILD"] = "false"
+    with FakeLLMServer(latency_ms=args.llm_ms, reply=executor_reply) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        asyncio.run(main(args))
@@ -0,0 +1,92 @@
+"""
+Benchmark: a burst of identical Canvas reads with and without single-flight.
+
+Simulates many users' frontends (or agent tool calls) asking for the same
+course list at the same moment, and reports how many upstream requests
+reach Canvas and the wall time of the burst. Also checks that errors reach
+every waiter and that a cancelled waiter does not cancel the others.
+
+Usage:
+    python benchmarks/bench_singleflight.py --burst 50 --latency-ms 100
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_canvas import FakeCanvasData, FakeCanvasServer  # noqa: E402
+from src.tools.canvas_http import canvas_clients  # noqa: E402
+from src.tools.singleflight import SingleFlight  # noqa: E402
+
+PARAMS = {"enrollment_state": "active", "per_page": 100}
+HEADERS = {"Authorization": "Bearer bench-token"}
+
+
+async def burst(label: str, server: FakeCanvasServer, size: int, shared: bool):
+    before = server.data.request_count
+    start = time.perf_counter()
+    if shared:
+        calls = [canvas_clients.shared_get(server.base_url, "/api/v1/courses", route="courses",
+                                           params=PARAMS, headers=HEADERS) for _ in range(size)]
+    else:
+        calls = [canvas_clients.request(server.base_url, "GET", "/api/v1/courses", route="courses",
+                                        params=PARAMS, headers=HEADERS) for _ in range(size)]
+    responses = await asyncio.gather(*calls)
+    wall = time.perf_counter() - start
+    assert all(r.status_code == 200 for r in responses)
+    print(f"{label:<22} burst={size:<4} upstream={server.data.request_count - before:<4} wall={wall * 1000:8.1f}ms")
+
+
+async def check_semantics():
+    group = SingleFlight("check")
+    upstream = []
+
+    async def failing():
+        upstream.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("canvas down")
+
+    results = await asyncio.gather(*(group.do("k", failing) for _ in range(5)), return_exceptions=True)
+    assert len(upstream) == 1 and all(isinstance(r, RuntimeError) for r in results)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    first = asyncio.create_task(group.do("k2", slow))
+    second = asyncio.create_task(group.do("k2", slow))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "ok", "cancelling one waiter must not cancel the shared call"
+
+    lone = asyncio.create_task(group.do("k3", slow))
+    await asyncio.sleep(0.01)
+    lone.cancel()
+    await asyncio.gather(lone, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert group.stats()["cancelled"] == 1 and group.stats()["in_flight"] == 0
+    print(f"semantics ok: {group.stats()}")
+
+
+async def main(args):
+    data = FakeCanvasData(courses=args.courses, assignments_per_course=0)
+    with FakeCanvasServer(data=data, latency_ms=args.latency_ms) as server:
+        await canvas_clients.request(server.base_url, "GET", "/api/v1/users/self/profile")  # warm up
+        await burst("independent requests", server, args.burst, shared=False)
+        await burst("single-flight", server, args.burst, shared=True)
+        await canvas_clients.close()
+    await check_semantics()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Benchmark: graph state growth with full-list node returns vs. add_messages deltas.
+
+Runs long threads (default 50 turns) through two graphs with the agent's
+topology (supervisor -> Content_Specialist -> supervisor -> FINISH per turn)
+and LLM-free nodes, checkpointed with MemorySaver:
+- old: `messages: list` and nodes returning state["messages"] + [new]
+- new: `messages: Annotated[list, add_messages]` and nodes returning [new]
+Reports checkpointer bytes (channel snapshots and node writes) and CPU
+time per hop as the thread grows.
+
+Usage:
+    python benchmarks/bench_state_growth.py --turns 50 --answer-chars 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Annotated, TypedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import MemorySaver  # noqa: E402
+from langgraph.graph import END, StateGraph  # noqa: E402
+from langgraph.graph.message import add_messages  # noqa: E402
+
+
+class OldState(TypedDict):
+    messages: list
+    next: str
+
+
+class NewState(TypedDict):
+    messages: Annotated[list, add_messages]
+    next: str
+
+
+def build(delta: bool, answer_chars: int):
+    def emit(state, message, next_step):
+        return {"messages": [message] if delta else state["messages"] + [message], "next": next_step}
+
+    async def supervisor(state):
+        last = state["messages"][-1]
+        next_step = "Content_Specialist" if isinstance(last, HumanMessage) else "FINISH"
+        return emit(state, AIMessage(content=json.dumps({"next": next_step})), next_step)
+
+    async def specialist(state):
+        return emit(state, AIMessage(content="d" * answer_chars), "supervisor")
+
+    workflow = StateGraph(NewState if delta else OldState)
+    workflow.add_node("supervisor", supervisor)
+    workflow.add_node("Content_Specialist", specialist)
+    workflow.add_conditional_edges("supervisor", lambda s: s["next"],
+                                   {"Content_Specialist": "Content_Specialist", "FINISH": END})
+    workflow.add_edge("Content_Specialist", "supervisor")
+    workflow.set_entry_point("supervisor")
+    saver = MemorySaver()
+    return workflow.compile(checkpointer=saver), saver
+
+
+def saver_bytes(saver: MemorySaver):
+    """(channel snapshot bytes, node write bytes) held by the checkpointer."""
+    blobs = sum(len(value[1]) for value in saver.blobs.values() if isinstance(value[1], (bytes, bytearray)))
+    writes = 0
+    for thread_writes in saver.writes.values():
+        for write in thread_writes.values():
+            payload = write[2] if len(write) > 2 else None
+            if isinstance(payload, tuple) and len(payload) == 2 and isinstance(payload[1], (bytes, bytearray)):
+                writes += len(payload[1])
+    return blobs, writes
+
+
+async def run_thread(delta: bool, turns: int, answer_chars: int, carry_history: bool):
+    app, saver = build(delta, answer_chars)
+    config = {"configurable": {"thread_id": "long-thread"}}
+    history = []
+    per_turn_cpu = []
+    for turn in range(turns):
+        human = HumanMessage(content=f"Turn {turn}: " + "q" * 200)
+        # The old list state replaced history with the input, so callers had to resend it
+        messages = history + [human] if carry_history else [human]
+        cpu = time.process_time()
+        result = await app.ainvoke({"messages": messages}, config=config)
+        per_turn_cpu.append((time.process_time() - cpu) * 1000 / 3)  # 3 hops per turn
+        history = result["messages"]
+    blobs, writes = saver_bytes(saver)
+    return len(history), per_turn_cpu, blobs, writes
+
+
+async def main(args):
+    print(f"{args.turns}-turn thread, {args.answer_chars}-char answers, 3 hops per turn")
+    rows = [
+        ("old: list + full copies", False, True),
+        ("new: add_messages deltas", True, False),
+    ]
+    for label, delta, carry in rows:
+        n_messages, cpu, blobs, writes = await run_thread(delta, args.turns, args.answer_chars, carry)
+        tail = cpu[-10:]
+        print(f"{label:<26} messages={n_messages:4d}  checkpoint snapshots={blobs / 1e6:7.2f}MB  "
+              f"node writes={writes / 1e6:7.2f}MB  CPU/hop first10={sum(cpu[:10]) / 10:.2f}ms "
+              f"last10={sum(tail) / len(tail):.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--answer-chars", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,150 @@
+"""
+Benchmark: Canvas_Executor turns with several tool calls per model message.
+
+Drives the real agent graph against a fake LLM endpoint whose executor
+replies emit several tool calls at once, and a fake Canvas transport that
+adds a fixed latency per call and records when each call ran:
+- reads: list_modules + list_quizzes + get_course_assignments +
+  list_announcements for one course in a single message
+- mixed: create assignment A, create assignment B, list assignments
+Each mode runs the same turns:
+- sequential: one tool call at a time (the per-call round trip cost)
+- unscheduled: the ReAct graph's own fan-out, without ordering or a cap
+- scheduled: tool_scheduler (reads concurrent up to the cap, writes in order)
+Reports per-turn wall-clock time and whether writes kept their order.
+
+Usage:
+    python benchmarks/bench_tool_parallelism.py --turns 10 --latency-ms 150
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+READ_CALLS = [("list_modules", {}), ("list_quizzes", {}), ("get_course_assignments", {}), ("list_announcements", {})]
+MIXED_CALLS = [("create_canvas_assignment", {"assignment_name": "A"}),
+               ("create_canvas_assignment", {"assignment_name": "B"}),
+               ("get_course_assignments", {})]
+
+
+def executor_reply(body):
+    messages = body.get("messages", [])
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    last = messages[-1] if messages else {}
+    if system.startswith("You are the Supervisor"):
+        if last.get("role") == "user":
+            return json.dumps({"next": "Canvas_Executor"})
+        return json.dumps({"next": "FINISH"})
+    if last.get("role") == "tool":
+        return "Done."
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    course_id = int(user.split("course ")[1].split()[0])
+    calls = MIXED_CALLS if "create" in user else READ_CALLS
+    return {"content": None, "tool_calls": [
+        {"id": f"call_{course_id}_{i}", "type": "function",
+         "function": {"name": name, "arguments": json.dumps({"course_id": str(course_id), **args})}}
+        for i, (name, args) in enumerate(calls)
+    ]}
+
+
+def make_transport(latency: float):
+    from src.tools.canvas_transport import CanvasTransport
+
+    class SlowTransport(CanvasTransport):
+        name = "slow-fake"
+
+        def __init__(self):
+            self.log = []
+            self.in_flight = 0
+            self.peak = 0
+
+        async def call_tool(self, tool_name, arguments):
+            start = time.perf_counter()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(latency)
+            self.in_flight -= 1
+            self.log.append((tool_name, arguments, start, time.perf_counter()))
+            if tool_name.startswith("canvas_create"):
+                return json.dumps({"id": 1, "name": arguments.get("name"), "html_url": "https://canvas.example/a/1"})
+            return json.dumps([{"id": 1, "name": "x"}])
+
+    return SlowTransport()
+
+
+def writes_in_order(log) -> bool:
+    writes = sorted((entry for entry in log if entry[0].startswith("canvas_create")), key=lambda e: e[2])
+    names = [entry[1].get("name") for entry in writes]
+    overlapping = any(a[3] > b[2] for a, b in zip(writes, writes[1:]))
+    return names == sorted(names) and not overlapping
+
+
+async def run_mode(args, mode: str, kind: str):
+    from langchain_core.messages import HumanMessage
+    from src.agents import graph, tool_scheduler
+    from src.agents.context import request_context
+    from src.tools import canvas_transport
+
+    transport = make_transport(args.latency_ms / 1000)
+    canvas_transport.set_transport(transport)
+    tool_scheduler.TOOL_SCHEDULING_ENABLED = mode != "unscheduled"
+    tool_scheduler.EXECUTOR_TOOL_CONCURRENCY = 1 if mode == "sequential" else args.concurrency
+
+    walls = []
+    ordered = 0
+    for turn in range(args.turns):
+        course_id = 100 + turn + (1000 if kind == "mixed" else 0) + {"sequential": 0, "unscheduled": 10000, "scheduled": 20000}[mode]
+        text = f"For course {course_id} " + ("create assignments A and B then list assignments" if kind == "mixed"
+                                             else "list modules, quizzes, assignments and announcements")
+        transport.log.clear()
+        start = time.perf_counter()
+        with request_context(customer_identifier="bench", thread_identifier=f"{mode}-{kind}-{turn}"):
+            await graph.app.ainvoke({"messages": [HumanMessage(content=text)], "next": ""},
+                                    config={"configurable": {"thread_id": f"{mode}-{kind}-{turn}"}})
+        walls.append((time.perf_counter() - start) * 1000)
+        ordered += writes_in_order(transport.log)
+    return walls, ordered, transport.peak
+
+
+async def main(args):
+    from src import server  # noqa: F401  (initializes tracing like the API process)
+    from src.agents import graph
+
+    graph.kw_client = None
+    print(f"{args.turns} turns per mode, {args.latency_ms:.0f}ms per Canvas call, LLM {args.llm_ms:.0f}ms, "
+          f"cap={args.concurrency}")
+    for kind in ("reads", "mixed"):
+        calls = READ_CALLS if kind == "reads" else MIXED_CALLS
+        print(f"\n{kind}: {len(calls)} tool calls in one message ({', '.join(name for name, _ in calls)})")
+        for mode in ("sequential", "unscheduled", "scheduled"):
+            walls, ordered, peak = await run_mode(args, mode, kind)
+            walls.sort()
+            line = (f"  {mode:<12} turn wall p50={walls[len(walls) // 2]:7.1f}ms "
+                    f"mean={sum(walls) / len(walls):7.1f}ms  peak concurrent calls={peak}")
+            if kind == "mixed":
+                line += f"  writes in order {ordered}/{args.turns}"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--llm-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    os.environ["TOOL_CACHE_ENABLED"] = "false"
+    with FakeLLMServer(latency_ms=args.llm_ms, reply=executor_reply) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        asyncio.run(main(args))
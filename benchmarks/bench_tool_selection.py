@@ -0,0 +1,112 @@
+"""
+Report: tool schema tokens per Canvas_Executor call with per-request tool subsets.
+
+For a labeled set of executor requests (the tools a correct run needs), shows
+how many tools and tool-schema prompt tokens each request binds with
+selection vs. all_tools, whether the needed tools were all selected, and how
+many executors were served from the prebuilt cache.
+
+Tokens are counted with tiktoken (o200k_base, the gpt-4o/gpt-4o-mini
+encoding) over the OpenAI tool definitions ChatOpenAI sends. If the encoding
+cannot be loaded (no network to fetch it), a chars/4 estimate is used and
+labeled as such.
+
+Usage:
+    python benchmarks/bench_tool_selection.py
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+
+LABELED_REQUESTS = [
+    ("List my courses", {"get_canvas_courses"}),
+    ("Show me the assignments due this week in Biology 101", {"get_canvas_courses", "get_course_assignments"}),
+    ("What are my upcoming deadlines?", {"get_upcoming_assignments"}),
+    ("Check submissions for Essay 2 in History 101", {"get_canvas_courses", "get_course_assignments", "get_submissions"}),
+    ("Grade Maria's Lab 3 submission in CS 101 as 95", {"get_course_assignments", "submit_canvas_grade"}),
+    ("Create an announcement in History 101 saying class is cancelled tomorrow",
+     {"get_canvas_courses", "create_canvas_announcement"}),
+    ("Update the due date of Lab 3 to Friday at 5pm", {"get_course_assignments", "update_canvas_assignment"}),
+    ("Delete the draft quiz in Math 120", {"get_canvas_courses", "list_quizzes"}),
+    ("Create a 10 question quiz on photosynthesis in Biology 101", {"create_quiz", "create_quiz_question"}),
+    ("Publish module 4 in Biology 101", {"get_canvas_courses", "list_modules"}),
+    ("Mark the first item in module 2 as complete", {"list_module_items", "mark_module_item_complete"}),
+    ("Post a reply to the week 3 discussion in Psych 100", {"list_discussion_topics", "post_to_discussion"}),
+    ("Summarize the replies in the Ethics discussion", {"get_discussion_topics", "get_full_discussion_entry"}),
+    ("Send a message to student 4521 reminding them about the exam", {"send_canvas_message"}),
+    ("What's on my calendar next week?", {"list_calendar_events"}),
+    ("Show the rubric for Essay 2", {"list_rubrics", "get_rubric"}),
+    ("List the files in the Chemistry 200 course", {"get_canvas_courses", "list_canvas_files"}),
+    ("Read the syllabus I uploaded at ./syllabus.md", {"read_local_file"}),
+    ("Enroll user 88 in CS 101 as a TA", {"enroll_user"}),
+    ("Save this as my late policy template", {"save_template"}),
+    ("How am I doing in my classes?", {"get_user_grades"}),
+]
+
+
+def token_counter():
+    """(count function, label): tiktoken o200k_base, or a chars/4 estimate offline."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+    except Exception as e:  # encoding files are downloaded on first use
+        print(f"[WARN] tiktoken encoding unavailable ({type(e).__name__}); estimating tokens as chars/4")
+        return (lambda text: (len(text) + 3) // 4), "estimate chars/4"
+
+
+def main():
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    from src.agents.tools import all_tools
+    from src.agents.tool_selector import select_tools, match_categories
+    from src.agents import graph
+    from src.agents.llm_registry import executor_registry
+
+    count, label = token_counter()
+    schema_tokens = {t.name: count(json.dumps(convert_to_openai_tool(t))) for t in all_tools}
+    full = sum(schema_tokens.values())
+
+    start = time.perf_counter()
+    prebuilt = graph.prebuild_canvas_executors()
+    prebuild_ms = (time.perf_counter() - start) * 1000
+    before = executor_registry.stats()
+
+    rows, misses = [], []
+    for prompt, needed in LABELED_REQUESTS:
+        tools = select_tools(prompt)
+        names = {t.name for t in tools}
+        tokens = sum(schema_tokens[n] for n in names)
+        rows.append((len(tools), tokens))
+        missing = needed - names
+        if missing:
+            misses.append((prompt, sorted(missing), match_categories(prompt)))
+        graph.get_canvas_executor("gpt-4o-mini", tools)
+        print(f"{len(tools):3d} tools {tokens:6d} tok  {'ok  ' if not missing else 'MISS'} {prompt}")
+
+    after = executor_registry.stats()
+    n = len(rows)
+    mean_tokens = statistics.mean(t for _, t in rows)
+    print()
+    print(f"token counter: {label}")
+    print(f"all_tools:  {len(all_tools)} tools, {full} schema tokens per executor LLM call")
+    print(f"selected:   mean {statistics.mean(c for c, _ in rows):.1f} tools, mean {mean_tokens:.0f} tokens, "
+          f"median {statistics.median(t for _, t in rows):.0f}, max {max(t for _, t in rows)}")
+    print(f"saved:      {full - mean_tokens:.0f} tokens/call ({(full - mean_tokens) / full:.0%})")
+    print(f"coverage:   {n - len(misses)}/{n} requests had every needed tool")
+    for prompt, missing, categories in misses:
+        print(f"  [MISS] {prompt!r}: missing {missing} (categories {categories})")
+    print(f"executors:  {prebuilt} prebuilt in {prebuild_ms:.0f}ms; "
+          f"{after['hits'] - before['hits']} cache hits / {after['builds'] - before['builds']} new builds for {n} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: /chat latency with trace export on vs. off the request path.
+
+Runs sequential /chat requests through the real app against a fake LLM,
+with a stand-in telemetry object whose flush() takes --flush-ms (like an
+export round-trip to Keywords AI). Compares the old inline flush with the
+periodic background flush and the opt-in `flush_traces` background task,
+and prints the separately reported trace export metrics.
+
+Usage:
+    python benchmarks/bench_trace_flush.py --chats 10 --flush-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+class SlowTelemetry:
+    def __init__(self, flush_ms: float):
+        self.flush_ms = flush_ms
+
+    def flush(self):
+        time.sleep(self.flush_ms / 1000.0)
+
+
+async def asgi_post(app, path: str, payload: dict):
+    """POST straight into the ASGI app; returns (time to response sent, total time, body).
+
+    Unlike httpx.ASGITransport this separates the moment the response body
+    is sent from the background tasks that run after it.
+    """
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json"),
+                                     (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1), "server": ("agent", 80),
+    }
+    chunks, sent_at = [], None
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()  # never disconnect
+
+    async def send(message):
+        nonlocal sent_at
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                sent_at = time.perf_counter()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return sent_at - start, time.perf_counter() - start, json.loads(b"".join(chunks))
+
+
+async def run(args):
+    from src import server
+    from src.agents import graph
+
+    graph.kw_client = None
+    server.telemetry = SlowTelemetry(args.flush_ms)
+
+    async def measure(label: str, body_extra: dict, before=None):
+        samples, totals = [], []
+        for i in range(args.chats):
+            start = time.perf_counter()
+            if before:
+                await asyncio.to_thread(before)
+            response_at, total, body = await asgi_post(server.api, "/chat", {
+                "message": f"request {i}", "thread_id": f"t-{label}-{i}", **body_extra
+            })
+            assert "response" in body, body
+            samples.append(response_at + (time.perf_counter() - start - total))
+            totals.append(time.perf_counter() - start)
+        print(f"{label:<34} time to response mean={statistics.mean(samples) * 1000:8.1f}ms "
+              f"(incl. background work {statistics.mean(totals) * 1000:8.1f}ms)")
+
+    async with server.lifespan(server.api):
+        # Old behaviour: flush inline before the response is returned
+        await measure("inline flush (old)", {}, before=lambda: server.flush_telemetry("inline"))
+        await measure("periodic background flush", {})
+        await measure("flush_traces=true (after response)", {"flush_traces": True})
+        print("trace_export:", server.trace_export_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--flush-ms", type=float, default=300)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    with FakeLLMServer(latency_ms=args.latency_ms) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "bench-key")
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        os.environ.setdefault("MCP_POOL_ENABLED", "false")
+        asyncio.run(run(args))
@@ -0,0 +1,113 @@
+"""
+Benchmark: MCP stdio transport vs. native REST transport.
+
+Both transports run the same canvas_* tool calls against a local fake
+Canvas server (HTTPS with a throwaway self-signed cert, since the MCP
+server always talks https://). The MCP side needs a built server:
+
+    cd mcp-canvas-lms && npm ci && npm run build
+
+Usage:
+    python benchmarks/bench_transport.py --calls 50 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# The fake server uses a self-signed certificate
+os.environ.setdefault("CANVAS_VERIFY_SSL", "false")
+
+from mcp import StdioServerParameters  # noqa: E402
+
+from fake_canvas import FakeCanvasServer  # noqa: E402
+from src.tools.canvas_transport import MCPTransport, RestTransport  # noqa: E402
+from src.tools.canvas_http import close_canvas_client  # noqa: E402
+from src.tools.mcp_pool import MCPSessionPool  # noqa: E402
+
+CALLS = [
+    ("canvas_list_courses", {"include_ended": False}),
+    ("canvas_list_assignments", {"course_id": 3}),
+    ("canvas_get_submission", {"course_id": 3, "assignment_id": 3001, "user_id": "self"}),
+]
+
+
+def summarize(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"{label:<34} n={len(samples):<5} mean={statistics.mean(samples) * 1000:8.2f}ms "
+          f"p50={statistics.median(samples) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms")
+
+
+async def run_calls(transport, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(i):
+        tool_name, args = CALLS[i % len(CALLS)]
+        async with semaphore:
+            start = time.perf_counter()
+            await transport.call_tool(tool_name, args)
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return samples, time.perf_counter() - start
+
+
+async def main(args):
+    with FakeCanvasServer(latency_ms=args.latency_ms, tls=True) as server:
+        print(f"Fake Canvas at {server.base_url} (latency {args.latency_ms}ms)\n")
+
+        rest = RestTransport(base_url=server.base_url, token="bench-token")
+        await rest.call_tool("canvas_health_check", {})  # warm the connection
+        for concurrency in (1, args.concurrency):
+            samples, wall = await run_calls(rest, args.calls, concurrency)
+            summarize(f"rest  concurrency={concurrency}", samples)
+            print(f"{'':<34} wall={wall * 1000:.1f}ms")
+        await close_canvas_client()
+
+        server_js = os.path.join(ROOT, "mcp-canvas-lms", "build", "index.js")
+        if not os.path.exists(server_js):
+            print("\nSkipping MCP transport: build mcp-canvas-lms first (npm run build)")
+            return
+
+        env = {
+            **os.environ,
+            "CANVAS_API_TOKEN": "bench-token",
+            "CANVAS_DOMAIN": server.host,
+            "NODE_TLS_REJECT_UNAUTHORIZED": "0",
+            "LOG_LEVEL": "error",
+        }
+        pool = MCPSessionPool(
+            size=args.concurrency,
+            health_interval=0,
+            server_params_factory=lambda: StdioServerParameters(command="node", args=[server_js], env=env)
+        )
+        cold = MCPTransport(pool=pool)
+        samples, _ = await run_calls(cold, min(args.calls, 5), 1)
+        summarize("mcp   cold spawn per call", samples)
+
+        await pool.start()
+        try:
+            for concurrency in (1, args.concurrency):
+                samples, wall = await run_calls(cold, args.calls, concurrency)
+                summarize(f"mcp   pooled concurrency={concurrency}", samples)
+                print(f"{'':<34} wall={wall * 1000:.1f}ms")
+        finally:
+            await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    asyncio.run(main(parser.parse_args()))
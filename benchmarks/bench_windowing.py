@@ -0,0 +1,117 @@
+"""
+Benchmark: token-budgeted windows vs. the old `messages[-5:]` slice.
+
+Builds multi-turn Canvas threads (tool calls with large JSON results, drafts,
+routing messages) and, at every hop, compares what each strategy would send:
+- invalid requests: ToolMessages without their AIMessage, or tool calls
+  without all their results
+- turns missing the latest user request
+- history tokens sent and how often the model budget is exceeded
+- time spent building the window
+
+Usage:
+    python benchmarks/bench_windowing.py --threads 20 --turns 15 --result-kb 40
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+
+from src.agents.windowing import (  # noqa: E402
+    count_message_tokens, get_budget, window_messages, window_stats,
+)
+
+
+def canvas_payload(kb: float, rng: random.Random) -> str:
+    items = []
+    while len(json.dumps(items)) < kb * 1024:
+        n = len(items)
+        items.append({"id": 1000 + n, "name": f"Assignment {n}", "due_at": "2026-10-20T23:59:00Z",
+                      "points_possible": rng.choice([10, 20, 100]), "html_url": f"https://canvas/a/{n}",
+                      "description": "<p>" + "Lorem ipsum " * rng.randint(5, 30) + "</p>"})
+    return json.dumps(items)
+
+
+def build_thread(turns: int, result_kb: float, rng: random.Random):
+    """Yield the history as it stands before every LLM hop of the thread."""
+    history = []
+    for turn in range(turns):
+        history.append(HumanMessage(content=f"Turn {turn}: show the assignments in course {turn}"))
+        yield list(history)
+        history.append(AIMessage(content=json.dumps({"next": "Canvas_Executor"})))
+        yield list(history)
+        for call in range(rng.randint(1, 3)):
+            call_id = f"call-{turn}-{call}"
+            history.append(AIMessage(content="", tool_calls=[
+                {"name": "get_course_assignments", "args": {"course_id": str(turn)}, "id": call_id}]))
+            history.append(ToolMessage(content=canvas_payload(result_kb * rng.uniform(0.2, 1.5), rng),
+                                       tool_call_id=call_id))
+            yield list(history)
+        history.append(AIMessage(content=f"Course {turn} has several assignments due soon."))
+        yield list(history)
+
+
+def validity(window):
+    """(valid, has latest human) for an OpenAI chat request built from `window`."""
+    pending = set()
+    valid = True
+    for message in window:
+        if isinstance(message, ToolMessage):
+            if message.tool_call_id not in pending:
+                valid = False
+            pending.discard(message.tool_call_id)
+            continue
+        if pending:
+            valid = False
+        pending = {c["id"] for c in message.tool_calls} if isinstance(message, AIMessage) and message.tool_calls else set()
+    return valid and not pending
+
+
+def run(args):
+    rng = random.Random(7)
+    budget = get_budget(args.model)
+    strategies = {
+        "last 5 messages (old)": lambda h: h[-5:] if len(h) > 5 else h,
+        f"token window ({budget} tok)": lambda h: window_messages(h, args.model),
+    }
+    results = {name: {"invalid": 0, "no_human": 0, "tokens": [], "over": 0, "ms": []} for name in strategies}
+    hops = 0
+    for _ in range(args.threads):
+        for history in build_thread(args.turns, args.result_kb, rng):
+            hops += 1
+            last_human = next(m for m in reversed(history) if isinstance(m, HumanMessage))
+            for name, strategy in strategies.items():
+                start = time.perf_counter()
+                window = strategy(history)
+                results[name]["ms"].append((time.perf_counter() - start) * 1000)
+                tokens = sum(count_message_tokens(m) for m in window)
+                r = results[name]
+                r["tokens"].append(tokens)
+                r["over"] += tokens > budget
+                r["invalid"] += not validity(window)
+                r["no_human"] += last_human not in window
+
+    print(f"{args.threads} threads x {args.turns} turns, {hops} hops, budget {budget} tokens ({args.model})")
+    for name, r in results.items():
+        print(f"{name:<26} invalid={r['invalid']:4d}  missing user turn={r['no_human']:4d}  "
+              f"tokens mean={statistics.mean(r['tokens']):7.0f} max={max(r['tokens']):7d}  "
+              f"over budget={r['over']:4d}  build={statistics.mean(r['ms']):.3f}ms")
+    print("window stats:", window_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=15)
+    parser.add_argument("--result-kb", type=float, default=40)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    run(parser.parse_args())
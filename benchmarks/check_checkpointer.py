@@ -0,0 +1,92 @@
+"""
+Check: persistent checkpointer under concurrent threads and across restarts.
+
+Starts the FastAPI lifespan with CHECKPOINTER=sqlite on a temporary file,
+runs N threads x T turns of /chat concurrently against a fake LLM endpoint,
+then shuts the app down, starts it again on the same file and verifies that
+every thread's history survived with only its own messages in order.
+
+Usage:
+    python benchmarks/check_checkpointer.py --threads 50 --turns 3
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+async def run(args, db_path: str) -> int:
+    import httpx
+    from langchain_core.messages import HumanMessage
+    from src import server
+    from src.agents import graph
+
+    graph.kw_client = None
+    failures = 0
+
+    async def chat(client: httpx.AsyncClient, thread: int, turn: int):
+        response = await client.post("/chat", json={
+            "message": f"thread {thread} turn {turn}",
+            "thread_id": f"ckpt-{thread}",
+            "customer_id": f"customer-{thread}"
+        })
+        return response.json()
+
+    async def thread_run(client, thread):
+        for turn in range(args.turns):
+            await chat(client, thread, turn)
+
+    # First process lifetime: concurrent threads write checkpoints
+    async with server.lifespan(server.api):
+        print(f"checkpointer: {server.checkpointer_manager.stats()}")
+        transport = httpx.ASGITransport(app=server.api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://agent", timeout=120) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(thread_run(client, t) for t in range(args.threads)))
+            wall = time.perf_counter() - start
+    print(f"{args.threads} threads x {args.turns} turns, wall={wall:.2f}s, db={os.path.getsize(db_path) / 1e3:.0f}KB")
+
+    # Second lifetime on the same file: history must be read back from disk
+    async with server.lifespan(server.api):
+        for thread in range(args.threads):
+            config = {"configurable": {"thread_id": f"ckpt-{thread}"}}
+            snapshot = await server.app.aget_state(config)
+            humans = [m.content for m in snapshot.values.get("messages", []) if isinstance(m, HumanMessage)]
+            expected = [f"thread {thread} turn {turn}" for turn in range(args.turns)]
+            if humans != expected:
+                failures += 1
+                print(f"[FAIL] thread {thread} history {humans}, expected {expected}")
+
+    print(f"restart: {args.threads - failures}/{args.threads} threads restored intact, failures={failures}")
+    return failures
+
+
+def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+    os.environ["CHECKPOINTER"] = "sqlite"
+    os.environ["CHECKPOINT_SQLITE_PATH"] = db_path
+    os.environ["MCP_POOL_ENABLED"] = "false"
+    os.environ["EXECUTOR_PREBUILD"] = "false"
+    with FakeLLMServer(latency_ms=args.latency_ms) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "check-key")
+        os.environ.setdefault("OPENAI_API_KEY", "check-key")
+        failures = asyncio.run(run(args, db_path))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+Concurrency check: parallel /chat requests keep their identities separate.
+
+Runs N concurrent /chat requests through the real FastAPI app and agent
+graph against a fake LLM endpoint. Every LLM call the graph makes must
+carry the customer/thread headers of the request whose message it is
+answering, and every response must belong to its own request.
+
+Usage:
+    python benchmarks/check_request_context.py --chats 200
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+async def run(args, llm: FakeLLMServer) -> int:
+    import httpx
+    from src import server
+    from src.agents import graph
+
+    # Only the LLM traffic is under test; keep remote score logging out of it
+    graph.kw_client = None
+
+    async def chat(client: httpx.AsyncClient, i: int):
+        response = await client.post("/chat", json={
+            "message": f"request {i}",
+            "thread_id": f"thread-{i}",
+            "customer_id": f"customer-{i}"
+        })
+        return i, response.json()
+
+    transport = httpx.ASGITransport(app=server.api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agent", timeout=120) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(chat(client, i) for i in range(args.chats)))
+        wall = time.perf_counter() - start
+
+    failures = 0
+    for i, body in results:
+        if body.get("response") != f"Draft for: request {i}":
+            failures += 1
+            print(f"[FAIL] chat {i} got response {body}")
+
+    for call in llm.requests:
+        headers = {k.lower(): v for k, v in call["headers"].items()}
+        user_messages = [m.get("content") or "" for m in call["body"]["messages"] if m.get("role") == "user"]
+        match = re.search(r"request (\d+)", user_messages[-1] if user_messages else "")
+        if not match:
+            continue
+        i = match.group(1)
+        expected = (f"customer-{i}", f"thread-{i}")
+        actual = (headers.get("x-keywords-customer-id"), headers.get("x-keywords-thread-id"))
+        if actual != expected:
+            failures += 1
+            print(f"[FAIL] LLM call for request {i} carried {actual}, expected {expected}")
+
+    print(f"{args.chats} concurrent chats, {len(llm.requests)} LLM calls, wall={wall:.2f}s, failures={failures}")
+    return failures
+
+
+def main(args):
+    with FakeLLMServer(latency_ms=args.latency_ms) as llm:
+        os.environ["KEYWORDSAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("KEYWORDSAI_API_KEY", "check-key")
+        os.environ.setdefault("OPENAI_API_KEY", "check-key")
+        failures = asyncio.run(run(args, llm))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,246 @@
+"""
+Local fake Canvas REST server for benchmarks.
+
+Serves a deterministic data set (courses, assignments, modules, quizzes,
+announcements, pages, syllabus, profile) with Canvas-style Link header pagination and an
+optional per-request latency. Runs in a background thread; pass a cert/key
+pair to serve HTTPS (needed by the MCP server, which always uses https://).
+"""
+
+import json
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import os
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+def make_course(course_id: int) -> dict:
+    return {
+        "id": course_id,
+        "name": f"Course {course_id}",
+        "course_code": f"C{course_id}",
+        "workflow_state": "available",
+        "enrollment_term_id": 1,
+        "term": {"id": 1, "name": "Fall"},
+        "total_students": 30,
+        "html_url": f"https://canvas.example/courses/{course_id}",
+        "start_at": "2024-08-20T00:00:00Z",
+        "end_at": "2024-12-20T00:00:00Z",
+        "public_description": "x" * 200,
+    }
+
+
+def make_assignment(course_id: int, assignment_id: int) -> dict:
+    return {
+        "id": assignment_id,
+        "course_id": course_id,
+        "name": f"Assignment {assignment_id}",
+        "description": "<p>" + "Lorem ipsum dolor sit amet. " * 20 + "</p>",
+        "due_at": f"2024-10-{(assignment_id % 28) + 1:02d}T23:59:00Z",
+        "points_possible": 10,
+        "workflow_state": "published",
+        "published": True,
+        "submission_types": ["online_text_entry"],
+        "html_url": f"https://canvas.example/courses/{course_id}/assignments/{assignment_id}",
+        "updated_at": "2024-09-01T00:00:00Z",
+    }
+
+
+FILLER = ("Students should review the weekly readings before each session and bring questions to the "
+          "discussion. Group work is encouraged for practice problems but each submission must be individual. ")
+
+
+def make_page(course_id: int, index: int, title: str = None, body: str = None) -> dict:
+    title = title or f"Week {index} notes"
+    url = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+    return {
+        "page_id": course_id * 100 + index,
+        "url": url,
+        "title": title,
+        "body": body or "<h2>" + title + "</h2>" + ("<p>" + FILLER * 4 + "</p>") * 10,
+        "updated_at": "2024-09-01T00:00:00Z",
+        "published": True,
+        "html_url": f"https://canvas.example/courses/{course_id}/pages/{url}",
+    }
+
+
+class FakeCanvasData:
+    """In-memory data set served by the fake server."""
+
+    def __init__(self, courses: int = 25, assignments_per_course: int = 15, pages_per_course: int = 0):
+        self.courses = [make_course(i) for i in range(1, courses + 1)]
+        self.assignments_per_course = assignments_per_course
+        self.pages_per_course = pages_per_course
+        self.syllabus_body = "<h1>Syllabus</h1>" + "<p>Week plan.</p>" * 50
+        self.request_count = 0
+
+    def assignments(self, course_id: int):
+        base = course_id * 1000
+        return [make_assignment(course_id, base + i) for i in range(1, self.assignments_per_course + 1)]
+
+    def pages(self, course_id: int):
+        return [make_page(course_id, i) for i in range(1, self.pages_per_course + 1)]
+
+    def announcements(self, course_id: int):
+        return [{"id": course_id * 100 + i, "title": f"Announcement {i}", "message": "<p>" + FILLER + "</p>",
+                 "posted_at": f"2024-10-{i:02d}T12:00:00Z",
+                 "html_url": f"https://canvas.example/courses/{course_id}/discussion_topics/{course_id * 100 + i}"}
+                for i in range(1, 6)]
+
+
+def _handler_factory(data: FakeCanvasData, latency: float, scheme_host: dict):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # noqa: A003 - silence request logging
+            pass
+
+        def _send_json(self, payload, status: int = 200, link: Optional[str] = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if link:
+                self.send_header("Link", link)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _paginate(self, items, query, path):
+            per_page = int(query.get("per_page", ["10"])[0])
+            page = int(query.get("page", ["1"])[0])
+            last = max(1, -(-len(items) // per_page))
+            start = (page - 1) * per_page
+            chunk = items[start:start + per_page]
+
+            def page_url(n):
+                params = {k: v for k, v in query.items() if k != "page"}
+                params["page"] = [str(n)]
+                return f"{scheme_host['base']}{path}?{urllib.parse.urlencode(params, doseq=True)}"
+
+            links = [f'<{page_url(page)}>; rel="current"', f'<{page_url(1)}>; rel="first"',
+                     f'<{page_url(last)}>; rel="last"']
+            if page < last:
+                links.append(f'<{page_url(page + 1)}>; rel="next"')
+            return chunk, ", ".join(links)
+
+        def _route(self, method: str):
+            data.request_count += 1
+            if latency:
+                time.sleep(latency)
+            parsed = urllib.parse.urlparse(self.path)
+            path, query = parsed.path, urllib.parse.parse_qs(parsed.query)
+
+            if path == "/api/v1/users/self/profile":
+                return self._send_json({"id": 1, "name": "Bench User", "primary_email": "bench@example.com"})
+            if path == "/api/v1/courses":
+                chunk, link = self._paginate(data.courses, query, path)
+                return self._send_json(chunk, link=link)
+            match = re.fullmatch(r"/api/v1/courses/(\d+)/assignments", path)
+            if match and method == "GET":
+                chunk, link = self._paginate(data.assignments(int(match.group(1))), query, path)
+                return self._send_json(chunk, link=link)
+            if match and method == "POST":
+                return self._send_json(make_assignment(int(match.group(1)), 999999))
+            match = re.fullmatch(r"/api/v1/courses/(\d+)/pages", path)
+            if match:
+                pages = [{k: v for k, v in p.items() if k != "body"} for p in data.pages(int(match.group(1)))]
+                chunk, link = self._paginate(pages, query, path)
+                return self._send_json(chunk, link=link)
+            match = re.fullmatch(r"/api/v1/courses/(\d+)/pages/([\w-]+)", path)
+            if match:
+                page = next((p for p in data.pages(int(match.group(1))) if p["url"] == match.group(2)), None)
+                return self._send_json(page) if page else self._send_json(
+                    {"errors": [{"message": "page not found"}]}, status=404)
+            match = re.fullmatch(r"/api/v1/courses/(\d+)/discussion_topics", path)
+            if match and query.get("only_announcements") == ["true"]:
+                chunk, link = self._paginate(data.announcements(int(match.group(1))), query, path)
+                return self._send_json(chunk, link=link)
+            match = re.fullmatch(r"/api/v1/courses/(\d+)/(modules|quizzes|discussion_topics|rubrics)", path)
+            if match:
+                items = [{"id": i, "name": f"{match.group(2)} {i}", "title": f"{match.group(2)} {i}"}
+                         for i in range(1, 11)]
+                chunk, link = self._paginate(items, query, path)
+                return self._send_json(chunk, link=link)
+            match = re.fullmatch(r"/api/v1/courses/(\d+)", path)
+            if match:
+                course = make_course(int(match.group(1)))
+                course["syllabus_body"] = data.syllabus_body
+                return self._send_json(course)
+            match = re.fullmatch(r"/api/v1/courses/(\d+)/assignments/(\d+)/submissions/(\w+)", path)
+            if match:
+                return self._send_json({"id": 1, "assignment_id": int(match.group(2)), "grade": "A",
+                                        "workflow_state": "graded"})
+            if path == "/api/v1/dashboard/dashboard_cards":
+                return self._send_json([{"id": c["id"], "shortName": c["name"]} for c in data.courses[:10]])
+            if path == "/api/v1/planner/items":
+                return self._send_json([{"plannable_id": i, "plannable_type": "assignment"} for i in range(10)])
+            return self._send_json({"errors": [{"message": "not found"}]}, status=404)
+
+        def do_GET(self):  # noqa: N802
+            self._route("GET")
+
+        def do_POST(self):  # noqa: N802
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._route("POST")
+
+        def do_PUT(self):  # noqa: N802
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._route("PUT")
+
+    return Handler
+
+
+def make_self_signed_cert() -> Tuple[str, str]:
+    """Create a throwaway cert/key pair with the openssl CLI."""
+    tmp = tempfile.mkdtemp(prefix="fake-canvas-")
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+class FakeCanvasServer:
+    """Run the fake Canvas API on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, data: FakeCanvasData = None, latency_ms: float = 0, tls: bool = False):
+        self.data = data or FakeCanvasData()
+        self.latency = latency_ms / 1000.0
+        self.tls = tls
+        self._scheme_host = {"base": ""}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{'https' if self.tls else 'http'}://{self.host}"
+
+    def __enter__(self) -> "FakeCanvasServer":
+        handler = _handler_factory(self.data, self.latency, self._scheme_host)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        if self.tls:
+            cert, key = make_self_signed_cert()
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert, key)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self._scheme_host["base"] = self.base_url
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
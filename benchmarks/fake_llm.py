@@ -0,0 +1,135 @@
+"""
+Local fake OpenAI-compatible chat completions server for benchmarks.
+
+Answers POST /chat/completions like the Keywords AI gateway would, with
+scripted replies per agent (recognized from the system prompt), an optional
+latency, streaming ("stream": true, word by word), and a record of every
+request's headers and body so checks can inspect what the agent sent. Point the agent at it with
+KEYWORDSAI_BASE_URL=<server.base_url>.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+
+def default_reply(body: Dict[str, Any]) -> str:
+    """Supervisor -> Content_Specialist -> Supervisor(FINISH); others echo the user."""
+    messages = body.get("messages", [])
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    last_user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if system.startswith("You are the Supervisor"):
+        if messages and messages[-1].get("role") == "user":
+            return json.dumps({"next": "Content_Specialist"})
+        return json.dumps({"next": "FINISH"})
+    return f"Draft for: {last_user}"
+
+
+class FakeLLMServer:
+    """Run the fake chat completions API on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, latency_ms: float = 0, reply: Callable[[Dict[str, Any]], Any] = default_reply,
+                 token_delay_ms: float = 0):
+        self.latency = latency_ms / 1000.0
+        self.token_delay = token_delay_ms / 1000.0
+        self.reply = reply
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):  # noqa: A003 - silence request logging
+                pass
+
+            def do_POST(self):  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                with fake._lock:
+                    fake.requests.append({"headers": dict(self.headers), "body": body})
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                reply = fake.reply(body)
+                message = reply if isinstance(reply, dict) else {"role": "assistant", "content": reply}
+                message.setdefault("role", "assistant")
+                if body.get("stream"):
+                    return self._stream(body, message)
+                if fake.token_delay:
+                    # Same generation time as streaming, just delivered at once
+                    time.sleep(fake.token_delay * len((message.get("content") or "").split(" ")))
+                payload = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, message):
+                """Send the reply as chat.completion.chunk SSE events (word by word)."""
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def emit(delta, finish_reason=None):
+                    data = json.dumps({
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                    })
+                    self._write_chunk(f"data: {data}\n\n".encode())
+
+                emit({"role": "assistant", "content": ""})
+                if message.get("tool_calls"):
+                    emit({"tool_calls": [{**call, "index": i} for i, call in enumerate(message["tool_calls"])]})
+                    emit({}, "tool_calls")
+                else:
+                    words = (message.get("content") or "").split(" ")
+                    for i, word in enumerate(words):
+                        if fake.token_delay:
+                            time.sleep(fake.token_delay)
+                        emit({"content": word if i == 0 else " " + word})
+                    emit({}, "stop")
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def __enter__(self) -> "FakeLLMServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,417 @@
+"""
+Checkpoint retention, expiry and tool-result blob offloading.
+
+Every super-step writes a checkpoint per thread and nothing was ever removed,
+so the checkpoint store grew with every hop of every conversation, large
+tool payloads included. This module keeps it bounded:
+- Tool results longer than TOOL_BLOB_MIN_CHARS are moved out of the graph
+  state into a content-addressed blob store (a `tool_blobs` table next to
+  the checkpoints, keyed by sha256, so repeated payloads are stored once).
+  The state keeps a short preview and the digest; the current turn's
+  results are restored before the window is built
+- A background job (CheckpointCompactor) periodically keeps only the last
+  CHECKPOINT_KEEP_LAST checkpoints per thread (plus their pending writes),
+  deletes threads idle for CHECKPOINT_THREAD_TTL_DAYS, and drops blobs not
+  used within the same TTL. Bytes reclaimed are reported in /api/metrics
+
+SQLite reuses the freed pages rather than shrinking the file (no VACUUM on
+the request path); the WAL is truncated after each run.
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.checkpoint.base.id import UUID
+
+
+# Tool results longer than this are stored as blobs (0 disables offloading)
+TOOL_BLOB_MIN_CHARS = int(os.getenv("TOOL_BLOB_MIN_CHARS", "4000"))
+TOOL_BLOB_PREVIEW_CHARS = int(os.getenv("TOOL_BLOB_PREVIEW_CHARS", "500"))
+TOOL_BLOB_CACHE_SIZE = int(os.getenv("TOOL_BLOB_CACHE_SIZE", "256"))
+# Checkpoints kept per thread (0 keeps all)
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+# Threads (and blobs) unused for this long are deleted (0 never expires)
+CHECKPOINT_THREAD_TTL_DAYS = float(os.getenv("CHECKPOINT_THREAD_TTL_DAYS", "30"))
+# Seconds between compaction runs (0 disables the background job)
+CHECKPOINT_COMPACTION_INTERVAL = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "3600"))
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time a checkpoint was written (checkpoint ids are uuid6)."""
+    try:
+        uuid = UUID(checkpoint_id)
+        if uuid.version != 6:
+            return None
+        return (uuid.time - _UUID_EPOCH_OFFSET) / 1e7
+    except (ValueError, TypeError):
+        return None
+
+
+class ToolBlobStore:
+    """Content-addressed store for large tool results, in the checkpoint database."""
+
+    def __init__(self, cache_size: int = TOOL_BLOB_CACHE_SIZE):
+        self.backend: Optional[str] = None
+        self.saver: Any = None
+        self.connection: Any = None
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._memory: Dict[str, List[Any]] = {}  # digest -> [body, last_used]
+        self._touched: Dict[str, float] = {}
+        self.stats_counters = {"offloaded": 0, "offloaded_chars": 0, "restored": 0, "missing": 0}
+
+    async def start(self, manager) -> None:
+        """Attach to the opened checkpointer (see checkpointing.checkpointer_manager)."""
+        self.backend, self.saver, self.connection = manager.backend, manager.saver, manager.connection
+        if self.backend == "sqlite":
+            async with self.saver.lock:
+                await self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS tool_blobs (digest TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                    "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+                )
+                await self.connection.commit()
+        elif self.backend == "postgres":
+            async with self.connection.connection() as conn:
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS tool_blobs (digest TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                    "size INTEGER NOT NULL, last_used DOUBLE PRECISION NOT NULL)"
+                )
+
+    def close(self) -> None:
+        self.backend = self.saver = self.connection = None
+
+    def _remember(self, digest: str, body: str) -> None:
+        self._cache[digest] = body
+        self._cache.move_to_end(digest)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def put(self, body: str) -> str:
+        """Store `body` (once per content) and return its digest."""
+        digest = hashlib.sha256(body.encode()).hexdigest()
+        now = time.time()
+        if self.backend == "sqlite":
+            async with self.saver.lock:
+                await self.connection.execute(
+                    "INSERT INTO tool_blobs (digest, body, size, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(digest) DO UPDATE SET last_used = excluded.last_used",
+                    (digest, body, len(body), now)
+                )
+                await self.connection.commit()
+        elif self.backend == "postgres":
+            async with self.connection.connection() as conn:
+                await conn.execute(
+                    "INSERT INTO tool_blobs (digest, body, size, last_used) VALUES (%s, %s, %s, %s) "
+                    "ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used",
+                    (digest, body, len(body), now)
+                )
+        else:
+            self._memory[digest] = [body, now]
+        self._remember(digest, body)
+        return digest
+
+    async def get(self, digest: str) -> Optional[str]:
+        """Blob body, or None if it was never stored or has expired."""
+        self._touched[digest] = time.time()
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return self._cache[digest]
+        body = None
+        if self.backend == "sqlite":
+            async with self.connection.execute("SELECT body FROM tool_blobs WHERE digest = ?", (digest,)) as cur:
+                row = await cur.fetchone()
+            body = row[0] if row else None
+        elif self.backend == "postgres":
+            async with self.connection.connection() as conn:
+                cur = await conn.execute("SELECT body FROM tool_blobs WHERE digest = %s", (digest,))
+                row = await cur.fetchone()
+            body = row["body"] if row else None
+        elif digest in self._memory:
+            body = self._memory[digest][0]
+        if body is not None:
+            self._remember(digest, body)
+        return body
+
+    async def offload(self, messages: Sequence[Any]) -> List[Any]:
+        """Replace large ToolMessage bodies with a preview and a blob reference."""
+        if not TOOL_BLOB_MIN_CHARS:
+            return list(messages)
+        result = []
+        for message in messages:
+            content = getattr(message, "content", None)
+            if isinstance(message, ToolMessage) and isinstance(content, str) and len(content) > TOOL_BLOB_MIN_CHARS:
+                try:
+                    digest = await self.put(content)
+                except Exception as e:
+                    print(f"[CHECKPOINT] Blob offload failed, keeping the result inline: {e}", file=sys.stderr)
+                    result.append(message)
+                    continue
+                preview = content[:TOOL_BLOB_PREVIEW_CHARS].rstrip()
+                message = message.model_copy(update={
+                    "content": f"{preview}\n[... {len(content) - len(preview)} more characters stored as blob {digest[:12]}]",
+                    "additional_kwargs": {**message.additional_kwargs, "blob": digest, "blob_chars": len(content)}
+                })
+                self.stats_counters["offloaded"] += 1
+                self.stats_counters["offloaded_chars"] += len(content)
+            result.append(message)
+        return result
+
+    async def restore_current_turn(self, messages: Sequence[Any]) -> List[Any]:
+        """Put the blob bodies back into the tool results of the latest turn.
+
+        Older turns keep the preview: the window would clip them anyway and
+        projected results carry a get_full_canvas_record reference.
+        """
+        start = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+        if not any("blob" in getattr(m, "additional_kwargs", {}) for m in messages[start:]):
+            return list(messages)
+        restored = list(messages[:start])
+        for message in messages[start:]:
+            digest = getattr(message, "additional_kwargs", {}).get("blob")
+            if digest:
+                body = await self.get(digest)
+                if body is None:
+                    self.stats_counters["missing"] += 1
+                else:
+                    message = message.model_copy(update={"content": body})
+                    self.stats_counters["restored"] += 1
+            restored.append(message)
+        return restored
+
+    async def collect(self, cutoff: float) -> Dict[str, int]:
+        """Record recent reads and delete blobs unused since `cutoff`."""
+        touched, self._touched = self._touched, {}
+        removed = reclaimed = 0
+        if self.backend == "sqlite":
+            async with self.saver.lock:
+                await self.connection.executemany(
+                    "UPDATE tool_blobs SET last_used = MAX(last_used, ?) WHERE digest = ?",
+                    [(ts, digest) for digest, ts in touched.items()]
+                )
+                async with self.connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tool_blobs WHERE last_used < ?", (cutoff,)
+                ) as cur:
+                    removed, reclaimed = await cur.fetchone()
+                await self.connection.execute("DELETE FROM tool_blobs WHERE last_used < ?", (cutoff,))
+                await self.connection.commit()
+        elif self.backend == "postgres":
+            async with self.connection.connection() as conn:
+                for digest, ts in touched.items():
+                    await conn.execute(
+                        "UPDATE tool_blobs SET last_used = GREATEST(last_used, %s) WHERE digest = %s", (ts, digest)
+                    )
+                cur = await conn.execute(
+                    "DELETE FROM tool_blobs WHERE last_used < %s RETURNING size", (cutoff,)
+                )
+                sizes = [row["size"] for row in await cur.fetchall()]
+                removed, reclaimed = len(sizes), sum(sizes)
+        else:
+            for digest, ts in touched.items():
+                if digest in self._memory:
+                    self._memory[digest][1] = max(self._memory[digest][1], ts)
+            for digest in [d for d, (_, used) in self._memory.items() if used < cutoff]:
+                reclaimed += len(self._memory.pop(digest)[0])
+                removed += 1
+        return {"blobs_deleted": removed, "blob_bytes": reclaimed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.stats_counters, "cached": len(self._cache)}
+
+
+class CheckpointCompactor:
+    """Background retention and expiry for the opened checkpointer."""
+
+    def __init__(self, blobs: ToolBlobStore, keep_last: int = CHECKPOINT_KEEP_LAST,
+                 ttl_days: float = CHECKPOINT_THREAD_TTL_DAYS, interval: float = CHECKPOINT_COMPACTION_INTERVAL):
+        self.blobs = blobs
+        self.keep_last = keep_last
+        self.ttl_days = ttl_days
+        self.interval = interval
+        self.manager = None
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+        self.totals = {"runs": 0, "errors": 0, "checkpoints_deleted": 0, "writes_deleted": 0,
+                       "threads_expired": 0, "blobs_deleted": 0, "bytes_reclaimed": 0}
+        self.last_run: Dict[str, Any] = {}
+
+    async def start(self, manager) -> None:
+        """Attach to the opened checkpointer and start the periodic job."""
+        self.manager = manager
+        await self.blobs.start(manager)
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        async with self._run_lock:
+            self.blobs.close()
+            self.manager = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    async def run_once(self) -> Dict[str, Any]:
+        """One compaction pass; returns what it removed."""
+        async with self._run_lock:
+            if self.manager is None or self.manager.saver is None:
+                return {}
+            start = time.perf_counter()
+            backend, saver = self.manager.backend, self.manager.saver
+            result = {"checkpoints_deleted": 0, "writes_deleted": 0, "threads_expired": 0,
+                      "blobs_deleted": 0, "bytes_reclaimed": 0}
+            try:
+                if self.ttl_days > 0:
+                    cutoff = time.time() - self.ttl_days * 86400
+                    for thread_id in await self._idle_threads(backend, saver, cutoff):
+                        await saver.adelete_thread(thread_id)
+                        result["threads_expired"] += 1
+                    blobs = await self.blobs.collect(cutoff)
+                    result["blobs_deleted"] = blobs["blobs_deleted"]
+                    result["bytes_reclaimed"] += blobs["blob_bytes"]
+                if self.keep_last > 0:
+                    prune = {"sqlite": self._prune_sqlite, "postgres": self._prune_postgres}.get(backend, self._prune_memory)
+                    checkpoints, writes, reclaimed = await prune(saver)
+                    result["checkpoints_deleted"] = checkpoints
+                    result["writes_deleted"] = writes
+                    result["bytes_reclaimed"] += reclaimed
+            except Exception as e:
+                self.totals["errors"] += 1
+                print(f"[CHECKPOINT] Compaction failed: {type(e).__name__}: {e}", file=sys.stderr)
+            self.totals["runs"] += 1
+            for key, value in result.items():
+                self.totals[key] += value
+            self.last_run = {**result, "duration_ms": round((time.perf_counter() - start) * 1000, 1), "at": time.time()}
+            if result["checkpoints_deleted"] or result["threads_expired"] or result["blobs_deleted"]:
+                print(f"[CHECKPOINT] Compaction: {result}", file=sys.stderr)
+            return result
+
+    async def _idle_threads(self, backend: str, saver: Any, cutoff: float) -> List[str]:
+        if backend == "sqlite":
+            async with saver.conn.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id") as cur:
+                latest = await cur.fetchall()
+        elif backend == "postgres":
+            async with self.manager.connection.connection() as conn:
+                cur = await conn.execute(
+                    "SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id FROM checkpoints GROUP BY thread_id"
+                )
+                latest = [(row["thread_id"], row["checkpoint_id"]) for row in await cur.fetchall()]
+        else:
+            latest = [(thread_id, max(cid for ns in namespaces.values() for cid in ns))
+                      for thread_id, namespaces in list(saver.storage.items())
+                      if any(namespaces.values())]
+        idle = []
+        for thread_id, checkpoint_id in latest:
+            written = checkpoint_time(checkpoint_id)
+            if written is not None and written < cutoff:
+                idle.append(thread_id)
+        return idle
+
+    async def _prune_sqlite(self, saver: Any):
+        conn = saver.conn
+        # Checkpoint ids are time-ordered (uuid6), newest first per thread/namespace
+        ranked = ("SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns "
+                  "ORDER BY checkpoint_id DESC) AS rn FROM checkpoints) WHERE rn > ?")
+        orphan_writes = ("FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id "
+                         "AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)")
+        async with saver.lock:
+            async with conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) "
+                f"FROM checkpoints WHERE rowid IN ({ranked})", (self.keep_last,)
+            ) as cur:
+                checkpoints, checkpoint_bytes = await cur.fetchone()
+            await conn.execute(f"DELETE FROM checkpoints WHERE rowid IN ({ranked})", (self.keep_last,))
+            async with conn.execute(f"SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) {orphan_writes}") as cur:
+                writes, write_bytes = await cur.fetchone()
+            await conn.execute(f"DELETE {orphan_writes}")
+            await conn.commit()
+            await conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return checkpoints, writes, checkpoint_bytes + write_bytes
+
+    async def _prune_postgres(self, saver: Any):
+        ranked = ("SELECT thread_id, checkpoint_ns, checkpoint_id FROM (SELECT thread_id, checkpoint_ns, checkpoint_id, "
+                  "ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn "
+                  "FROM checkpoints) ranked WHERE rn > %s")
+        async with self.manager.connection.connection() as conn:
+            cur = await conn.execute(
+                f"DELETE FROM checkpoints WHERE (thread_id, checkpoint_ns, checkpoint_id) IN ({ranked}) "
+                f"RETURNING thread_id, checkpoint_ns, pg_column_size(checkpoint) + pg_column_size(metadata) AS size",
+                (self.keep_last,)
+            )
+            pruned = await cur.fetchall()
+            sizes = [row["size"] for row in pruned]
+            cur = await conn.execute(
+                "DELETE FROM checkpoint_writes w WHERE NOT EXISTS (SELECT 1 FROM checkpoints c "
+                "WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns "
+                "AND c.checkpoint_id = w.checkpoint_id) RETURNING octet_length(w.blob) AS size"
+            )
+            write_sizes = [row["size"] or 0 for row in await cur.fetchall()]
+            # Channel values of the pruned threads older than the oldest checkpoint kept. aput writes a
+            # checkpoint's blobs before its row, so unreferenced blobs elsewhere may belong to a checkpoint
+            # still being written; new versions sort after every kept one (zero-padded version strings).
+            blob_sizes = []
+            pairs = sorted({(row["thread_id"], row["checkpoint_ns"]) for row in pruned})
+            if pairs:
+                cur = await conn.execute(
+                    "DELETE FROM checkpoint_blobs b "
+                    "WHERE (b.thread_id, b.checkpoint_ns) IN (SELECT * FROM unnest(%s::text[], %s::text[])) "
+                    "AND b.version < (SELECT MIN(c.checkpoint -> 'channel_versions' ->> b.channel) FROM checkpoints c "
+                    "WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns) "
+                    "RETURNING octet_length(b.blob) AS size",
+                    ([thread_id for thread_id, _ in pairs], [ns for _, ns in pairs])
+                )
+                blob_sizes = [row["size"] or 0 for row in await cur.fetchall()]
+        return len(sizes), len(write_sizes), sum(sizes) + sum(write_sizes) + sum(blob_sizes)
+
+    async def _prune_memory(self, saver: Any):
+        checkpoints = writes = reclaimed = 0
+        referenced = set()
+        for thread_id, namespaces in list(saver.storage.items()):
+            for ns, stored in list(namespaces.items()):
+                ids = sorted(stored, reverse=True)
+                for checkpoint_id in ids[self.keep_last:]:
+                    checkpoint, metadata, _ = stored.pop(checkpoint_id)
+                    reclaimed += len(checkpoint[1]) + len(metadata[1])
+                    checkpoints += 1
+                    for write in saver.writes.pop((thread_id, ns, checkpoint_id), {}).values():
+                        reclaimed += len(write[2][1]) if isinstance(write[2], tuple) else 0
+                        writes += 1
+                for checkpoint_id in ids[:self.keep_last]:
+                    versions = saver.serde.loads_typed(stored[checkpoint_id][0]).get("channel_versions", {})
+                    referenced.update((thread_id, ns, channel, version) for channel, version in versions.items())
+        for key in [k for k in saver.blobs if k not in referenced]:
+            reclaimed += len(saver.blobs.pop(key)[1])
+        return checkpoints, writes, reclaimed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.manager.backend if self.manager else None,
+            "keep_last": self.keep_last,
+            "ttl_days": self.ttl_days,
+            "interval_s": self.interval,
+            **self.totals,
+            "last_run": self.last_run,
+            "tool_blobs": self.blobs.stats()
+        }
+
+
+tool_blobs = ToolBlobStore()
+checkpoint_compactor = CheckpointCompactor(tool_blobs)
+
+
+def get_maintenance_stats() -> Dict[str, Any]:
+    """Compaction and blob offload counters (for /api/metrics)."""
+    return checkpoint_compactor.stats()
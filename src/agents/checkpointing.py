@@ -0,0 +1,171 @@
+"""
+Persistent LangGraph checkpointer, opened lazily inside the running event loop.
+
+The async savers need a running loop (connection pools, aiosqlite), so they
+cannot be created when src/agents/graph.py is imported. Instead the FastAPI
+lifespan (or the CLI) calls `checkpointer_manager.start()` and recompiles
+the graph against the returned saver:
+- postgres: AsyncPostgresSaver over a psycopg AsyncConnectionPool with
+  prepared statements disabled (required behind PgBouncer / the Supabase
+  transaction pooler) and autocommit
+- sqlite: AsyncSqliteSaver on one aiosqlite connection in WAL mode, for
+  single-node deployments
+- memory: MemorySaver (no persistence)
+
+CHECKPOINTER=auto picks postgres when SUPABASE_DATABASE_URL is set and the
+driver is installed, else sqlite, else memory.
+"""
+
+import os
+import sys
+from typing import Any, Dict, Optional
+
+try:
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg_pool import AsyncConnectionPool
+    from psycopg.rows import dict_row
+    POSTGRES_AVAILABLE = True
+except ImportError:
+    POSTGRES_AVAILABLE = False
+
+try:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+from langgraph.checkpoint.memory import MemorySaver
+
+
+CHECKPOINTER = os.getenv("CHECKPOINTER", "auto").lower()
+CHECKPOINT_SQLITE_PATH = os.getenv(
+    "CHECKPOINT_SQLITE_PATH", os.path.join(os.path.dirname(__file__), "checkpoints.db")
+)
+CHECKPOINT_PG_MIN_SIZE = int(os.getenv("CHECKPOINT_PG_MIN_SIZE", "1"))
+CHECKPOINT_PG_MAX_SIZE = int(os.getenv("CHECKPOINT_PG_MAX_SIZE", "10"))
+CHECKPOINT_PG_TIMEOUT = float(os.getenv("CHECKPOINT_PG_TIMEOUT", "10"))
+CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def resolve_backend(kind: str = None, database_url: str = None) -> str:
+    """Backend to use for CHECKPOINTER (auto resolves to what is configured and installed)."""
+    kind = (kind or CHECKPOINTER).lower()
+    database_url = database_url if database_url is not None else os.getenv("SUPABASE_DATABASE_URL")
+    if kind == "auto":
+        if database_url and POSTGRES_AVAILABLE:
+            return "postgres"
+        if SQLITE_AVAILABLE:
+            return "sqlite"
+        return "memory"
+    if kind == "postgres" and not POSTGRES_AVAILABLE:
+        print("[WARNING] CHECKPOINTER=postgres but langgraph-checkpoint-postgres/psycopg are not installed", file=sys.stderr)
+        print("[INFO] Install: pip install langgraph-checkpoint-postgres psycopg psycopg-pool", file=sys.stderr)
+        return "memory"
+    if kind == "sqlite" and not SQLITE_AVAILABLE:
+        print("[WARNING] CHECKPOINTER=sqlite but langgraph-checkpoint-sqlite is not installed", file=sys.stderr)
+        print("[INFO] Install: pip install langgraph-checkpoint-sqlite", file=sys.stderr)
+        return "memory"
+    return kind if kind in ("postgres", "sqlite", "memory") else "memory"
+
+
+class CheckpointerManager:
+    """Owns the checkpointer and its connections for the lifetime of the app."""
+
+    def __init__(self):
+        self.backend: Optional[str] = None
+        self.saver: Any = None
+        self._pool = None
+        self._conn = None
+
+    @property
+    def started(self) -> bool:
+        return self.saver is not None
+
+    @property
+    def connection(self) -> Any:
+        """Postgres pool or SQLite connection behind the saver (None for memory)."""
+        return self._pool if self._pool is not None else self._conn
+
+    async def start(self, kind: str = None, database_url: str = None, sqlite_path: str = None):
+        """Open the configured checkpointer (idempotent) and return it.
+
+        Falls back to MemorySaver if the database cannot be reached, so the
+        app still serves requests (without persistence).
+        """
+        if self.saver is not None:
+            return self.saver
+
+        database_url = database_url if database_url is not None else os.getenv("SUPABASE_DATABASE_URL")
+        backend = resolve_backend(kind, database_url)
+        try:
+            if backend == "postgres":
+                self.saver = await self._open_postgres(database_url)
+            elif backend == "sqlite":
+                self.saver = await self._open_sqlite(sqlite_path or CHECKPOINT_SQLITE_PATH)
+        except Exception as e:
+            print(f"[ERROR] {backend} checkpointer failed ({type(e).__name__}: {e}), using in-memory checkpointing",
+                  file=sys.stderr)
+            await self.close()
+            backend = "memory"
+
+        if self.saver is None:
+            print("[WARNING] No persistent storage available; conversations will not survive restarts", file=sys.stderr)
+            self.saver = MemorySaver()
+            backend = "memory"
+        self.backend = backend
+        return self.saver
+
+    async def _open_postgres(self, database_url: str):
+        print("[INFO] Opening PostgreSQL checkpointer (prepared statements disabled for PgBouncer)", file=sys.stderr)
+        self._pool = AsyncConnectionPool(
+            conninfo=database_url,
+            kwargs={
+                "prepare_threshold": None,  # Supabase transaction pooler: no server-side prepared statements
+                "autocommit": True,
+                "row_factory": dict_row
+            },
+            min_size=CHECKPOINT_PG_MIN_SIZE,
+            max_size=CHECKPOINT_PG_MAX_SIZE,
+            timeout=CHECKPOINT_PG_TIMEOUT,
+            open=False
+        )
+        await self._pool.open(wait=True, timeout=CHECKPOINT_PG_TIMEOUT)
+        saver = AsyncPostgresSaver(self._pool)
+        await saver.setup()
+        host = database_url.split("@")[1] if "@" in database_url else "database"
+        print(f"[SUCCESS] Supabase Persistence Active (PostgreSQL) at {host}", file=sys.stderr)
+        return saver
+
+    async def _open_sqlite(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = await aiosqlite.connect(path)
+        # WAL: readers don't block the writer; NORMAL sync is durable enough with WAL
+        await self._conn.execute("PRAGMA journal_mode=WAL")
+        await self._conn.execute("PRAGMA synchronous=NORMAL")
+        await self._conn.execute(f"PRAGMA busy_timeout={CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS}")
+        saver = AsyncSqliteSaver(self._conn)
+        await saver.setup()
+        print(f"[SUCCESS] SQLite Persistence Active ({path}, WAL)", file=sys.stderr)
+        return saver
+
+    async def close(self) -> None:
+        """Close the pool / connection (called on shutdown)."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        self.saver = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"backend": self.backend, "started": self.started}
+        if self._pool is not None:
+            pool_stats = self._pool.get_stats()
+            stats["pool"] = {k: pool_stats.get(k) for k in ("pool_size", "pool_available", "requests_waiting")}
+        return stats
+
+
+checkpointer_manager = CheckpointerManager()
@@ -0,0 +1,56 @@
+"""
+Per-request context for the agent (customer/thread identifiers, metadata).
+
+The context lives in a ContextVar, so every /chat request (each running in
+its own asyncio task) sees only its own values, including inside graph
+nodes and tools, which inherit the context of the task that started the run.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, Optional
+
+
+_request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
+
+
+def set_request_context(customer_identifier: str = None, thread_identifier: str = None, metadata: dict = None) -> Token:
+    """Set the request context for the current task (and tasks it spawns).
+
+    Returns:
+        Token that can be passed to reset_request_context to restore the previous context.
+    """
+    return _request_context.set({
+        "customer_identifier": customer_identifier,
+        "thread_identifier": thread_identifier,
+        "metadata": dict(metadata or {})
+    })
+
+
+def get_request_context() -> dict:
+    """Get the current request context (empty values outside a request)."""
+    ctx = _request_context.get()
+    if ctx is None:
+        return {"customer_identifier": None, "thread_identifier": None, "metadata": {}}
+    return ctx
+
+
+def reset_request_context(token: Token) -> None:
+    """Restore the context that was active before set_request_context."""
+    _request_context.reset(token)
+
+
+@contextmanager
+def request_context(customer_identifier: str = None, thread_identifier: str = None,
+                    metadata: dict = None) -> Iterator[dict]:
+    """Scope a request context to a block.
+
+    Example:
+        with request_context(customer_identifier="u1", thread_identifier="t1"):
+            await app.ainvoke(...)
+    """
+    token = set_request_context(customer_identifier, thread_identifier, metadata)
+    try:
+        yield get_request_context()
+    finally:
+        reset_request_context(token)
@@ -2,13 +2,13 @@ import asyncio
 import os
 import sys
 import json
-from typing import TypedDict, Literal
+from typing import Annotated, TypedDict, Literal
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import create_react_agent
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode, create_react_agent
 print("DEBUG: after langgraph imports", file=sys.stderr)
 
 # Keywords AI tracing - task decorator for individual agent nodes
@@ -23,23 +23,22 @@ except ImportError:
             return func
         return decorator
 
-# Import checkpointers (will try multiple options)
-try:
-    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-    POSTGRES_AVAILABLE = True
-except ImportError:
-    POSTGRES_AVAILABLE = False
-
-try:
-    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-    SQLITE_AVAILABLE = True
-except ImportError:
-    SQLITE_AVAILABLE = False
-
 # Import all_tools from the tools module
 from src.agents.tools import all_tools
 from src.keywordsai_utils import KeywordsAIClient, determine_model_complexity
 from src.agents.prompt_templates import CANVAS_EXECUTOR_PROMPT, SUPERVISOR_PROMPT, CONTENT_SPECIALIST_PROMPT
+# Request context is per-task (contextvars); re-exported for existing importers
+from src.agents.context import set_request_context, get_request_context, reset_request_context  # noqa: F401
+from src.agents.llm_registry import llm_registry, executor_registry
+from src.agents.router import fast_route, routing_message
+from src.agents.tool_selector import select_tools, tool_selector
+from src.agents.tool_scheduler import schedule_tool_call, tool_scheduling
+from src.agents.run_memo import run_memoization
+from src.memory.canvas_mirror import canvas_mirror
+from src.memory.content_index import content_index
+from src.agents.windowing import running_summary, window_messages
+from src.agents.checkpointing import checkpointer_manager
+from src.agents.checkpoint_maintenance import checkpoint_compactor, tool_blobs
 
 # Initialize Keywords AI Client
 try:
@@ -53,62 +52,56 @@ load_dotenv()
 
 # Define the AgentState
 class AgentState(TypedDict):
-    """State for the multi-agent system."""
-    messages: list
-    next: str
+    """State for the multi-agent system.
 
+    `messages` is append-only: nodes return just the messages they add and
+    the add_messages reducer appends them (no full-history copies per hop).
+    `summary` is the running summary of the messages that no longer fit the
+    context window; it covers the history up to the message with id
+    `summary_last_id`, which is message number `summary_count`.
+    """
+    messages: Annotated[list, add_messages]
+    next: str
+    summary: str
+    summary_count: int
+    summary_last_id: str
 
-# Thread-local storage for request context (customer_id, thread_id)
-_request_context = {}
 
+async def history_window(state: AgentState, model_name: str) -> list:
+    """Token-budgeted history for a node's LLM call.
 
-def set_request_context(customer_identifier: str = None, thread_identifier: str = None, metadata: dict = None):
-    """Set the request context for Keywords AI tracking."""
-    global _request_context
-    _request_context = {
-        "customer_identifier": customer_identifier,
-        "thread_identifier": thread_identifier,
-        "metadata": metadata or {}
-    }
+    Restores the current turn's tool results from the blob store and puts the
+    thread's running summary in front of the window when turns were dropped.
+    """
+    messages = await tool_blobs.restore_current_turn(state["messages"])
+    return window_messages(
+        messages, model_name,
+        thread_id=get_request_context().get("thread_identifier"),
+        summary=(state.get("summary") or "", state.get("summary_count") or 0, state.get("summary_last_id"))
+    )
 
 
-def get_request_context() -> dict:
-    """Get the current request context."""
-    return _request_context
+def summary_update(state: AgentState) -> dict:
+    """State fields for a running summary newer than the persisted one."""
+    thread_id = get_request_context().get("thread_identifier")
+    latest = running_summary.latest(thread_id) if thread_id else None
+    if latest and latest[1] > (state.get("summary_count") or 0):
+        return {"summary": latest[0], "summary_count": latest[1], "summary_last_id": latest[2]}
+    return {}
 
 
 # Initialize Keywords AI LLM
 def create_llm(agent_name: str = "default", model_name: str = "gpt-4o-mini"):
-    """Create and return the Keywords AI LLM instance with tracing.
+    """Return the Keywords AI LLM instance for an agent, with tracing.
+
+    Clients are built once per (agent, model) and reused; the per-request
+    customer/thread headers are added when each call is sent.
 
     Args:
         agent_name: Name of the agent for tracing purposes (supervisor, executor, specialist)
         model_name: Name of the model to use
     """
-    # Get current request context for metadata
-    ctx = get_request_context()
-
-    # Build headers with Keywords AI specific parameters
-    # These are passed via headers for LangChain compatibility
-    headers = {
-        'X-Keywords-Source': 'CanvasAI-MultiAgent',
-        'X-Keywords-Cache-TTL': '3600',  # Semantic cache for 1 hour
-        'X-Keywords-Agent': agent_name  # Track which agent is making the call
-    }
-
-    # Add customer/thread identifiers to headers if available
-    if ctx.get("customer_identifier"):
-        headers['X-Keywords-Customer-Id'] = ctx["customer_identifier"]
-    if ctx.get("thread_identifier"):
-        headers['X-Keywords-Thread-Id'] = ctx["thread_identifier"]
-
-    return ChatOpenAI(
-        base_url=os.getenv('KEYWORDSAI_BASE_URL', 'https://api.keywordsai.co/api/'),
-        api_key=os.getenv('KEYWORDSAI_API_KEY'),
-        model=model_name,
-        temperature=0,
-        default_headers=headers
-    )
+    return llm_registry.get(agent_name, model_name)
 
 # Pre-initialize both models to avoid overhead
 fast_llm = create_llm(model_name="gpt-4o-mini")
@@ -116,7 +109,7 @@ smart_llm = create_llm(model_name="gpt-4o")
 
 
 # Node 1: Canvas_Executor - ReAct agent with all tools
-def create_canvas_executor(llm):
+def create_canvas_executor(llm, tools=None):
     """Create the Canvas Executor agent with all tools."""
     
     # Use centralized prompt from templates
@@ -124,9 +117,33 @@ def create_canvas_executor(llm):
 
     # Create ReAct agent with specific system prompt
     # Note: Using 'prompt' parameter for system instructions
-    # OPTIMIZATION: Removed 'all_tools' to prevent full tool schema injection for simple queries.
-    # We should only inject relevant tools, but for now, let's keep it simple.
-    return create_react_agent(llm, all_tools, prompt=system_prompt)
+    # Callers pass the per-request tool subset (see tool_selector) to keep
+    # the tool schema block small; all_tools is the fallback. Tool calls of
+    # one model message run concurrently, writes in order (see tool_scheduler).
+    tool_node = ToolNode(tools if tools is not None else all_tools, awrap_tool_call=schedule_tool_call)
+    return create_react_agent(llm, tool_node, prompt=system_prompt)
+
+
+def get_canvas_executor(model_name: str, tools=None):
+    """Compiled Canvas Executor for a model, reused across turns and requests."""
+    tools = tools if tools is not None else all_tools
+    return executor_registry.get(
+        model_name, "Canvas_Executor", tools,
+        build=lambda: create_canvas_executor(create_llm(agent_name="Canvas_Executor", model_name=model_name), tools)
+    )
+
+
+def prebuild_canvas_executors(models=("gpt-4o-mini", "gpt-4o")) -> int:
+    """Compile executors for the common tool subsets ahead of the first request.
+
+    Returns:
+        Number of executors compiled (or already cached)
+    """
+    subsets = tool_selector.common_subsets() + [all_tools]
+    for model_name in models:
+        for tools in subsets:
+            get_canvas_executor(model_name, tools)
+    return len(models) * len(subsets)
 
 
 @task(name="Canvas_Executor")
@@ -140,25 +157,25 @@ async def canvas_executor_node(state: AgentState) -> AgentState:
     
     model_choice = determine_model_complexity(input_text)
     
-    # Use smart_llm for complex tasks, otherwise fast_llm
-    # But we need to ensure the agent name is correct for tracing
-    # Since fast_llm/smart_llm are pre-initialized with "default" or "gpt-4o-mini",
-    # we might want to create a new instance with the correct agent name OR just use them.
-    # For tracing to be perfect, we should ideally create a new one, but for performance, reuse.
-    # Let's create a new one to keep tracing correct (overhead is minimal compared to LLM call).
-    
-    selected_llm = create_llm(agent_name="Canvas_Executor", model_name=model_choice)
+    # Use smart_llm for complex tasks, otherwise fast_llm. The executor (LLM
+    # client + compiled ReAct graph) is built once per model and reused.
     print(f"[EXECUTOR] Using model: {model_choice} for input: '{input_text[:30]}...'", file=sys.stderr)
 
-    executor = create_canvas_executor(selected_llm)
+    # Only bind the tools this request can need (smaller prompt, faster calls)
+    tools = select_tools(input_text)
+    print(f"[EXECUTOR] Binding {len(tools)}/{len(all_tools)} tools", file=sys.stderr)
+    executor = get_canvas_executor(model_choice, tools)
 
-    # Run the executor agent
-    # OPTIMIZATION: Only pass the last 5 messages to reduce context window and latency
-    # This prevents the agent from re-reading the entire conversation history every time
-    recent_messages = state["messages"][-5:] if len(state["messages"]) > 5 else state["messages"]
-    
-    result = await executor.ainvoke({"messages": recent_messages})
-    print(f"[EXECUTOR] Completed, returning {len(result['messages'])} messages", file=sys.stderr)
+    # Run the executor agent on a token-budgeted window of the history
+    # (tool-call groups kept whole, latest user request always included)
+    recent_messages = await history_window(state, model_choice)
+
+    with tool_scheduling():
+        result = await executor.ainvoke({"messages": recent_messages})
+    # Only the messages the executor added; the window may hold a summary message.
+    # Large tool results go to the blob store instead of every later checkpoint
+    new_messages = await tool_blobs.offload(result["messages"][len(recent_messages):])
+    print(f"[EXECUTOR] Completed, adding {len(new_messages)} messages", file=sys.stderr)
 
     # Debug: Log the last message from executor
     if result.get("messages"):
@@ -170,7 +187,7 @@ async def canvas_executor_node(state: AgentState) -> AgentState:
             print(f"[EXECUTOR] Last message type: {msg_type}, content preview: {preview}", file=sys.stderr)
 
     return {
-        "messages": result["messages"],
+        "messages": new_messages,
         "next": "supervisor"
     }
 
@@ -196,9 +213,8 @@ async def content_specialist_node(state: AgentState) -> AgentState:
         content=CONTENT_SPECIALIST_PROMPT
     )
 
-    # Combine system prompt with existing messages
-    # OPTIMIZATION: Only use last 5 messages + system prompt
-    recent_messages = state["messages"][-5:] if len(state["messages"]) > 5 else state["messages"]
+    # Combine system prompt with a token-budgeted window of the history
+    recent_messages = await history_window(state, model_choice)
     messages = [system_prompt] + recent_messages
 
     # Get response from LLM
@@ -211,16 +227,18 @@ async def content_specialist_node(state: AgentState) -> AgentState:
         if "error" in response.content.lower():
             score = 0.0
             
+        ctx = get_request_context()
         kw_client.log_with_score(
             input_messages=[{"role": "user", "content": "Draft content"}], # Simplified for log
             output_message={"role": "assistant", "content": response.content},
             score=score,
             score_name="content_quality",
-            metadata={"agent": "Content_Specialist"}
+            customer_identifier=ctx.get("customer_identifier"),
+            metadata={"agent": "Content_Specialist", "thread_identifier": ctx.get("thread_identifier")}
         )
 
     return {
-        "messages": state["messages"] + [response],
+        "messages": [response],
         "next": "supervisor"
     }
 
@@ -230,7 +248,17 @@ async def content_specialist_node(state: AgentState) -> AgentState:
 async def supervisor_node(state: AgentState) -> AgentState:
     """Supervisor node - routes to appropriate worker or finishes."""
     print(f"[SUPERVISOR] Processing {len(state['messages'])} messages", file=sys.stderr)
-    
+
+    # Obvious first hops and FINISH decisions are made locally, without an LLM call
+    decision = fast_route(state["messages"])
+    if decision is not None:
+        print(f"[SUPERVISOR] Fast path ({decision.reason}): routing to {decision.next}", file=sys.stderr)
+        return {
+            "messages": [routing_message(decision)],
+            "next": decision.next,
+            **summary_update(state)
+        }
+
     # Supervisor is a router, usually fast model is enough
     # But if routing logic is complex, we might want smart model
     # For now, stick to default (which is usually mini) unless we want to make it dynamic too.
@@ -242,9 +270,8 @@ async def supervisor_node(state: AgentState) -> AgentState:
         content=SUPERVISOR_PROMPT
     )
 
-    # Combine system prompt with existing messages
-    # OPTIMIZATION: Only use last 5 messages + system prompt
-    recent_messages = state["messages"][-5:] if len(state["messages"]) > 5 else state["messages"]
+    # Combine system prompt with a token-budgeted window of the history
+    recent_messages = await history_window(state, "gpt-4o-mini")
     messages = [system_prompt] + recent_messages
 
     # Get routing decision from supervisor
@@ -270,8 +297,9 @@ async def supervisor_node(state: AgentState) -> AgentState:
     print(f"[SUPERVISOR] Routing to: {next_step}", file=sys.stderr)
 
     return {
-        "messages": state["messages"] + [response],
-        "next": next_step
+        "messages": [response],
+        "next": next_step,
+        **summary_update(state)
     }
 
 
@@ -296,9 +324,13 @@ def route_back_to_supervisor(state: AgentState) -> Literal["supervisor"]:
 
 
 # Create the graph
-def create_agent_app():
+def create_agent_app(checkpointer=None):
     print("DEBUG: create_agent_app start", file=sys.stderr)
-    """Create and return the multi-agent supervisor graph."""
+    """Create and return the multi-agent supervisor graph.
+
+    Args:
+        checkpointer: Opened LangGraph checkpointer (in-memory when None)
+    """
     # Create the state graph
     workflow = StateGraph(AgentState)
 
@@ -326,81 +358,10 @@ def create_agent_app():
     # Set entry point
     workflow.set_entry_point("supervisor")
 
-    # Setup persistent checkpointer
-    checkpointer = None
-    database_url = os.getenv('SUPABASE_DATABASE_URL')
-
-    # NOTE: Async checkpointers (AsyncPostgresSaver, AsyncSqliteSaver) cannot be initialized
-    # at module import time because there's no running event loop.
-    # For now, we'll use MemorySaver. TODO: Implement lazy async checkpointer initialization.
-
-    # Try PostgreSQL first (if URL is provided and package is available)
-    if False and database_url and POSTGRES_AVAILABLE:
-        try:
-            print("[INFO] Attempting PostgreSQL connection to Supabase...", file=sys.stderr)
-            print("[INFO] Disabling prepared statements for PgBouncer compatibility", file=sys.stderr)
-
-            # Import async connection pool for async server compatibility
-            from psycopg_pool import AsyncConnectionPool
-            from psycopg.rows import dict_row
-
-            # Create async connection pool with prepare_threshold=None and open=False
-            # This is REQUIRED for Supabase Transaction Pooler (port 6543) to avoid DuplicatePreparedStatement errors
-            # open=False prevents auto-opening which requires an event loop
-            pool = AsyncConnectionPool(
-                conninfo=database_url,
-                kwargs={
-                    "prepare_threshold": None,  # Disable prepared statements for PgBouncer
-                    "autocommit": True,
-                    "row_factory": dict_row
-                },
-                min_size=1,
-                max_size=10,
-                open=False  # Don't auto-open at creation time
-            )
-
-            # Create async checkpointer with the pool
-            # The pool will open automatically when first used in an async context
-            checkpointer = AsyncPostgresSaver(pool)
-
-            # Note: checkpointer.setup() will be called automatically by LangGraph when needed
-
-            print("[SUCCESS] Supabase Persistence Active (PostgreSQL)", file=sys.stderr)
-            print(f"[INFO] Connected to: {database_url.split('@')[1] if '@' in database_url else 'database'}", file=sys.stderr)
-            print("[INFO] Using async connection pool with prepared statements disabled", file=sys.stderr)
-        except Exception as e:
-            print("[ERROR] PostgreSQL Connection Failed", file=sys.stderr)
-            print(f"[ERROR] Error Type: {type(e).__name__}", file=sys.stderr)
-            print(f"[ERROR] Details: {str(e)}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-            checkpointer = None
-
-    # Try SQLite as fallback (local file persistence)
-    if False and checkpointer is None and SQLITE_AVAILABLE:
-        try:
-            print("[INFO] Using SQLite for local persistence...", file=sys.stderr)
-            sqlite_path = os.path.join(os.path.dirname(__file__), "checkpoints.db")
-
-            # Use AsyncSqliteSaver for async compatibility
-            checkpointer = AsyncSqliteSaver.from_conn_string(sqlite_path)
-
-            print("[SUCCESS] SQLite Persistence Active", file=sys.stderr)
-            print(f"[INFO] Checkpoint database: {sqlite_path}", file=sys.stderr)
-        except Exception as e:
-            print(f"[ERROR] SQLite Setup Failed: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-            checkpointer = None
-
-    # Final fallback to in-memory (no persistence)
+    # Async checkpointers need a running event loop, so at import time the
+    # graph is compiled with MemorySaver; the server lifespan / CLI recompile
+    # it against checkpointer_manager.start() (see src/agents/checkpointing.py)
     if checkpointer is None:
-        print("[WARNING] No persistent storage available", file=sys.stderr)
-        if database_url and not POSTGRES_AVAILABLE:
-            print("[INFO] Install: pip install langgraph-checkpoint-postgres psycopg psycopg-binary", file=sys.stderr)
-        elif not SQLITE_AVAILABLE:
-            print("[INFO] Install: pip install langgraph-checkpoint-sqlite", file=sys.stderr)
-        print("[INFO] Using in-memory checkpointing (conversations will not persist)", file=sys.stderr)
         from langgraph.checkpoint.memory import MemorySaver
         checkpointer = MemorySaver()
 
@@ -422,6 +383,9 @@ async def main():
         print("Agent app failed to initialize.")
         return
 
+    agent = create_agent_app(await checkpointer_manager.start())
+    await checkpoint_compactor.start(checkpointer_manager)
+
     print("Multi-Agent Canvas LMS System ready! Type 'quit' or 'exit' to stop.")
 
     # Configuration for the thread
@@ -444,12 +408,15 @@ async def main():
                 "next": ""
             }
 
-            # Run the agent
-            final_state = await app.ainvoke(initial_state, config=config)
+            # Run the agent (repeated reads within the run are answered once)
+            with run_memoization():
+                final_state = await agent.ainvoke(initial_state, config=config)
 
             # Get the last AI message
             if final_state.get("messages"):
                 for msg in reversed(final_state["messages"]):
+                    if isinstance(msg, HumanMessage):
+                        break  # earlier turns of the thread
                     if isinstance(msg, AIMessage):
                         # Skip supervisor routing messages (JSON)
                         try:
@@ -465,6 +432,11 @@ async def main():
         except Exception as e:
             print(f"\nError: {e}\n")
 
+    await canvas_mirror.close()
+    await content_index.close()
+    await checkpoint_compactor.close()
+    await checkpointer_manager.close()
+
 
 if __name__ == '__main__':
     # Use ProactorEventLoop on Windows for subprocesses
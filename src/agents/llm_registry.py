@@ -0,0 +1,156 @@
+"""
+Prebuilt LLM clients and compiled ReAct executors, reused across turns.
+
+Building a ChatOpenAI instance (and its HTTP client) or compiling a ReAct
+subgraph over ~60 tool schemas on every graph hop is pure overhead, so:
+- LLM clients are cached per (agent, model). Every client shares one
+  httpx.AsyncClient whose request hook adds the per-request Keywords AI
+  headers (customer/thread id) from the request context at send time,
+  instead of baking them into default_headers
+- Compiled executors are cached per (model, agent, tool set), LRU-bounded;
+  the Canvas_Executor is given per-request tool subsets, so the common ones
+  are prebuilt at startup
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from src.agents.context import get_request_context
+
+
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+EXECUTOR_CACHE_SIZE = int(os.getenv("EXECUTOR_CACHE_SIZE", "64"))
+# Compile executors for the common tool subsets at startup (server lifespan)
+EXECUTOR_PREBUILD = os.getenv("EXECUTOR_PREBUILD", "true").lower() == "true"
+
+# Static Keywords AI headers; per-request ones are added by _inject_request_headers
+BASE_HEADERS = {
+    'X-Keywords-Source': 'CanvasAI-MultiAgent',
+    'X-Keywords-Cache-TTL': '3600',  # Semantic cache for 1 hour
+}
+
+
+async def _inject_request_headers(request: httpx.Request) -> None:
+    """httpx request hook: tag each LLM call with the current request's identifiers."""
+    ctx = get_request_context()
+    for header, key in (("X-Keywords-Customer-Id", "customer_identifier"),
+                        ("X-Keywords-Thread-Id", "thread_identifier")):
+        if ctx.get(key):
+            request.headers[header] = str(ctx[key])
+        elif header in request.headers:
+            del request.headers[header]
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_llm_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client used by every ChatOpenAI instance."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE
+            ),
+            event_hooks={"request": [_inject_request_headers]}
+        )
+    return _http_client
+
+
+def build_llm(agent_name: str = "default", model_name: str = "gpt-4o-mini") -> ChatOpenAI:
+    """Build a Keywords AI LLM client for an agent (uncached)."""
+    return ChatOpenAI(
+        base_url=os.getenv('KEYWORDSAI_BASE_URL', 'https://api.keywordsai.co/api/'),
+        api_key=os.getenv('KEYWORDSAI_API_KEY'),
+        model=model_name,
+        temperature=0,
+        default_headers={**BASE_HEADERS, 'X-Keywords-Agent': agent_name},  # Track which agent is making the call
+        http_async_client=get_llm_http_client()
+    )
+
+
+class LLMRegistry:
+    """One ChatOpenAI instance per (agent, model), created on first use."""
+
+    def __init__(self, factory: Callable[[str, str], Any] = build_llm):
+        self.factory = factory
+        self._llms: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "builds": 0}
+
+    def get(self, agent_name: str = "default", model_name: str = "gpt-4o-mini"):
+        key = (agent_name, model_name)
+        llm = self._llms.get(key)
+        if llm is not None:
+            self._stats["hits"] += 1
+            return llm
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = self.factory(agent_name, model_name)
+                self._llms[key] = llm
+                self._stats["builds"] += 1
+                print(f"[LLM] Built client for agent={agent_name} model={model_name}", file=sys.stderr)
+        return llm
+
+    def clear(self) -> None:
+        self._llms.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "clients": sorted(f"{a}/{m}" for a, m in self._llms)}
+
+
+class ExecutorRegistry:
+    """Compiled ReAct executors per (model, agent, tool set), LRU-bounded."""
+
+    def __init__(self, max_size: int = EXECUTOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._executors: "OrderedDict[Tuple[str, str, Tuple[str, ...]], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "builds": 0, "evictions": 0}
+
+    def get(self, model_name: str, agent_name: str, tools: Sequence[Any], build: Callable[[], Any]):
+        """Return the executor for this combination, compiling it with `build()` on a miss."""
+        key = (model_name, agent_name, tuple(sorted(t.name if hasattr(t, "name") else str(t) for t in tools)))
+        with self._lock:
+            executor = self._executors.get(key)
+            if executor is not None:
+                self._executors.move_to_end(key)
+                self._stats["hits"] += 1
+                return executor
+            executor = build()
+            self._executors[key] = executor
+            self._stats["builds"] += 1
+            while len(self._executors) > self.max_size:
+                self._executors.popitem(last=False)
+                self._stats["evictions"] += 1
+        print(f"[LLM] Compiled {agent_name} executor for {model_name} with {len(tools)} tools", file=sys.stderr)
+        return executor
+
+    def clear(self) -> None:
+        self._executors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "size": len(self._executors), "max_size": self.max_size}
+
+
+llm_registry = LLMRegistry()
+executor_registry = ExecutorRegistry()
+
+
+async def close_llm_clients() -> None:
+    """Close the shared LLM HTTP client (called from the FastAPI lifespan)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    llm_registry.clear()
+    executor_registry.clear()
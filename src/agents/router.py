@@ -0,0 +1,188 @@
+"""
+Deterministic fast-path routing ahead of the Supervisor LLM.
+
+The Supervisor only ever answers {"next": ...}. For the common cases that
+answer is obvious from the request itself, so it is decided locally:
+- First hop: the last message is the user's, and its verbs match exactly one
+  worker's trigger words from SUPERVISOR_PROMPT (e.g. "list my courses" ->
+  Canvas_Executor, "draft a rubric" -> Content_Specialist)
+- FINISH: exactly one worker has run since the user's message, it was the
+  worker the request called for, and it ended with a plain answer (e.g. a
+  tool result summarized for a pure read request)
+
+Anything mixed, multi-step or unusual returns None and the Supervisor LLM
+decides as before.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+ROUTER_FAST_PATH = os.getenv("ROUTER_FAST_PATH", "true").lower() == "true"
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+
+# Trigger words from SUPERVISOR_PROMPT plus close synonyms
+EXECUTOR_READ_TRIGGERS = {
+    "list", "check", "find", "show", "get", "view", "see", "fetch", "display", "lookup",
+}
+EXECUTOR_WRITE_TRIGGERS = {
+    "create", "update", "send", "post", "delete", "remove", "publish", "unpublish",
+    "grade", "upload", "schedule", "rename", "move", "add", "edit", "change",
+}
+CONTENT_TRIGGERS = {
+    "draft", "write", "compose", "analyze", "analyse", "summarize", "summarise",
+    "explain", "rewrite", "proofread", "brainstorm", "outline", "nudge", "critique",
+}
+# Questions about Canvas data ("what are my courses", "when is ... due")
+READ_QUESTION = re.compile(r"^\s*(what|which|when|how many|do i have|are there|is there)\b")
+CANVAS_NOUNS = re.compile(
+    r"\b(courses?|assignments?|announcements?|modules?|submissions?|grades?|quiz(zes)?|"
+    r"deadlines?|due|calendar|planner|discussions?|students?|enrollments?|syllabus|pages?|files?)\b"
+)
+# Requests describing several steps (or derived from a document) are left to the Supervisor
+MULTI_STEP = re.compile(
+    r"\b(then|after that|afterwards|and also|once (that|it)'?s? done|followed by|"
+    r"based on|for each|from (it|them|this|that)|syllabus)\b"
+)
+WORD = re.compile(r"[a-z']+")
+
+
+@dataclass
+class RouteDecision:
+    """A locally made routing decision."""
+    next: str
+    reason: str
+    confidence: float
+
+
+@dataclass
+class Intent:
+    """Which worker(s) a user request calls for."""
+    executor_read: bool
+    executor_write: bool
+    content: bool
+    multi_step: bool
+
+    @property
+    def executor(self) -> bool:
+        return self.executor_read or self.executor_write
+
+
+def classify_intent(text: str) -> Intent:
+    """Match a user request against the worker trigger words."""
+    lowered = (text or "").lower()
+    words = set(WORD.findall(lowered))
+    read = bool(words & EXECUTOR_READ_TRIGGERS) or bool(READ_QUESTION.search(lowered) and CANVAS_NOUNS.search(lowered))
+    return Intent(
+        executor_read=read,
+        executor_write=bool(words & EXECUTOR_WRITE_TRIGGERS),
+        content=bool(words & CONTENT_TRIGGERS),
+        multi_step=bool(MULTI_STEP.search(lowered)),
+    )
+
+
+def parse_route(content: Any) -> Optional[str]:
+    """The `next` value of a supervisor routing message, or None for other content."""
+    if not isinstance(content, str) or "next" not in content:
+        return None
+    text = content.strip()
+    if "```" in text:
+        text = text.split("```")[1]
+        text = text[4:] if text.startswith("json") else text
+    try:
+        parsed = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    return parsed.get("next") if isinstance(parsed, dict) else None
+
+
+def _first_hop(intent: Intent) -> Optional[RouteDecision]:
+    if intent.executor and not intent.content:
+        kind = "read" if not intent.executor_write else "action"
+        confidence = 0.6 if intent.multi_step else 0.9
+        return RouteDecision("Canvas_Executor", f"{kind} request", confidence)
+    if intent.content and not intent.executor:
+        confidence = 0.6 if intent.multi_step else 0.9
+        return RouteDecision("Content_Specialist", "drafting request", confidence)
+    return None
+
+
+def _finish(intent: Intent, workers: List[str], last: Any) -> Optional[RouteDecision]:
+    if len(workers) != 1 or intent.multi_step:
+        return None
+    if not isinstance(last, AIMessage) or last.tool_calls or parse_route(last.content) is not None:
+        return None
+    if not isinstance(last.content, str) or not last.content.strip():
+        return None
+
+    worker = workers[0]
+    if worker == "Canvas_Executor" and intent.executor and not intent.content:
+        if intent.executor_write and not intent.executor_read:
+            # A single action reported back (created, updated, sent ...)
+            return RouteDecision("FINISH", "action completed", 0.85)
+        if not intent.executor_write:
+            return RouteDecision("FINISH", "read request answered", 0.95)
+        return None
+    if worker == "Content_Specialist" and intent.content and not intent.executor:
+        return RouteDecision("FINISH", "draft delivered", 0.9)
+    return None
+
+
+def fast_route(messages: List[Any]) -> Optional[RouteDecision]:
+    """Decide the next hop without an LLM, or return None to defer to the Supervisor.
+
+    Args:
+        messages: The graph state's messages
+
+    Returns:
+        RouteDecision when confident (>= ROUTER_MIN_CONFIDENCE), else None
+    """
+    if not ROUTER_FAST_PATH or not messages:
+        return None
+
+    human_index = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+    if human_index is None:
+        return None
+    intent = classify_intent(messages[human_index].content)
+    since_human = messages[human_index + 1:]
+
+    if not since_human:
+        decision = _first_hop(intent)
+    else:
+        # Workers dispatched since the user's message, from the routing messages
+        workers = [r for r in (parse_route(getattr(m, "content", None)) for m in since_human if isinstance(m, AIMessage)) if r]
+        decision = _finish(intent, workers, since_human[-1])
+
+    if decision is None or decision.confidence < ROUTER_MIN_CONFIDENCE:
+        router_stats["deferred"] += 1
+        return None
+    router_stats["first_hop" if decision.next != "FINISH" else "finish"] += 1
+    return decision
+
+
+def routing_message(decision: RouteDecision) -> AIMessage:
+    """The routing message a fast-path decision adds to the transcript (same shape as the Supervisor's)."""
+    return AIMessage(
+        content=json.dumps({"next": decision.next}),
+        response_metadata={"router": "fast_path", "reason": decision.reason}
+    )
+
+
+router_stats: Dict[str, int] = {"first_hop": 0, "finish": 0, "deferred": 0}
+
+
+def get_router_stats() -> Dict[str, Any]:
+    """Fast-path decisions vs. Supervisor LLM fallbacks (for /api/metrics)."""
+    decided = router_stats["first_hop"] + router_stats["finish"]
+    total = decided + router_stats["deferred"]
+    return {
+        **router_stats,
+        "enabled": ROUTER_FAST_PATH,
+        "llm_calls_saved": decided,
+        "fast_path_rate": round(decided / total, 3) if total else 0.0,
+    }
@@ -0,0 +1,162 @@
+"""
+Per-run memoization of idempotent Canvas tool results.
+
+The executor prompt tells the model to resolve course names with
+get_canvas_courses before acting, so a multi-step request ("create 3
+assignments in History 101") looks the same course list up again on every
+step of one graph run. The response cache does not cover this when it is
+disabled, when the tool has no TTL, or once an entry expires mid-run.
+
+A RunMemo is scoped to one graph run through a ContextVar (graph nodes and
+tool calls inherit it from the task that started the run). run_mcp_tool
+consults it before the response cache:
+- read results are memoized by (user, tool, normalized arguments) for the
+  rest of the run; error text is never memoized
+- a write drops the memoized reads it may have changed, with the same
+  WRITE_INVALIDATES map and course scoping as the response cache
+- when the run ends, a report of calls and deduplicated calls is logged
+  and added to the process-wide totals (for /api/metrics)
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from src.tools.tool_cache import WRITE_INVALIDATES, _cacheable, cache_identity, is_write_tool, normalize_args
+
+
+RUN_MEMO_ENABLED = os.getenv("RUN_MEMO_ENABLED", "true").lower() == "true"
+
+
+class RunMemo:
+    """Read results of one graph run, keyed by user, tool and arguments."""
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, str, str], Tuple[str, Optional[int], str]] = {}
+        self.calls = 0
+        self.deduplicated = 0
+        self.invalidated = 0
+        self.by_tool: Dict[str, int] = {}
+
+    @staticmethod
+    def _key(identity: str, tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str, str]:
+        return identity, tool_name, repr(sorted(arguments.items()))
+
+    async def call(self, tool_name: str, arguments: Optional[Dict[str, Any]],
+                   fetch: Callable[[], Awaitable[str]]) -> str:
+        """Return the tool result, fetching reads at most once per run.
+
+        Args:
+            tool_name: Canvas tool name (e.g. "canvas_list_courses")
+            arguments: Tool arguments
+            fetch: Zero-argument coroutine factory for the uncached call
+                (the response cache / transport path)
+        """
+        self.calls += 1
+        identity = cache_identity()
+        arguments = normalize_args(arguments)
+
+        if is_write_tool(tool_name):
+            result = await fetch()
+            self.invalidate_for_write(tool_name, arguments, identity)
+            return result
+
+        key = self._key(identity, tool_name, arguments)
+        entry = self._results.get(key)
+        if entry is not None:
+            self.deduplicated += 1
+            self.by_tool[tool_name] = self.by_tool.get(tool_name, 0) + 1
+            return entry[2]
+
+        value = await fetch()
+        if _cacheable(value):
+            self._results[key] = (tool_name, arguments.get("course_id"), value)
+        return value
+
+    def invalidate_for_write(self, tool_name: str, arguments: Dict[str, Any], identity: str) -> int:
+        """Drop the memoized reads a write may have changed (all of them for unknown writes)."""
+        targets = WRITE_INVALIDATES.get(tool_name)
+        course_id = arguments.get("course_id")
+        stale = [
+            key for key, (read_tool, read_course, _) in self._results.items()
+            if key[0] == identity and (targets is None or (
+                read_tool in targets
+                and (course_id is None or read_course is None or read_course == course_id)))
+        ]
+        for key in stale:
+            del self._results[key]
+        self.invalidated += len(stale)
+        return len(stale)
+
+    def invalidate(self, tool_name: str, identity: str = None) -> int:
+        """Drop the memoized results of one tool for a user (default: the configured one)."""
+        identity = identity or cache_identity()
+        stale = [key for key in self._results if key[0] == identity and key[1] == tool_name]
+        for key in stale:
+            del self._results[key]
+        self.invalidated += len(stale)
+        return len(stale)
+
+    def report(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "deduplicated": self.deduplicated,
+                "invalidated": self.invalidated, "by_tool": dict(self.by_tool)}
+
+
+run_memo_stats = {"runs": 0, "calls": 0, "deduplicated": 0, "invalidated": 0}
+
+_current_memo: ContextVar[Optional[RunMemo]] = ContextVar("run_memo", default=None)
+
+
+def get_run_memo() -> Optional[RunMemo]:
+    """The memo of the current graph run (None outside a run or when disabled)."""
+    return _current_memo.get()
+
+
+def start_run_memo() -> Optional[Token]:
+    """Give the current task (and the graph run it starts) a fresh memo.
+
+    Returns:
+        Token for finish_run_memo, or None when memoization is disabled.
+    """
+    if not RUN_MEMO_ENABLED:
+        return None
+    return _current_memo.set(RunMemo())
+
+
+def finish_run_memo(token: Optional[Token], label: str = None) -> Optional[Dict[str, Any]]:
+    """End the run's memo: log its report, add it to the totals and restore the previous memo."""
+    if token is None:
+        return None
+    memo = _current_memo.get()
+    _current_memo.reset(token)
+    report = memo.report()
+    run_memo_stats["runs"] += 1
+    for name in ("calls", "deduplicated", "invalidated"):
+        run_memo_stats[name] += report[name]
+    if report["deduplicated"]:
+        tools = ", ".join(f"{name} x{count}" for name, count in sorted(report["by_tool"].items()))
+        print(f"[MEMO] {label or 'Run'}: deduplicated {report['deduplicated']}/{report['calls']} tool calls "
+              f"({tools})", file=sys.stderr)
+    return report
+
+
+@contextmanager
+def run_memoization(label: str = None) -> Iterator[Optional[RunMemo]]:
+    """Scope a memo to one graph run.
+
+    Example:
+        with run_memoization(thread_id):
+            await app.ainvoke(...)
+    """
+    token = start_run_memo()
+    try:
+        yield _current_memo.get()
+    finally:
+        finish_run_memo(token, label)
+
+
+def get_run_memo_stats() -> Dict[str, Any]:
+    """Per-run memoization totals (for /api/metrics)."""
+    return {**run_memo_stats, "enabled": RUN_MEMO_ENABLED}
@@ -0,0 +1,151 @@
+"""
+Scheduling of the Canvas_Executor's tool calls within a request.
+
+When the model emits several tool calls in one message, the ReAct graph
+dispatches them all at once. Without coordination a single request could
+hold every pooled MCP session, and two writes (or a write and a read that
+depends on it) could reach Canvas in any order. The executor's ToolNode
+runs each call through `schedule_tool_call`, which:
+- splits the message's calls into phases in emission order: consecutive
+  reads form one phase and run concurrently; each write is a phase of its
+  own, so writes run one at a time, in order, after everything emitted
+  before them and before anything emitted after them
+- caps the request's concurrent tool calls (EXECUTOR_TOOL_CONCURRENCY) with
+  a semaphore from a per-request ContextVar, so one chat cannot starve the
+  others of Canvas connections
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.messages import AIMessage
+
+
+TOOL_SCHEDULING_ENABLED = os.getenv("TOOL_SCHEDULING_ENABLED", "true").lower() == "true"
+# Concurrent tool calls per request
+EXECUTOR_TOOL_CONCURRENCY = int(os.getenv("EXECUTOR_TOOL_CONCURRENCY", "4"))
+
+# Agent tools that only read (everything else is treated as a write and ordered)
+READ_TOOL_PREFIXES = ("get_", "list_", "load_", "resolve_", "search_", "canvas_health_check")
+
+
+def is_read_tool(tool_name: str) -> bool:
+    return tool_name.startswith(READ_TOOL_PREFIXES)
+
+
+def plan_phases(tool_calls: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Phase index per tool call id: runs of reads share a phase, each write gets its own."""
+    phases: Dict[str, int] = {}
+    phase = -1
+    previous_read = False
+    for call in tool_calls:
+        read = is_read_tool(call["name"])
+        if not (read and previous_read):
+            phase += 1
+        phases[call["id"]] = phase
+        previous_read = read
+    return phases
+
+
+class _MessageBatch:
+    """Phase barriers for the tool calls of one AIMessage."""
+
+    def __init__(self, tool_calls: List[Dict[str, Any]]):
+        self.phases = plan_phases(tool_calls)
+        counts: Dict[int, int] = {}
+        for phase in self.phases.values():
+            counts[phase] = counts.get(phase, 0) + 1
+        self.remaining = counts
+        self.done = {phase: asyncio.Event() for phase in counts}
+
+    async def wait_turn(self, call_id: str) -> None:
+        phase = self.phases[call_id]
+        if phase > 0:
+            await self.done[phase - 1].wait()
+
+    def finish(self, call_id: str) -> None:
+        phase = self.phases[call_id]
+        self.remaining[phase] -= 1
+        if self.remaining[phase] == 0:
+            self.done[phase].set()
+
+
+tool_scheduler_stats = {"calls": 0, "batches": 0, "parallel_batches": 0, "ordered_writes": 0, "wait_ms": 0.0}
+
+
+class ToolScheduler:
+    """Per-request concurrency cap and per-message ordering of tool calls."""
+
+    def __init__(self, concurrency: int = None):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency or EXECUTOR_TOOL_CONCURRENCY))
+        self._batches: Dict[str, _MessageBatch] = {}
+
+    def _batch(self, message: AIMessage) -> _MessageBatch:
+        key = message.id or str(id(message))
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _MessageBatch(message.tool_calls)
+            tool_scheduler_stats["batches"] += 1
+            if len(message.tool_calls) > 1 and len(set(batch.phases.values())) < len(message.tool_calls):
+                tool_scheduler_stats["parallel_batches"] += 1
+        return batch
+
+    async def run(self, message: Optional[AIMessage], call: Dict[str, Any], execute: Callable[[], Awaitable[Any]]):
+        """Run one tool call once its phase is due and a slot is free."""
+        batch = self._batch(message) if message is not None else None
+        start = time.perf_counter()
+        try:
+            if batch is not None:
+                await batch.wait_turn(call["id"])
+            async with self.semaphore:
+                tool_scheduler_stats["wait_ms"] += (time.perf_counter() - start) * 1000
+                tool_scheduler_stats["calls"] += 1
+                if not is_read_tool(call["name"]):
+                    tool_scheduler_stats["ordered_writes"] += 1
+                return await execute()
+        finally:
+            if batch is not None:
+                batch.finish(call["id"])
+
+
+_current_scheduler: ContextVar[Optional[ToolScheduler]] = ContextVar("tool_scheduler", default=None)
+
+
+@contextmanager
+def tool_scheduling(concurrency: int = None) -> Iterator[Optional[ToolScheduler]]:
+    """Scope a scheduler to one executor run (tool tasks inherit it)."""
+    if not TOOL_SCHEDULING_ENABLED:
+        yield None
+        return
+    token = _current_scheduler.set(ToolScheduler(concurrency))
+    try:
+        yield _current_scheduler.get()
+    finally:
+        _current_scheduler.reset(token)
+
+
+def _source_message(state: Any, call_id: str) -> Optional[AIMessage]:
+    messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", state)
+    for message in reversed(messages or []):
+        if isinstance(message, AIMessage) and any(c.get("id") == call_id for c in message.tool_calls):
+            return message
+    return None
+
+
+async def schedule_tool_call(request, execute):
+    """ToolNode `awrap_tool_call` hook: run the call under the request's scheduler."""
+    scheduler = _current_scheduler.get()
+    if scheduler is None:
+        return await execute(request)
+    message = _source_message(request.state, request.tool_call["id"])
+    return await scheduler.run(message, request.tool_call, lambda: execute(request))
+
+
+def get_tool_scheduler_stats() -> Dict[str, Any]:
+    """Tool scheduling counters (for /api/metrics)."""
+    return {**tool_scheduler_stats, "wait_ms": round(tool_scheduler_stats["wait_ms"], 1),
+            "concurrency": EXECUTOR_TOOL_CONCURRENCY, "enabled": TOOL_SCHEDULING_ENABLED}
@@ -0,0 +1,174 @@
+"""
+Per-request tool subsets for the Canvas_Executor.
+
+Binding all ~60 tools sends every schema with every executor LLM call. The
+executor only needs the tools for what the user asked about, so each
+request's text is matched against intent categories (assignment, quiz,
+module, discussion, grading, ...) and the executor is given the union of the
+matched categories plus the course lookup tools it always needs. Tools whose
+name or docstring mentions a request word no category trigger covered are
+added on top.
+
+Requests that match no category keep the full tool list. Subsets are built
+from whole categories, so the same few subsets recur and their compiled
+executors stay cached (see graph.prebuild_canvas_executors).
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+from src.agents.tools import all_tools
+
+
+TOOL_SELECTION_ENABLED = os.getenv("TOOL_SELECTION_ENABLED", "true").lower() == "true"
+
+# Needed by nearly every request (course name -> course_id lookup, untrimmed
+# data behind a projected tool result)
+CORE_TOOLS = ("resolve_course", "get_canvas_courses", "get_canvas_course", "get_full_canvas_record")
+
+# category -> (trigger stems, tools)
+TOOL_CATEGORIES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "course": (
+        ("course", "class", "syllab", "health"),
+        ("resolve_course", "get_canvas_courses", "get_canvas_course", "create_canvas_course", "update_canvas_course",
+         "get_syllabus", "canvas_health_check"),
+    ),
+    "assignment": (
+        ("assign", "homework", "essay", "due", "deadline", "lab", "project", "extra credit", "points"),
+        ("get_course_assignments", "get_canvas_assignment", "create_canvas_assignment",
+         "update_canvas_assignment", "list_assignment_groups", "get_upcoming_assignments",
+         "get_assignments_due", "get_missing_assignments"),
+    ),
+    "grading": (
+        ("grade", "grading", "score", "submission", "submit", "missing", "rubric", "late", "feedback"),
+        ("get_submissions", "get_canvas_submission", "submit_canvas_assignment", "submit_canvas_grade",
+         "get_course_grades", "get_user_grades", "list_rubrics", "get_rubric", "create_canvas_rubric",
+         "get_missing_assignments"),
+    ),
+    "announcement": (
+        ("announce",),
+        ("create_canvas_announcement", "list_announcements", "get_recent_announcements", "search_course_content"),
+    ),
+    "discussion": (
+        ("discussion", "forum", "thread", "reply", "replies", "topic"),
+        ("list_discussion_topics", "get_discussion_topics", "get_discussion_topic",
+         "get_full_discussion_entry", "post_to_discussion"),
+    ),
+    "module": (
+        ("module", "unit"),
+        ("list_modules", "get_module", "list_module_items", "get_module_item", "mark_module_item_complete",
+         "get_module_progress"),
+    ),
+    "quiz": (
+        ("quiz", "exam", "test", "midterm", "question"),
+        ("list_quizzes", "get_quiz", "create_quiz", "start_quiz_attempt", "create_quiz_question"),
+    ),
+    "content": (
+        ("file", "folder", "page", "upload", "document", "pdf", "syllabus", "policy", "office hours"),
+        ("list_canvas_files", "get_canvas_file", "list_canvas_folders", "list_canvas_pages",
+         "get_canvas_page", "search_course_content", "read_local_file"),
+    ),
+    "people": (
+        ("enroll", "profile", "account", "user", "roster"),
+        ("get_user_profile", "update_user_profile", "enroll_user", "get_account",
+         "list_account_courses", "list_account_users", "create_user"),
+    ),
+    "calendar": (
+        ("calendar", "event", "upcoming", "today", "tomorrow", "this week", "next week", "dashboard", "notification"),
+        ("list_calendar_events", "get_upcoming_assignments", "get_assignments_due", "get_canvas_dashboard",
+         "get_canvas_dashboard_cards", "list_notifications"),
+    ),
+    "messaging": (
+        ("message", "email", "inbox", "conversation", "nudge", "remind", "dm"),
+        ("list_conversations", "get_conversation", "send_canvas_message"),
+    ),
+    "template": (
+        ("template",),
+        ("save_template", "load_template"),
+    ),
+}
+
+WORD = re.compile(r"[a-z]+")
+# Docstring words too generic to select a tool by
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "in", "to", "and", "or", "get", "list", "create", "update", "details",
+    "specific", "new", "user", "user's", "canvas", "course", "using", "tool", "from", "with", "is", "be",
+    "may", "not", "note", "functionality", "limited", "mcp", "information", "retrieves",
+}
+
+
+def _singular(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _tool_vocabulary(tool: Any) -> set:
+    """Distinctive words of a tool's name and docstring."""
+    text = f"{tool.name.replace('_', ' ')} {getattr(tool, 'description', '') or ''}".lower()
+    return {_singular(w) for w in WORD.findall(text) if w not in STOPWORDS and len(w) > 3}
+
+
+def _match(text: str) -> Tuple[List[str], set]:
+    """Matched categories and the request words that triggered them."""
+    lowered = (text or "").lower()
+    words = WORD.findall(lowered)
+    matched, triggers = [], set()
+    for category, (stems, _) in TOOL_CATEGORIES.items():
+        for stem in stems:
+            if " " in stem:
+                hits = stem.split() if stem in lowered else []
+            else:
+                hits = [w for w in words if w.startswith(stem)]
+            if hits:
+                triggers.update(hits)
+                if category not in matched:
+                    matched.append(category)
+    return matched, triggers
+
+
+def match_categories(text: str) -> List[str]:
+    """Intent categories whose trigger stems occur in the request."""
+    return _match(text)[0]
+
+
+class ToolSelector:
+    """Pick the tool subset for a request from a fixed tool list."""
+
+    def __init__(self, tools: Sequence[Any] = all_tools):
+        self.tools = list(tools)
+        self._vocabulary = {t.name: _tool_vocabulary(t) for t in self.tools}
+
+    def select(self, text: str) -> List[Any]:
+        """Tools for this request, in all_tools order (all of them when nothing matches)."""
+        if not TOOL_SELECTION_ENABLED:
+            return self.tools
+        categories, triggers = _match(text)
+        if not categories:
+            return self.tools
+
+        names = set(CORE_TOOLS)
+        for category in categories:
+            names.update(TOOL_CATEGORIES[category][1])
+        # Words the categories did not account for may still name a specific tool
+        request_words = {_singular(w) for w in WORD.findall((text or "").lower())
+                         if len(w) > 3 and w not in triggers}
+        for name, vocabulary in self._vocabulary.items():
+            if vocabulary & request_words:
+                names.add(name)
+        return [t for t in self.tools if t.name in names]
+
+    def common_subsets(self) -> List[List[Any]]:
+        """Single-category subsets, prebuilt at startup so typical requests hit a compiled executor."""
+        subsets = []
+        for _, category_tools in TOOL_CATEGORIES.values():
+            names = set(CORE_TOOLS) | set(category_tools)
+            subsets.append([t for t in self.tools if t.name in names])
+        return subsets
+
+
+tool_selector = ToolSelector()
+
+
+def select_tools(text: str) -> List[Any]:
+    """Tool subset for a Canvas_Executor request (see ToolSelector.select)."""
+    return tool_selector.select(text)
@@ -1,13 +1,22 @@
 import os
 import sys
 import json
-from datetime import datetime
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
 from dateutil import parser
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 from src.keywordsai_utils import KeywordsAIClient
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from src.tools.canvas_transport import get_transport
+from src.agents.context import get_request_context
+from src.agents.run_memo import get_run_memo
+from src.tools.tool_cache import tool_cache, cache_identity, normalize_args, is_write_tool
+from src.tools.singleflight import tool_flights, request_key
+from src.tools.projection import project_result, full_record, to_table
+from src.tools.course_index import course_index, format_resolution
+from src.memory.canvas_mirror import canvas_mirror, utc_iso
+from src.memory.content_index import content_index
 from supabase import create_client, Client
 
 # Keywords AI tracing - task decorator for individual tools
@@ -41,52 +50,104 @@ except Exception as e:
     supabase = None
 
 
-# Helper for creating server parameters
-def get_server_params():
-    return StdioServerParameters(
-        command="docker",
-        args=["run", "--rm", "-i", "--env-file", ".env", "canvas-lms-agent-mcp-canvas-lms"],
-        env=None
-    )
+def get_thread_id_from_context():
+    """Thread id of the chat request this tool call belongs to (None outside a request)."""
+    return get_request_context().get("thread_identifier")
 
 
-def get_thread_id_from_context():
-    # Placeholder: In a real app, we'd pass this via context vars
-    return None
+async def _call_transport(tool_name: str, arguments: dict) -> str:
+    """Call the transport, sharing identical in-flight reads (writes always run)."""
+    if is_write_tool(tool_name):
+        return await get_transport().call_tool(tool_name, arguments)
+    key = request_key(cache_identity(), tool_name, normalize_args(arguments))
+    return await tool_flights.do(key, lambda: get_transport().call_tool(tool_name, arguments))
+
+
+# Local store updates still running after their tool call returned (kept referenced until done)
+_background_ingests = set()
+
+
+def _ingest_in_background(name: str, coro) -> None:
+    """Run a local store update off the request path; failures are logged, never returned to the caller."""
+    async def run():
+        try:
+            await coro
+        except Exception as e:
+            print(f"[WARNING] {name} ingest failed: {e}", file=sys.stderr)
 
-async def run_mcp_tool(tool_name: str, arguments: dict = None) -> str:
+    task = asyncio.create_task(run())
+    _background_ingests.add(task)
+    task.add_done_callback(_background_ingests.discard)
+
+
+def _update_local_stores(tool_name: str, arguments: dict, text_content: str) -> None:
+    """Keep the course name index, local mirror and content index current with a tool
+    result. Best effort: a failure here never turns a successful Canvas call into a tool error."""
+    identity = cache_identity()
+    try:
+        course_index.observe(tool_name, text_content, identity=identity)
+    except Exception as e:
+        print(f"[WARNING] Course index update from {tool_name} failed: {e}", file=sys.stderr)
+    if is_write_tool(tool_name):
+        try:
+            canvas_mirror.note_write(tool_name, arguments, identity=identity)
+        except Exception as e:
+            print(f"[WARNING] Mirror invalidation after {tool_name} failed: {e}", file=sys.stderr)
+        try:
+            content_index.note_write(tool_name, arguments, identity=identity)
+        except Exception as e:
+            print(f"[WARNING] Content index invalidation after {tool_name} failed: {e}", file=sys.stderr)
+        return
+    if canvas_mirror.conn is not None:
+        _ingest_in_background("Mirror", canvas_mirror.ingest(tool_name, arguments, text_content, identity=identity))
+    if content_index.conn is not None:
+        _ingest_in_background("Content index",
+                              content_index.ingest(tool_name, arguments, text_content, identity=identity))
+
+
+async def run_mcp_tool(tool_name: str, arguments: dict = None, project: bool = True) -> str:
     """
-    Executes an MCP tool and returns the text content.
-    Handles the connection, initialization, and result extraction.
+    Executes a Canvas tool and returns the text content.
+    The call goes through the configured transport (CANVAS_TRANSPORT):
+    the pooled MCP server by default, or the native REST backend.
+    Within a graph run, a read repeated with the same arguments is answered
+    from the run's memo (see src/agents/run_memo.py). Read tools are served
+    from the response cache when fresh, and identical concurrent reads share
+    one upstream call; write tools invalidate the cached and memoized reads
+    they affect. Read results are returned as compact projections for the
+    LLM (see src/tools/projection.py) unless project=False (API callers
+    that parse the raw JSON).
     """
     arguments = arguments or {}
     try:
-        async with stdio_client(get_server_params()) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                result = await session.call_tool(tool_name, arguments=arguments)
-                
-                # Extract text content from the result
-                text_content = ""
-                if hasattr(result, 'content') and isinstance(result.content, list):
-                    for item in result.content:
-                        if hasattr(item, 'text'):
-                            text_content += item.text
-                else:
-                    text_content = str(result)
-                
-                # Log critical creation events to Keywords AI
-                if kw_client and "create" in tool_name:
-                    kw_client.log_custom_event(
-                        event_name=f"tool_execution_{tool_name}",
-                        metadata={"arguments": str(arguments), "success": True}
-                    )
-                    
-                return text_content
+        def fetch():
+            return tool_cache.call(tool_name, arguments, lambda: _call_transport(tool_name, arguments))
+
+        memo = get_run_memo()
+        text_content = await (memo.call(tool_name, arguments, fetch) if memo is not None else fetch())
+
+        # Log critical creation events to Keywords AI
+        if kw_client and "create" in tool_name:
+            kw_client.log_custom_event(
+                event_name=f"tool_execution_{tool_name}",
+                customer_identifier=get_request_context().get("customer_identifier"),
+                thread_identifier=get_thread_id_from_context(),
+                metadata={"arguments": str(arguments), "success": True}
+            )
+
+        # Course payloads keep the course name index current; listings,
+        # pages and writes keep the local mirror and content index current
+        _update_local_stores(tool_name, arguments, text_content)
+
+        if project and not is_write_tool(tool_name):
+            text_content = project_result(tool_name, arguments, text_content, identity=cache_identity())
+        return text_content
     except Exception as e:
         if kw_client:
              kw_client.log_custom_event(
                 event_name=f"tool_error_{tool_name}",
+                customer_identifier=get_request_context().get("customer_identifier"),
+                thread_identifier=get_thread_id_from_context(),
                 metadata={"error": str(e)}
             )
         return f"Error executing {tool_name}: {str(e)}"
@@ -139,6 +200,14 @@ async def canvas_health_check():
     return await run_mcp_tool("canvas_health_check")
 
 
+@tool
+@task(name="get_full_canvas_record")
+async def get_full_canvas_record(ref: str, record_id: str = None):
+    """Get the full, untrimmed Canvas data behind a compact tool result. Use the ref
+    shown at the end of that result; pass record_id for a single record of a list."""
+    return full_record(ref, record_id, identity=cache_identity())
+
+
 # --- COURSE TOOLS ---
 
 @tool
@@ -147,6 +216,23 @@ async def get_canvas_courses():
     """Retrieves the list of Canvas courses."""
     return await run_mcp_tool("canvas_list_courses", {"include_ended": False})
 
+async def _list_courses_for_index(fresh: bool = False) -> str:
+    """Course listing that feeds the course index (fresh=True skips the cached and memoized listing)."""
+    if fresh:
+        tool_cache.invalidate(tool_name="canvas_list_courses")
+        memo = get_run_memo()
+        if memo is not None:
+            memo.invalidate("canvas_list_courses")
+    return await run_mcp_tool("canvas_list_courses", {"include_ended": False}, project=False)
+
+@tool
+@task(name="resolve_course")
+async def resolve_course(course_name: str):
+    """Resolve a course name, code or nickname (e.g. "History 101", "HIST101") to its course_id.
+    Use this instead of listing all courses; returns candidates when the name is ambiguous."""
+    matches = await course_index.resolve(course_name, _list_courses_for_index, identity=cache_identity())
+    return format_resolution(course_name, matches)
+
 @tool
 @task(name="get_canvas_course")
 async def get_canvas_course(course_id: str):
@@ -463,6 +549,25 @@ async def get_canvas_page(course_id: int, page_url: str):
     """Get content of a specific page."""
     return await run_mcp_tool("canvas_get_page", {"course_id": course_id, "page_url": page_url})
 
+@tool
+@task(name="search_course_content")
+async def search_course_content(course_id: str, query: str):
+    """Searches the text of a course's pages, syllabus and announcements and returns the best-matching passages
+    with their source. Use it to find a specific detail (late policy, office hours, exam room, grading weights)
+    instead of reading whole pages with get_canvas_page."""
+    if not content_index.enabled:
+        return "The course content index is not available; use list_canvas_pages and get_canvas_page instead."
+    rows = await content_index.search(int(course_id), query)
+    crawled = content_index.last_crawled(int(course_id))
+    if crawled is None:
+        return "The course content could not be indexed yet; use list_canvas_pages and get_canvas_page instead."
+    age = f"(content indexed {int((time.time() - crawled) // 60)} min ago)"
+    if not rows:
+        return f"No passages in course {course_id} match '{query}'. {age}"
+    results = [f"{i}. [{row['kind']}] {row['title'] or 'Untitled'} ({row['url'] or 'no link'})\n   {row['snippet']}"
+               for i, row in enumerate(rows, 1)]
+    return "\n".join(results) + f"\n{age}"
+
 
 # --- USER & ACCOUNT TOOLS ---
 
@@ -619,6 +724,69 @@ async def get_syllabus(course_id: int):
     return await run_mcp_tool("canvas_get_syllabus", {"course_id": course_id})
 
 
+# --- CROSS-COURSE TOOLS (local mirror, see src/memory/canvas_mirror.py) ---
+
+MIRROR_FALLBACK = "use get_canvas_courses and the per-course tools instead."
+
+
+def _mirror_result(rows: list, fields: tuple, empty: str) -> str:
+    """Rows from a mirror query as a compact table, with how fresh the data is."""
+    if not canvas_mirror.enabled or canvas_mirror.conn is None:
+        return f"The local Canvas mirror is not available; {MIRROR_FALLBACK}"
+    synced = canvas_mirror.last_synced()
+    if synced is None:
+        return f"Canvas data could not be synced yet; {MIRROR_FALLBACK}"
+    age = f"(Canvas data synced {int((time.time() - synced) // 60)} min ago)"
+    if not rows:
+        return f"{empty} {age}"
+    return f"{to_table(rows, fields)}\n{len(rows)} rows {age}"
+
+@tool
+@task(name="get_assignments_due")
+async def get_assignments_due(start_date: str = None, end_date: str = None, course_id: str = None,
+                              only_unsubmitted: bool = False):
+    """Assignments due between two dates across ALL of the user's courses (default: the next 7 days),
+    with submission status. Answers "what is due this week" in one call; pass course_id to limit to one course."""
+    start = utc_iso(parse_date_to_iso(start_date) if start_date else datetime.now(timezone.utc))
+    if start is None:
+        return f"Error: could not parse start_date '{start_date}'."
+    end = utc_iso(parse_date_to_iso(end_date) if end_date else parser.parse(start) + timedelta(days=7))
+    if end is None:
+        return f"Error: could not parse end_date '{end_date}'."
+    rows = await canvas_mirror.assignments_due(start, end, course_id, include_submitted=not only_unsubmitted)
+    return _mirror_result(rows, ("course", "course_id", "assignment_id", "name", "due_at", "points_possible",
+                                 "submission", "score", "html_url"),
+                          "No assignments are due in that period.")
+
+@tool
+@task(name="get_missing_assignments")
+async def get_missing_assignments(course_id: str = None):
+    """Past-due assignments the user has not submitted, across ALL courses (or one course_id)."""
+    rows = await canvas_mirror.missing_work(course_id)
+    return _mirror_result(rows, ("course", "course_id", "assignment_id", "name", "due_at", "points_possible",
+                                 "submission", "html_url"),
+                          "No missing assignments.")
+
+@tool
+@task(name="get_recent_announcements")
+async def get_recent_announcements(days: int = 7, course_id: str = None):
+    """Announcements posted in the last `days` days across ALL courses (or one course_id), newest first."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = await canvas_mirror.recent_announcements(since, course_id)
+    return _mirror_result(rows, ("course", "course_id", "announcement_id", "title", "posted_at", "author",
+                                 "message", "html_url"),
+                          f"No announcements in the last {days} days.")
+
+@tool
+@task(name="get_module_progress")
+async def get_module_progress(course_id: str = None):
+    """Modules of ALL courses (or one course_id) with the user's state: locked, unlocked, started or completed."""
+    rows = await canvas_mirror.module_progress(course_id)
+    return _mirror_result(rows, ("course", "course_id", "module_id", "name", "state", "items_count",
+                                 "unlock_at", "completed_at"),
+                          "No modules found.")
+
+
 # --- LOCAL TOOLS ---
 
 @tool
@@ -665,8 +833,10 @@ def read_local_file(path: str):
 all_tools = [
     # Core
     canvas_health_check,
+    get_full_canvas_record,
     
     # Course
+    resolve_course,
     get_canvas_courses,
     get_canvas_course,
     create_canvas_course,
@@ -721,6 +891,7 @@ all_tools = [
     # Page
     list_canvas_pages,
     get_canvas_page,
+    search_course_content,
     
     # User & Account
     get_user_profile,
@@ -744,6 +915,12 @@ all_tools = [
     send_canvas_message,
     list_notifications,
     
+    # Cross-course (local mirror)
+    get_assignments_due,
+    get_missing_assignments,
+    get_recent_announcements,
+    get_module_progress,
+    
     # Local
     save_template,
     load_template,
@@ -0,0 +1,325 @@
+"""
+Token-budgeted conversation windows for the agent nodes.
+
+Replaces the fixed `messages[-5:]` slice, which could separate an AIMessage's
+tool_calls from their ToolMessages (an invalid request) and ignored that one
+tool result can be tens of KB:
+- Messages are grouped so an AIMessage with tool_calls and its ToolMessages
+  are kept or dropped together; orphaned ToolMessages are never sent
+- Groups are taken newest first until the model's token budget is spent
+- The latest human turn is always included; a tool result from the current
+  turn that would not fit is clipped rather than dropped
+- Dropped turns are replaced by a running summary per thread
+  (WINDOW_SUMMARY). The summary is refreshed in the background on the small
+  model, so a hop never waits for it; until then the previous summary is
+  used. The graph persists it in its state (`summary`, `summary_count`), so
+  it survives restarts and is shared by every worker serving the thread
+"""
+
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.token_counting import count_text_tokens
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """Parse "model=tokens,model=tokens" into a dict."""
+    budgets = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        model, tokens = item.rsplit("=", 1)
+        try:
+            budgets[model.strip()] = int(tokens)
+        except ValueError:
+            print(f"[WINDOW] Ignoring invalid budget '{item}'", file=sys.stderr)
+    return budgets
+
+
+# History tokens per model (the system prompt and tool schemas come on top)
+CONTEXT_BUDGETS = parse_budgets(os.getenv("CONTEXT_BUDGETS", "gpt-4o-mini=8000,gpt-4o=16000"))
+CONTEXT_BUDGET_DEFAULT = int(os.getenv("CONTEXT_BUDGET_DEFAULT", "8000"))
+# Smallest share of the budget a clipped current-turn tool result keeps
+WINDOW_MIN_TOOL_RESULT_TOKENS = int(os.getenv("WINDOW_MIN_TOOL_RESULT_TOKENS", "256"))
+WINDOW_SUMMARY = os.getenv("WINDOW_SUMMARY", "true").lower() == "true"
+WINDOW_SUMMARY_MODEL = os.getenv("WINDOW_SUMMARY_MODEL", "gpt-4o-mini")
+# Refresh the summary once this many dropped messages are not covered yet
+WINDOW_SUMMARY_BATCH = int(os.getenv("WINDOW_SUMMARY_BATCH", "6"))
+
+# Per-message framing overhead in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+# ========== TOKEN COUNTING ==========
+
+def _content_text(message: Any) -> str:
+    content = getattr(message, "content", "")
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, default=str)
+
+
+_token_cache: "OrderedDict[Tuple[Any, int], int]" = OrderedDict()
+_TOKEN_CACHE_SIZE = 4096
+
+
+def count_message_tokens(message: Any) -> int:
+    """Tokens a message adds to a request (content, tool calls and framing)."""
+    text = _content_text(message)
+    tool_calls = getattr(message, "tool_calls", None) or []
+    # Messages with an id are counted once (the same history is windowed every hop)
+    key = (message.id, len(text) + len(tool_calls)) if getattr(message, "id", None) else None
+    if key is not None and key in _token_cache:
+        return _token_cache[key]
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(text)
+    for call in tool_calls:
+        tokens += count_text_tokens(call.get("name", "")) + count_text_tokens(json.dumps(call.get("args", {})))
+    if key is not None:
+        _token_cache[key] = tokens
+        if len(_token_cache) > _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return tokens
+
+
+def get_budget(model_name: str) -> int:
+    """History token budget for a model."""
+    return CONTEXT_BUDGETS.get(model_name, CONTEXT_BUDGET_DEFAULT)
+
+
+# ========== GROUPING ==========
+
+def group_messages(messages: Sequence[Any]) -> List[List[Any]]:
+    """Split history into atomic groups.
+
+    An AIMessage with tool_calls forms one group with the ToolMessages that
+    answer it. ToolMessages without their AIMessage, and tool calls that
+    never got all their results, are dropped (both are invalid requests).
+    """
+    groups: List[List[Any]] = []
+    pending_ids: set = set()
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            if groups and message.tool_call_id in pending_ids:
+                groups[-1].append(message)
+                pending_ids.discard(message.tool_call_id)
+            continue
+        if pending_ids:
+            groups.pop()
+        pending_ids = set()
+        if isinstance(message, AIMessage) and message.tool_calls:
+            pending_ids = {call.get("id") for call in message.tool_calls}
+        groups.append([message])
+    if pending_ids:
+        groups.pop()
+    return groups
+
+
+def _clip_tool_results(messages: List[Any], share: int) -> List[Any]:
+    """Shrink ToolMessage contents longer than `share` tokens (other messages unchanged)."""
+    clipped = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and count_message_tokens(message) > share:
+            text = _content_text(message)
+            # Scale by the message's own chars-per-token, leaving room for the note and framing
+            target = max(share - 24, 32)
+            keep = int(len(text) * target / max(count_text_tokens(text), 1))
+            message = message.model_copy(update={
+                "content": text[:keep] + f"\n...[truncated {len(text) - keep} characters to fit the context window]"
+            })
+            window_stats["clipped_tool_results"] += 1
+        clipped.append(message)
+    return clipped
+
+
+# ========== WINDOW ==========
+
+window_stats: Dict[str, int] = {
+    "windows": 0,
+    "trimmed": 0,
+    "dropped_messages": 0,
+    "clipped_tool_results": 0,
+    "summaries_used": 0,
+    "summary_refreshes": 0,
+    "summary_errors": 0,
+}
+
+
+def select_window(messages: Sequence[Any], budget: int) -> Tuple[List[Any], List[Any]]:
+    """Newest atomic groups that fit `budget`, always including the latest human turn.
+
+    The current turn (latest human message onward) is always sent. If it
+    alone exceeds the budget, its tool results share what is left after the
+    other messages, each clipped to that share.
+
+    Returns:
+        (window, dropped) where dropped is the older history left out
+    """
+    groups = group_messages(messages)
+    human_index = next((i for i in range(len(groups) - 1, -1, -1) if isinstance(groups[i][0], HumanMessage)), None)
+    first_current = human_index if human_index is not None else len(groups)
+
+    current = [m for group in groups[first_current:] for m in group]
+    used = sum(count_message_tokens(m) for m in current)
+    if used > budget:
+        tool_messages = [m for m in current if isinstance(m, ToolMessage)]
+        if tool_messages:
+            fixed = used - sum(count_message_tokens(m) for m in tool_messages)
+            share = max(WINDOW_MIN_TOOL_RESULT_TOKENS, (budget - fixed) // len(tool_messages))
+            current = _clip_tool_results(current, share)
+        return current, [m for group in groups[:first_current] for m in group]
+
+    start = first_current
+    for i in range(first_current - 1, -1, -1):
+        tokens = sum(count_message_tokens(m) for m in groups[i])
+        if used + tokens > budget:
+            break
+        used += tokens
+        start = i
+
+    window = [m for group in groups[start:first_current] for m in group] + current
+    dropped = [m for group in groups[:start] for m in group]
+    return window, dropped
+
+
+class RunningSummary:
+    """Per-thread summary of the turns that fell out of the window.
+
+    A summary is described by its text, the id of the last message it
+    covers and that message's position in the history (count, used to tell
+    which of two summaries is newer). The dropped prefix differs per model
+    budget and invalid tool groups are filtered out before windowing, so
+    new messages are located by id, not by how many were dropped before.
+    """
+
+    def __init__(self, summarize: Optional[Callable[[str, List[Any]], Any]] = None, max_threads: int = 1000):
+        self.summarize = summarize or summarize_with_llm
+        self.max_threads = max_threads
+        self._summaries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    def get(self, thread_id: str, dropped: List[Any], persisted: Tuple[str, int, str] = None,
+            history: Sequence[Any] = None) -> Optional[str]:
+        """Summary for the thread; starts a background refresh if messages are not covered yet.
+
+        Args:
+            thread_id: Conversation thread
+            dropped: Messages the window left out (oldest first)
+            persisted: (text, count, last_id) summary stored in the graph
+                state, used when it is newer than the cached one (e.g. after
+                a restart)
+            history: Full history the window was cut from (defaults to
+                `dropped`); locates the last summarized message
+        """
+        positions = {m.id: i for i, m in enumerate(history if history is not None else dropped)
+                     if getattr(m, "id", None)}
+        entry = self._summaries.get(thread_id)
+        if persisted and persisted[0] and persisted[2] and (not entry or persisted[1] > entry["count"]):
+            entry = self._store(thread_id, *persisted)
+        through = positions.get(entry["last_id"]) if entry else None
+        if entry and through is None:
+            # The last summarized message is not in this history (rewritten, or no ids): rebuild
+            previous, new = None, dropped
+        else:
+            previous = entry
+            new = [m for m in dropped if positions.get(getattr(m, "id", None), -1) > through] if entry else dropped
+        # Batch refreshes (one LLM call per few dropped messages, not per hop)
+        if new and (len(new) >= WINDOW_SUMMARY_BATCH or not previous) and thread_id not in self._refreshing:
+            last = new[-1]
+            last_id = getattr(last, "id", None)
+            count = positions.get(last_id, len(new) - 1) + 1
+            try:
+                task = asyncio.get_running_loop().create_task(self._refresh(thread_id, previous, new, count, last_id))
+                self._refreshing[thread_id] = task
+            except RuntimeError:
+                pass  # no running loop: keep the cached summary
+        if entry:
+            self._summaries.move_to_end(thread_id)
+            return entry["text"]
+        return None
+
+    def latest(self, thread_id: str) -> Optional[Tuple[str, int, str]]:
+        """(text, count, last_id) of the newest summary for the thread, if any."""
+        entry = self._summaries.get(thread_id)
+        return (entry["text"], entry["count"], entry["last_id"]) if entry else None
+
+    def _store(self, thread_id: str, text: str, count: int, last_id: Optional[str]) -> Dict[str, Any]:
+        entry = self._summaries[thread_id] = {"text": text, "count": count, "last_id": last_id}
+        self._summaries.move_to_end(thread_id)
+        while len(self._summaries) > self.max_threads:
+            self._summaries.popitem(last=False)
+        return entry
+
+    async def _refresh(self, thread_id: str, entry: Optional[Dict[str, Any]], new: List[Any], count: int,
+                       last_id: Optional[str]) -> None:
+        try:
+            text = await self.summarize(entry["text"] if entry else "", new)
+            self._store(thread_id, text, count, last_id)
+            window_stats["summary_refreshes"] += 1
+        except Exception as e:
+            window_stats["summary_errors"] += 1
+            print(f"[WINDOW] Summary refresh failed for thread {thread_id}: {e}", file=sys.stderr)
+        finally:
+            self._refreshing.pop(thread_id, None)
+
+    async def wait(self) -> None:
+        """Wait for in-flight refreshes (tests and shutdown)."""
+        if self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+
+
+async def summarize_with_llm(previous: str, messages: List[Any]) -> str:
+    """Fold `messages` into the previous summary with a small model."""
+    from src.agents.llm_registry import llm_registry
+    from src.agents.prompt_templates import CONVERSATION_SUMMARY_PROMPT
+
+    transcript = "\n".join(
+        f"{type(m).__name__.replace('Message', '')}: {_content_text(m)[:2000]}" for m in messages
+    )
+    llm = llm_registry.get("Summarizer", WINDOW_SUMMARY_MODEL)
+    response = await llm.ainvoke([
+        SystemMessage(content=CONVERSATION_SUMMARY_PROMPT),
+        HumanMessage(content=f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}")
+    ])
+    return response.content
+
+
+running_summary = RunningSummary()
+
+
+def window_messages(messages: Sequence[Any], model_name: str = "gpt-4o-mini", budget: int = None,
+                    thread_id: str = None, summary: Tuple[str, int, str] = None) -> List[Any]:
+    """Messages to send to `model_name` for this hop.
+
+    Args:
+        messages: Full conversation history from the graph state
+        model_name: Model the node is calling (selects the token budget)
+        budget: Override the model's budget
+        thread_id: Enables the running summary of dropped turns (with WINDOW_SUMMARY)
+        summary: (text, count, last_id) summary persisted in the graph state
+
+    Returns:
+        A valid message list: no orphaned tool results, latest human turn included
+    """
+    budget = budget or get_budget(model_name)
+    window, dropped = select_window(messages, budget)
+    window_stats["windows"] += 1
+    if dropped:
+        window_stats["trimmed"] += 1
+        window_stats["dropped_messages"] += len(dropped)
+        if WINDOW_SUMMARY and thread_id:
+            text = running_summary.get(thread_id, dropped, summary, history=messages)
+            if text:
+                window_stats["summaries_used"] += 1
+                window = [SystemMessage(content=f"Summary of the earlier conversation:\n{text}")] + window
+    return window
+
+
+def get_window_stats() -> Dict[str, Any]:
+    """Windowing counters (for /api/metrics)."""
+    return {**window_stats, "budgets": CONTEXT_BUDGETS, "summary_enabled": WINDOW_SUMMARY}
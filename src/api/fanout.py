@@ -0,0 +1,84 @@
+"""
+Concurrent fan-out of independent upstream calls for the API layer.
+
+Runs named coroutine factories concurrently, each under its own deadline,
+and returns whatever succeeded together with the names (and reasons) of
+the calls that timed out or failed. Endpoint latency becomes the slowest
+single call instead of the sum of all of them.
+
+Example:
+    result = await fan_out(
+        {"cards": lambda: fetch_cards(), "planner": lambda: fetch_planner()},
+        deadlines={"cards": 5.0, "planner": 8.0}
+    )
+    result.results.get("cards", [])
+    result.missing  # {"planner": "timeout"}
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class FanOutResult:
+    """Outcome of a fan-out: successful results plus missing sections."""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.missing: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.missing)
+
+
+async def _timed(name: str, factory: Callable[[], Awaitable[Any]], deadline: Optional[float], timings: Dict[str, float]):
+    start = time.perf_counter()
+    try:
+        if deadline is None:
+            return await factory()
+        return await asyncio.wait_for(factory(), deadline)
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+async def fan_out(
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    deadlines: Dict[str, float] = None,
+    default_deadline: Optional[float] = None
+) -> FanOutResult:
+    """Run independent calls concurrently with per-call deadlines.
+
+    Args:
+        calls: Mapping of section name to a zero-argument coroutine factory
+        deadlines: Optional per-section deadline in seconds
+        default_deadline: Deadline for sections without an explicit one (None = no limit)
+
+    Returns:
+        FanOutResult with `results` for sections that succeeded and `missing`
+        mapping the others to "timeout" or an error description.
+    """
+    deadlines = deadlines or {}
+    outcome = FanOutResult()
+    names = list(calls)
+
+    results = await asyncio.gather(
+        *(_timed(name, calls[name], deadlines.get(name, default_deadline), outcome.timings) for name in names),
+        return_exceptions=True
+    )
+
+    for name, result in zip(names, results):
+        if isinstance(result, asyncio.TimeoutError):
+            outcome.missing[name] = "timeout"
+        elif isinstance(result, asyncio.CancelledError):
+            outcome.missing[name] = "cancelled"
+        elif isinstance(result, Exception):
+            outcome.missing[name] = f"{type(result).__name__}: {result}"
+        else:
+            outcome.results[name] = result
+
+    if outcome.missing:
+        print(f"[FANOUT] Partial result, missing: {outcome.missing}", file=sys.stderr)
+    return outcome
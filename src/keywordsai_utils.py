@@ -7,12 +7,238 @@ This module provides utilities for integrating Keywords AI features:
 - Evaluations/Scoring
 """
 
+import asyncio
 import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+import httpx
 import requests
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
+# Background log export (request logs, scores, custom events)
+KEYWORDSAI_LOG_ASYNC = os.getenv("KEYWORDSAI_LOG_ASYNC", "true").lower() == "true"
+KEYWORDSAI_LOG_QUEUE_SIZE = int(os.getenv("KEYWORDSAI_LOG_QUEUE_SIZE", "1000"))
+KEYWORDSAI_LOG_BATCH_SIZE = int(os.getenv("KEYWORDSAI_LOG_BATCH_SIZE", "50"))
+KEYWORDSAI_LOG_FLUSH_INTERVAL = float(os.getenv("KEYWORDSAI_LOG_FLUSH_INTERVAL", "2"))
+KEYWORDSAI_LOG_CONCURRENCY = int(os.getenv("KEYWORDSAI_LOG_CONCURRENCY", "4"))
+KEYWORDSAI_LOG_MAX_RETRIES = int(os.getenv("KEYWORDSAI_LOG_MAX_RETRIES", "3"))
+KEYWORDSAI_LOG_RETRY_BASE = float(os.getenv("KEYWORDSAI_LOG_RETRY_BASE", "0.5"))
+KEYWORDSAI_LOG_TIMEOUT = float(os.getenv("KEYWORDSAI_LOG_TIMEOUT", "10"))
+KEYWORDSAI_LOG_DRAIN_TIMEOUT = float(os.getenv("KEYWORDSAI_LOG_DRAIN_TIMEOUT", "5"))
+
+
+class LogExporter:
+    """Ships Keywords AI log payloads from a background task.
+
+    Callers only append to a bounded in-memory queue and return immediately:
+    - When the queue is full the oldest entry is dropped (and counted)
+    - The worker flushes when KEYWORDSAI_LOG_BATCH_SIZE entries are queued
+      or every KEYWORDSAI_LOG_FLUSH_INTERVAL seconds, sending a batch over
+      one keep-alive client with bounded concurrency
+    - Network errors, 429 and 5xx are retried with jittered exponential backoff
+    - shutdown() drains what is left, bounded by a timeout
+    Without a running event loop (CLI scripts) entries are sent synchronously.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = KEYWORDSAI_LOG_QUEUE_SIZE,
+        batch_size: int = KEYWORDSAI_LOG_BATCH_SIZE,
+        flush_interval: float = KEYWORDSAI_LOG_FLUSH_INTERVAL,
+        concurrency: int = KEYWORDSAI_LOG_CONCURRENCY,
+        max_retries: int = KEYWORDSAI_LOG_MAX_RETRIES,
+        retry_base: float = KEYWORDSAI_LOG_RETRY_BASE
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self._queue: deque = deque(maxlen=max_queue)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stopping = False
+        self._stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "dropped": 0,
+            "retries": 0,
+            "batches": 0,
+            "sync_sends": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def enqueue(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> None:
+        """Queue one log entry; never blocks on the network when a loop is running."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None and not self.running:
+            # No event loop anywhere (CLI usage): best-effort synchronous send
+            self._stats["sync_sends"] += 1
+            self._send_sync(url, headers, payload)
+            return
+
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self._stats["dropped"] += 1  # deque(maxlen) discards the oldest entry
+            self._queue.append((url, headers, payload, 0))
+            self._stats["enqueued"] += 1
+
+        if loop is not None and (not self.running or self._loop is not loop):
+            self.start()
+        self._notify(size_trigger=len(self._queue) >= self.batch_size)
+
+    def _notify(self, size_trigger: bool) -> None:
+        if not size_trigger or self._wake is None or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self.running and self._loop is loop:
+            return
+        self._close_client(self._client, self._loop)
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._client = httpx.AsyncClient(
+            timeout=KEYWORDSAI_LOG_TIMEOUT,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        )
+        self._task = loop.create_task(self._run())
+
+    @staticmethod
+    def _close_client(client: Optional[httpx.AsyncClient], loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close a client left by a dead worker on the loop it was created on."""
+        if client is None or loop is None or loop.is_closed() or not loop.is_running():
+            return  # nothing can run on that loop any more; its connections go with it
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(client.aclose())
+        else:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._queue and not self._stopping:
+                await self._flush_batch()
+
+    def _take_batch(self) -> List[tuple]:
+        with self._lock:
+            return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+    async def _flush_batch(self) -> None:
+        batch = self._take_batch()
+        if not batch:
+            return
+        self._stats["batches"] += 1
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(entry):
+            async with semaphore:
+                try:
+                    await self._send_with_retry(*entry)
+                except Exception as e:
+                    # e.g. a payload that is not JSON serializable; the rest of the batch still goes out
+                    self._stats["failed"] += 1
+                    print(f"[KEYWORDSAI] Dropping log: {type(e).__name__}: {e}", file=sys.stderr)
+
+        await asyncio.gather(*(send(entry) for entry in batch))
+
+    async def _send_with_retry(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], attempt: int) -> None:
+        while True:
+            try:
+                response = await self._client.post(url, headers=headers, json=payload)
+                if response.status_code < 400:
+                    self._stats["sent"] += 1
+                    return
+                retryable = response.status_code == 429 or response.status_code >= 500
+                error = f"HTTP {response.status_code}"
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                retryable = True
+                error = f"{type(e).__name__}: {e}"
+
+            if not retryable or attempt >= self.max_retries or self._stopping:
+                self._stats["failed"] += 1
+                print(f"[KEYWORDSAI] Dropping log after {attempt + 1} attempt(s): {error}", file=sys.stderr)
+                return
+            attempt += 1
+            self._stats["retries"] += 1
+            # Exponential backoff with full jitter
+            await asyncio.sleep(random.uniform(0, self.retry_base * (2 ** attempt)))
+
+    def _send_sync(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> None:
+        try:
+            response = requests.post(url, headers=headers, json=payload, timeout=2)
+            self._stats["sent" if response.ok else "failed"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            print(f"[KEYWORDSAI] Failed to send log: {e}", file=sys.stderr)
+
+    async def flush(self) -> None:
+        """Send everything queued so far (used by shutdown and scripts)."""
+        if not self.running:
+            self.start()
+        while self._queue:
+            await self._flush_batch()
+
+    async def shutdown(self, timeout: float = KEYWORDSAI_LOG_DRAIN_TIMEOUT) -> None:
+        """Drain the queue (bounded by `timeout`) and stop the worker."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"[KEYWORDSAI] Drain timed out, {len(self._queue)} log(s) not sent", file=sys.stderr)
+        self._stopping = True
+        if self._wake is not None:
+            self._wake.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "queued": len(self._queue), "running": self.running}
+
+
+# Global exporter shared by every KeywordsAIClient
+log_exporter = LogExporter()
+
+
 class KeywordsAIClient:
     """Client for Keywords AI API operations."""
 
@@ -31,6 +257,16 @@ class KeywordsAIClient:
             "X-Keywords-Source": "CanvasAI-PromptClient"
         }
 
+    def _submit_log(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Hand a log payload to the background exporter (or POST it when disabled)."""
+        if KEYWORDSAI_LOG_ASYNC:
+            log_exporter.enqueue(url, self._headers(), payload)
+            return {"queued": True}
+
+        response = requests.post(url, headers=self._headers(), json=payload, timeout=KEYWORDSAI_LOG_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
     # ========== PROMPT MANAGEMENT ==========
 
     def chat_with_prompt(
@@ -115,7 +351,8 @@ class KeywordsAIClient:
             log_type: Type of log ("chat", "workflow", "task", etc.)
 
         Returns:
-            The API response
+            {"queued": True} (sent in the background), or the API response
+            when KEYWORDSAI_LOG_ASYNC=false
 
         Example:
             client = KeywordsAIClient()
@@ -149,13 +386,7 @@ class KeywordsAIClient:
         if usage:
             payload["usage"] = usage
 
-        response = requests.post(
-            f"{self.base_url.replace('/api/', '/api/')}/request-logs/create/",
-            headers=self._headers(),
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._submit_log(f"{self.base_url.replace('/api/', '/api/')}/request-logs/create/", payload)
 
     # ========== EVALUATIONS / SCORING ==========
 
@@ -220,7 +451,8 @@ class KeywordsAIClient:
             metadata: Additional metadata
 
         Returns:
-            The API response
+            {"queued": True} (sent in the background), or the API response
+            when KEYWORDSAI_LOG_ASYNC=false
         """
         import json
 
@@ -239,13 +471,7 @@ class KeywordsAIClient:
         if customer_identifier:
             payload["customer_identifier"] = customer_identifier
 
-        response = requests.post(
-            "https://api.keywordsai.co/api/request-logs/create/",
-            headers=self._headers(),
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._submit_log("https://api.keywordsai.co/api/request-logs/create/", payload)
 
 
     def log_custom_event(
@@ -279,15 +505,9 @@ class KeywordsAIClient:
         payload["metadata"]["event_name"] = event_name
 
         try:
-            response = requests.post(
-                f"{self.base_url.replace('/api/', '/api/')}/request-logs/create/",
-                headers=self._headers(),
-                json=payload,
-                timeout=2 # Short timeout to not block
-            )
-            # Don't raise error for custom events to avoid breaking main flow
-            return response.json() if response.ok else {}
+            return self._submit_log(f"{self.base_url.replace('/api/', '/api/')}/request-logs/create/", payload)
         except Exception as e:
+            # Don't raise error for custom events to avoid breaking main flow
             print(f"Warning: Failed to log custom event {event_name}: {e}")
             return {}
 
@@ -363,7 +583,8 @@ def log_agent_run(
         tools_used: List of tools that were invoked
 
     Returns:
-        The API response
+        {"queued": True} (sent in the background), or the API response
+        when KEYWORDSAI_LOG_ASYNC=false
     """
     client = KeywordsAIClient()
     return client.log_request(
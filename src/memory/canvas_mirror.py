@@ -0,0 +1,559 @@
+"""
+Local SQLite mirror of the user's Canvas course data.
+
+Cross-course questions ("which assignments are due this week across all my
+courses") used to fan out into get_canvas_courses plus one call per course.
+The mirror keeps courses, assignments (with the user's submission),
+submissions, modules and announcements in SQLite, so query tools answer
+them with one indexed query.
+
+Sync:
+- Each (resource, course) pair is refreshed when it is older than its
+  MIRROR_TTLS entry; the first query for a user syncs what it needs, after
+  which the background scheduler (started by the server lifespan) keeps
+  the current user's synced pairs fresh every MIRROR_SYNC_INTERVAL seconds
+- The transports' list tools take no updated_since parameter, so a refresh
+  re-lists the resource and writes only the rows whose content changed
+  (row hash), deleting rows that disappeared; rows_unchanged / rows_written
+  in the stats show how much of each refresh was a no-op
+- Listings that pass through run_mcp_tool anyway (get_course_assignments,
+  list_modules, ...) are ingested the same way, and a write made through the
+  agent marks the affected (resource, course) pairs stale
+- Canvas calls go straight to the transport (not the response cache) with
+  MIRROR_SYNC_CONCURRENCY calls at a time; concurrent queries needing the
+  same pair share one sync
+
+Without aiosqlite the mirror is disabled and the query tools say so.
+"""
+
+import asyncio
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import aiosqlite
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+from dateutil import parser as date_parser
+
+from src.tools.canvas_transport import get_transport
+from src.tools.tool_cache import WRITE_INVALIDATES, WRITE_PREFIXES, cache_identity, normalize_args
+
+
+CANVAS_MIRROR_ENABLED = os.getenv("CANVAS_MIRROR_ENABLED", "true").lower() == "true" and SQLITE_AVAILABLE
+CANVAS_MIRROR_PATH = os.getenv("CANVAS_MIRROR_PATH", os.path.join(os.path.dirname(__file__), "canvas_mirror.db"))
+# Seconds between background refresh passes (0 disables the scheduler)
+MIRROR_SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL", "60"))
+# Concurrent Canvas calls made by one sync
+MIRROR_SYNC_CONCURRENCY = int(os.getenv("MIRROR_SYNC_CONCURRENCY", "4"))
+# Characters of announcement text kept
+MIRROR_TEXT_CHARS = int(os.getenv("MIRROR_TEXT_CHARS", "2000"))
+
+# Seconds before a (resource, course) pair is refreshed
+MIRROR_TTLS = {
+    "courses": 3600,
+    "assignments": 600,  # includes the user's submissions
+    "modules": 1800,
+    "announcements": 300,
+}
+# Per-course resources, the list tool that fetches them and its extra arguments
+COURSE_RESOURCES = {
+    "assignments": ("canvas_list_assignments", {"include_submissions": True}),
+    "modules": ("canvas_list_modules", {}),
+    "announcements": ("canvas_list_announcements", {}),
+}
+# Read tool -> mirrored resource it covers (write invalidation, see WRITE_INVALIDATES)
+TOOL_RESOURCES = {
+    "canvas_list_courses": "courses",
+    "canvas_get_course": "courses",
+    "canvas_list_assignments": "assignments",
+    "canvas_get_assignment": "assignments",
+    "canvas_get_upcoming_assignments": "assignments",
+    "canvas_get_submission": "assignments",
+    "canvas_list_modules": "modules",
+    "canvas_get_module": "modules",
+    "canvas_list_module_items": "modules",
+    "canvas_list_announcements": "announcements",
+}
+# List tools whose full results are stored when they pass through run_mcp_tool
+INGEST_TOOLS = {"canvas_list_courses": "courses", **{tool: r for r, (tool, _) in COURSE_RESOURCES.items()}}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    identity TEXT NOT NULL, id INTEGER NOT NULL, name TEXT, course_code TEXT, term TEXT,
+    workflow_state TEXT, start_at TEXT, end_at TEXT, row_hash TEXT, synced_at REAL,
+    PRIMARY KEY (identity, id)
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    identity TEXT NOT NULL, course_id INTEGER NOT NULL, id INTEGER NOT NULL, name TEXT, due_at TEXT,
+    lock_at TEXT, points_possible REAL, published INTEGER, submission_types TEXT, html_url TEXT,
+    updated_at TEXT, row_hash TEXT, synced_at REAL,
+    PRIMARY KEY (identity, id)
+);
+CREATE INDEX IF NOT EXISTS assignments_due ON assignments (identity, due_at);
+CREATE INDEX IF NOT EXISTS assignments_course ON assignments (identity, course_id);
+CREATE TABLE IF NOT EXISTS submissions (
+    identity TEXT NOT NULL, course_id INTEGER NOT NULL, assignment_id INTEGER NOT NULL,
+    workflow_state TEXT, submitted_at TEXT, graded_at TEXT, score REAL, grade TEXT,
+    late INTEGER, missing INTEGER, excused INTEGER, row_hash TEXT, synced_at REAL,
+    PRIMARY KEY (identity, assignment_id)
+);
+CREATE INDEX IF NOT EXISTS submissions_course ON submissions (identity, course_id);
+CREATE TABLE IF NOT EXISTS modules (
+    identity TEXT NOT NULL, course_id INTEGER NOT NULL, id INTEGER NOT NULL, name TEXT, position INTEGER,
+    state TEXT, unlock_at TEXT, items_count INTEGER, completed_at TEXT, row_hash TEXT, synced_at REAL,
+    PRIMARY KEY (identity, id)
+);
+CREATE INDEX IF NOT EXISTS modules_course ON modules (identity, course_id);
+CREATE TABLE IF NOT EXISTS announcements (
+    identity TEXT NOT NULL, course_id INTEGER NOT NULL, id INTEGER NOT NULL, title TEXT, posted_at TEXT,
+    author TEXT, message TEXT, html_url TEXT, row_hash TEXT, synced_at REAL,
+    PRIMARY KEY (identity, id)
+);
+CREATE INDEX IF NOT EXISTS announcements_posted ON announcements (identity, posted_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    identity TEXT NOT NULL, resource TEXT NOT NULL, course_id INTEGER NOT NULL,
+    synced_at REAL NOT NULL, rows INTEGER, status TEXT,
+    PRIMARY KEY (identity, resource, course_id)
+);
+"""
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def utc_iso(value: Any) -> Optional[str]:
+    """Canvas timestamp (or any parseable date) as "YYYY-MM-DDTHH:MM:SSZ" in UTC, so strings sort by time."""
+    if not value:
+        return None
+    try:
+        dt = value if isinstance(value, datetime) else date_parser.parse(str(value))
+    except (ValueError, OverflowError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def strip_html(value: Any, limit: int = None) -> str:
+    text = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", str(value or "")))).strip()
+    return text[:limit] if limit else text
+
+
+def _records(raw: Any) -> Optional[List[Dict[str, Any]]]:
+    """Records of a list tool result (None when it is not a JSON list, e.g. error text)."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return None
+    if isinstance(raw, dict):
+        raw = next((v for v in raw.values() if isinstance(v, list)), None)
+    if not isinstance(raw, list):
+        return None
+    return [r for r in raw if isinstance(r, dict) and r.get("id") is not None]
+
+
+def course_key(value: Any) -> Optional[int]:
+    """Numeric Canvas course id, or None for ids the mirror cannot key on (e.g. "sis_course_id:CS101")."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def _flag(value: Any) -> Optional[int]:
+    return None if value is None else int(bool(value))
+
+
+# Row builders: record -> column values (identity, course_id and bookkeeping are added by _replace)
+def _course_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    term = r.get("term")
+    return {"id": int(r["id"]), "name": r.get("name"), "course_code": r.get("course_code"),
+            "term": term.get("name") if isinstance(term, dict) else term,
+            "workflow_state": r.get("workflow_state"), "start_at": utc_iso(r.get("start_at")),
+            "end_at": utc_iso(r.get("end_at"))}
+
+
+def _assignment_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": int(r["id"]), "name": r.get("name"), "due_at": utc_iso(r.get("due_at")),
+            "lock_at": utc_iso(r.get("lock_at")), "points_possible": r.get("points_possible"),
+            "published": _flag(r.get("published")), "submission_types": ",".join(r.get("submission_types") or []),
+            "html_url": r.get("html_url"), "updated_at": utc_iso(r.get("updated_at"))}
+
+
+def _submission_row(r: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    s = r.get("submission")
+    if not isinstance(s, dict):
+        return None
+    return {"assignment_id": int(r["id"]), "workflow_state": s.get("workflow_state"),
+            "submitted_at": utc_iso(s.get("submitted_at")), "graded_at": utc_iso(s.get("graded_at")),
+            "score": s.get("score"), "grade": s.get("grade"), "late": _flag(s.get("late")),
+            "missing": _flag(s.get("missing")), "excused": _flag(s.get("excused"))}
+
+
+def _module_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": int(r["id"]), "name": r.get("name"), "position": r.get("position"), "state": r.get("state"),
+            "unlock_at": utc_iso(r.get("unlock_at")), "items_count": r.get("items_count"),
+            "completed_at": utc_iso(r.get("completed_at"))}
+
+
+def _announcement_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    author = r.get("author")
+    return {"id": int(r["id"]), "title": r.get("title"), "posted_at": utc_iso(r.get("posted_at")),
+            "author": author.get("display_name") if isinstance(author, dict) else r.get("user_name"),
+            "message": strip_html(r.get("message"), MIRROR_TEXT_CHARS), "html_url": r.get("html_url")}
+
+
+def _row_hash(row: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CanvasMirror:
+    """SQLite copy of courses, assignments, submissions, modules and announcements per Canvas user."""
+
+    def __init__(self, path: str = None, interval: float = MIRROR_SYNC_INTERVAL,
+                 concurrency: int = MIRROR_SYNC_CONCURRENCY):
+        self.path = path or CANVAS_MIRROR_PATH
+        self.interval = interval
+        self.concurrency = concurrency
+        self.conn: Any = None
+        self._open_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._synced: Dict[Tuple[str, str, int], float] = {}
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "syncs": 0,
+            "sync_errors": 0,
+            "api_calls": 0,
+            "ingested_listings": 0,
+            "rows_written": 0,
+            "rows_unchanged": 0,
+            "rows_deleted": 0,
+            "marked_stale": 0,
+            "queries": 0,
+            "background_passes": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return CANVAS_MIRROR_ENABLED
+
+    async def open(self) -> bool:
+        """Open the database (idempotent); False when the mirror is disabled or cannot open."""
+        if self.conn is not None:
+            return True
+        if not self.enabled:
+            return False
+        async with self._open_lock:
+            if self.conn is None:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    conn = await aiosqlite.connect(self.path)
+                    await conn.execute("PRAGMA journal_mode=WAL")
+                    await conn.execute("PRAGMA synchronous=NORMAL")
+                    await conn.executescript(SCHEMA)
+                    await conn.commit()
+                    async with conn.execute("SELECT identity, resource, course_id, synced_at FROM sync_state") as cur:
+                        async for identity, resource, course_id, synced_at in cur:
+                            self._synced[(identity, resource, course_id)] = synced_at
+                    self._semaphore = asyncio.Semaphore(max(1, self.concurrency))
+                    self.conn = conn
+                    print(f"[MIRROR] Canvas mirror open ({self.path})", file=sys.stderr)
+                except Exception as e:
+                    print(f"[ERROR] Canvas mirror failed to open: {e}", file=sys.stderr)
+                    return False
+        return True
+
+    async def start(self) -> None:
+        """Open the mirror and start the background refresh of already-synced data."""
+        if await self.open() and self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        inflight = list(self._inflight.values())
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_all()
+            except Exception as e:
+                print(f"[MIRROR] Background refresh failed: {e}", file=sys.stderr)
+
+    async def refresh_all(self) -> int:
+        """Refresh the stale pairs the current user has already synced.
+
+        Only pairs a query or listing asked for are kept fresh, and only for
+        the identity of the configured token: the transport cannot act as
+        any other user.
+        """
+        self._stats["background_passes"] += 1
+        identity = cache_identity()
+        keys = [key for key in self._synced if key[0] == identity and self._stale(*key)]
+        results = await asyncio.gather(*(self._sync(*key) for key in keys))
+        return sum(results)
+
+    # --- Sync ---
+
+    def _stale(self, identity: str, resource: str, course_id: int) -> bool:
+        synced_at = self._synced.get((identity, resource, course_id))
+        return synced_at is None or time.time() - synced_at > MIRROR_TTLS[resource]
+
+    async def ensure_fresh(self, resources: Sequence[str], course_id: int = None, identity: str = None) -> int:
+        """Sync the stale parts of `resources` (all active courses, or one) before a query.
+
+        Returns:
+            Number of (resource, course) pairs refreshed. Failures are logged
+            and leave the previous rows in place.
+        """
+        if not await self.open():
+            return 0
+        identity = identity or cache_identity()
+        refreshed = 0
+        if self._stale(identity, "courses", 0):
+            refreshed += await self._sync(identity, "courses", 0)
+        course_ids = [int(course_id)] if course_id is not None else await self.course_ids(identity)
+        pairs = [(resource, cid) for resource in resources if resource in COURSE_RESOURCES
+                 for cid in course_ids if self._stale(identity, resource, cid)]
+        results = await asyncio.gather(*(self._sync(identity, resource, cid) for resource, cid in pairs))
+        return refreshed + sum(results)
+
+    async def _sync(self, identity: str, resource: str, course_id: int) -> int:
+        """Refresh one pair; concurrent callers share the same sync."""
+        key = (identity, resource, course_id)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._fetch_and_store(identity, resource, course_id))
+            task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, identity: str, resource: str, course_id: int) -> int:
+        if resource == "courses":
+            tool_name, arguments = "canvas_list_courses", {"include_ended": False}
+        else:
+            tool_name, extra = COURSE_RESOURCES[resource]
+            arguments = {"course_id": course_id, **extra}
+        try:
+            async with self._semaphore:
+                self._stats["api_calls"] += 1
+                raw = await get_transport().call_tool(tool_name, arguments)
+            records = _records(raw)
+            if records is None:
+                raise ValueError(str(raw)[:200])
+        except Exception as e:
+            self._stats["sync_errors"] += 1
+            print(f"[MIRROR] Sync of {resource} (course {course_id}) failed: {e}", file=sys.stderr)
+            return 0
+        await self._store(identity, resource, course_id, records)
+        self._stats["syncs"] += 1
+        return 1
+
+    async def ingest(self, tool_name: str, arguments: Dict[str, Any], raw: Any, identity: str = None) -> None:
+        """Store a full listing that passed through run_mcp_tool (other results are ignored)."""
+        resource = INGEST_TOOLS.get(tool_name)
+        if self.conn is None or resource is None:
+            return
+        arguments = normalize_args(arguments)
+        if resource == "courses":
+            if arguments.get("include_ended"):
+                return
+            course_id = 0
+        else:
+            # SIS-style ids are skipped; the mirror keys courses by Canvas id
+            course_id = course_key(arguments.get("course_id"))
+            # The mirror's assignment rows carry submissions; a listing without them is not a full refresh
+            if course_id is None or (resource == "assignments" and not arguments.get("include_submissions")):
+                return
+        records = _records(raw)
+        if records is not None:
+            self._stats["ingested_listings"] += 1
+            await self._store(identity or cache_identity(), resource, course_id, records)
+
+    def note_write(self, tool_name: str, arguments: Dict[str, Any], identity: str = None) -> int:
+        """Mark the (resource, course) pairs a write may have changed as stale."""
+        if not tool_name.startswith(WRITE_PREFIXES):
+            return 0
+        identity = identity or cache_identity()
+        targets = WRITE_INVALIDATES.get(tool_name)
+        resources = {TOOL_RESOURCES[t] for t in targets if t in TOOL_RESOURCES} if targets else set(MIRROR_TTLS)
+        # A course id the mirror cannot key on marks all of the user's courses
+        course_id = course_key(normalize_args(arguments).get("course_id"))
+        stale = [key for key in self._synced if key[0] == identity and key[1] in resources
+                 and (course_id is None or key[2] in (0, course_id))]
+        for key in stale:
+            self._synced[key] = 0.0
+        self._stats["marked_stale"] += len(stale)
+        return len(stale)
+
+    async def _store(self, identity: str, resource: str, course_id: int, records: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        async with self._write_lock:
+            if resource == "courses":
+                await self._replace("courses", identity, None, [_course_row(r) for r in records], "id", now)
+            elif resource == "assignments":
+                await self._replace("assignments", identity, course_id, [_assignment_row(r) for r in records],
+                                    "id", now)
+                submissions = [row for row in (_submission_row(r) for r in records) if row]
+                await self._replace("submissions", identity, course_id, submissions, "assignment_id", now)
+            elif resource == "modules":
+                await self._replace("modules", identity, course_id, [_module_row(r) for r in records], "id", now)
+            elif resource == "announcements":
+                await self._replace("announcements", identity, course_id,
+                                    [_announcement_row(r) for r in records], "id", now)
+            await self.conn.execute(
+                "INSERT INTO sync_state (identity, resource, course_id, synced_at, rows, status) "
+                "VALUES (?, ?, ?, ?, ?, 'ok') ON CONFLICT(identity, resource, course_id) DO UPDATE SET "
+                "synced_at = excluded.synced_at, rows = excluded.rows, status = excluded.status",
+                (identity, resource, course_id, now, len(records))
+            )
+            await self.conn.commit()
+        self._synced[(identity, resource, course_id)] = now
+
+    async def _replace(self, table: str, identity: str, course_id: Optional[int], rows: List[Dict[str, Any]],
+                       key: str, now: float) -> None:
+        """Make the table's rows for (identity, course) equal `rows`, writing only what changed."""
+        scope, params = ("identity = ?", [identity]) if course_id is None else \
+            ("identity = ? AND course_id = ?", [identity, course_id])
+        async with self.conn.execute(f"SELECT {key}, row_hash FROM {table} WHERE {scope}", params) as cur:
+            existing = {row[0]: row[1] async for row in cur}
+
+        changed = []
+        for row in rows:
+            row_hash = _row_hash(row)
+            if existing.pop(row[key], None) == row_hash:
+                self._stats["rows_unchanged"] += 1
+                continue
+            full = {"identity": identity, **({} if course_id is None else {"course_id": course_id}), **row,
+                    "row_hash": row_hash, "synced_at": now}
+            changed.append(full)
+        if changed:
+            columns = list(changed[0])
+            await self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[c] for c in columns) for row in changed]
+            )
+            self._stats["rows_written"] += len(changed)
+        if existing:
+            await self.conn.executemany(f"DELETE FROM {table} WHERE identity = ? AND {key} = ?",
+                                        [(identity, k) for k in existing])
+            self._stats["rows_deleted"] += len(existing)
+
+    # --- Queries ---
+
+    async def course_ids(self, identity: str = None) -> List[int]:
+        return [row["id"] for row in await self.query(
+            "SELECT id FROM courses WHERE identity = ? ORDER BY id", (identity or cache_identity(),))]
+
+    async def query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        """Run a read query and return rows as dicts."""
+        if not await self.open():
+            return []
+        self._stats["queries"] += 1
+        async with self.conn.execute(sql, tuple(params)) as cur:
+            columns = [c[0] for c in cur.description]
+            return [dict(zip(columns, row)) async for row in cur]
+
+    def last_synced(self, identity: str = None) -> Optional[float]:
+        """Oldest sync time of the user's per-course data (None before the first sync)."""
+        identity = identity or cache_identity()
+        times = [t for (i, resource, _), t in self._synced.items() if i == identity and resource != "courses"]
+        return min(times) if times else None
+
+    async def assignments_due(self, start: str, end: str, course_id: int = None,
+                              include_submitted: bool = True) -> List[Dict[str, Any]]:
+        """Assignments due in [start, end) across courses, with the user's submission state."""
+        identity = cache_identity()
+        await self.ensure_fresh(("assignments",), course_id, identity)
+        sql = ("SELECT c.name AS course, a.course_id, a.id AS assignment_id, a.name, a.due_at, a.points_possible, "
+               "s.workflow_state AS submission, s.score, a.html_url "
+               "FROM assignments a JOIN courses c ON c.identity = a.identity AND c.id = a.course_id "
+               "LEFT JOIN submissions s ON s.identity = a.identity AND s.assignment_id = a.id "
+               "WHERE a.identity = ? AND a.due_at >= ? AND a.due_at < ?")
+        params: List[Any] = [identity, utc_iso(start), utc_iso(end)]
+        if course_id is not None:
+            sql += " AND a.course_id = ?"
+            params.append(int(course_id))
+        if not include_submitted:
+            sql += " AND (s.submitted_at IS NULL AND COALESCE(s.workflow_state, 'unsubmitted') = 'unsubmitted')"
+        return await self.query(sql + " ORDER BY a.due_at, c.name", params)
+
+    async def missing_work(self, course_id: int = None) -> List[Dict[str, Any]]:
+        """Past-due assignments with no submission (or flagged missing by Canvas)."""
+        identity = cache_identity()
+        await self.ensure_fresh(("assignments",), course_id, identity)
+        sql = ("SELECT c.name AS course, a.course_id, a.id AS assignment_id, a.name, a.due_at, a.points_possible, "
+               "s.workflow_state AS submission, a.html_url "
+               "FROM assignments a JOIN courses c ON c.identity = a.identity AND c.id = a.course_id "
+               "JOIN submissions s ON s.identity = a.identity AND s.assignment_id = a.id "
+               "WHERE a.identity = ? AND COALESCE(s.excused, 0) = 0 AND (s.missing = 1 OR "
+               "(a.due_at < ? AND s.submitted_at IS NULL AND s.workflow_state = 'unsubmitted'))")
+        params: List[Any] = [identity, utc_iso(datetime.now(timezone.utc))]
+        if course_id is not None:
+            sql += " AND a.course_id = ?"
+            params.append(int(course_id))
+        return await self.query(sql + " ORDER BY a.due_at, c.name", params)
+
+    async def recent_announcements(self, since: str, course_id: int = None) -> List[Dict[str, Any]]:
+        """Announcements posted since `since`, newest first."""
+        identity = cache_identity()
+        await self.ensure_fresh(("announcements",), course_id, identity)
+        sql = ("SELECT c.name AS course, n.course_id, n.id AS announcement_id, n.title, n.posted_at, n.author, "
+               "substr(n.message, 1, 300) AS message, n.html_url "
+               "FROM announcements n JOIN courses c ON c.identity = n.identity AND c.id = n.course_id "
+               "WHERE n.identity = ? AND n.posted_at >= ?")
+        params: List[Any] = [identity, utc_iso(since)]
+        if course_id is not None:
+            sql += " AND n.course_id = ?"
+            params.append(int(course_id))
+        return await self.query(sql + " ORDER BY n.posted_at DESC", params)
+
+    async def module_progress(self, course_id: int = None) -> List[Dict[str, Any]]:
+        """Modules per course with their state for the user (locked / unlocked / started / completed)."""
+        identity = cache_identity()
+        await self.ensure_fresh(("modules",), course_id, identity)
+        sql = ("SELECT c.name AS course, m.course_id, m.id AS module_id, m.name, m.position, m.state, "
+               "m.items_count, m.unlock_at, m.completed_at "
+               "FROM modules m JOIN courses c ON c.identity = m.identity AND c.id = m.course_id "
+               "WHERE m.identity = ?")
+        params: List[Any] = [identity]
+        if course_id is not None:
+            sql += " AND m.course_id = ?"
+            params.append(int(course_id))
+        return await self.query(sql + " ORDER BY c.name, m.position", params)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "open": self.conn is not None,
+            "synced_pairs": len(self._synced),
+            "syncing": len(self._inflight),
+            "path": self.path,
+        }
+
+
+# Global mirror used by the query tools and the server lifespan
+canvas_mirror = CanvasMirror()
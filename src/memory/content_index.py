@@ -0,0 +1,557 @@
+"""
+Full-text search index over course pages, syllabi and announcements.
+
+get_canvas_page, list_announcements and the syllabus return whole HTML
+bodies, and the executor used to read them end to end to find one detail
+(late policy, office hours, exam room). The content index keeps their
+stripped text in SQLite, split into passages, and search_course_content
+returns the best-ranked passages as short snippets.
+
+Index:
+- SQLite FTS5 (porter stemming, bm25 ranking with titles weighted up) when
+  the sqlite build has it; otherwise a plain table searched with LIKE and
+  ranked by term hits, so the tool keeps working
+- Each document (page, syllabus, announcement) is split into passages of
+  about CONTENT_CHUNK_CHARS characters; a document is re-indexed only when
+  its text hash changes
+
+Crawler:
+- The first search in a course indexes it before answering; later searches
+  answer from the index and re-crawl in the background once the course is
+  older than CONTENT_INDEX_TTL
+- The background crawler (started by the server lifespan) re-crawls the
+  current user's stale courses every CONTENT_CRAWL_INTERVAL seconds, covering
+  only courses that were searched or had content read through the agent
+- Pages are listed first and only pages whose updated_at changed are
+  fetched; pages, syllabi and announcements read through run_mcp_tool are
+  indexed as they pass, and writes mark the course for a re-crawl
+- Canvas calls go straight to the transport, CONTENT_CRAWL_CONCURRENCY at a
+  time; concurrent searches of an unindexed course share one crawl
+
+Without aiosqlite the index is disabled and the search tool says so.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    import aiosqlite
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+from src.memory.canvas_mirror import course_key, strip_html, utc_iso, _records
+from src.tools.canvas_http import get_canvas_base_url
+from src.tools.canvas_transport import get_transport
+from src.tools.tool_cache import WRITE_INVALIDATES, WRITE_PREFIXES, cache_identity, normalize_args
+
+
+CONTENT_INDEX_ENABLED = os.getenv("CONTENT_INDEX_ENABLED", "true").lower() == "true" and SQLITE_AVAILABLE
+CONTENT_INDEX_PATH = os.getenv("CONTENT_INDEX_PATH", os.path.join(os.path.dirname(__file__), "content_index.db"))
+# Seconds before a course's content is re-crawled
+CONTENT_INDEX_TTL = float(os.getenv("CONTENT_INDEX_TTL", "1800"))
+# Seconds between background crawl passes (0 disables the crawler)
+CONTENT_CRAWL_INTERVAL = float(os.getenv("CONTENT_CRAWL_INTERVAL", "300"))
+# Concurrent Canvas calls made by one crawl
+CONTENT_CRAWL_CONCURRENCY = int(os.getenv("CONTENT_CRAWL_CONCURRENCY", "4"))
+# Pages fetched per course and crawl (the most recently updated first)
+CONTENT_MAX_PAGES = int(os.getenv("CONTENT_MAX_PAGES", "200"))
+# Approximate characters per indexed passage
+CONTENT_CHUNK_CHARS = int(os.getenv("CONTENT_CHUNK_CHARS", "1200"))
+# Passages returned per search and tokens per snippet
+CONTENT_SEARCH_LIMIT = int(os.getenv("CONTENT_SEARCH_LIMIT", "6"))
+CONTENT_SNIPPET_TOKENS = int(os.getenv("CONTENT_SNIPPET_TOKENS", "32"))
+
+# Read tools whose results hold indexed content (write invalidation, see WRITE_INVALIDATES)
+CONTENT_TOOLS = {"canvas_list_pages", "canvas_get_page", "canvas_get_syllabus", "canvas_list_announcements"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_docs (
+    identity TEXT NOT NULL, course_id INTEGER NOT NULL, kind TEXT NOT NULL, doc_id TEXT NOT NULL,
+    title TEXT, url TEXT, updated_at TEXT, chunks INTEGER, row_hash TEXT, indexed_at REAL,
+    PRIMARY KEY (identity, course_id, kind, doc_id)
+);
+CREATE TABLE IF NOT EXISTS content_state (
+    identity TEXT NOT NULL, course_id INTEGER NOT NULL, crawled_at REAL NOT NULL, docs INTEGER,
+    PRIMARY KEY (identity, course_id)
+);
+"""
+# Passages: FTS5 table when available, plain table (LIKE search) otherwise; same columns either way
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5(
+    title, body, identity UNINDEXED, course_id UNINDEXED, kind UNINDEXED, doc_id UNINDEXED, url UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+PLAIN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_chunks (
+    title TEXT, body TEXT, identity TEXT NOT NULL, course_id INTEGER NOT NULL, kind TEXT NOT NULL,
+    doc_id TEXT NOT NULL, url TEXT
+);
+CREATE INDEX IF NOT EXISTS content_chunks_doc ON content_chunks (identity, course_id, kind, doc_id);
+"""
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how", "i", "in", "is", "it",
+    "me", "my", "of", "on", "or", "the", "this", "to", "was", "what", "when", "where", "which", "who", "will",
+    "with", "about", "course", "class",
+}
+
+_SCRIPT_RE = re.compile(r"<(script|style)\b.*?</\1>", re.IGNORECASE | re.DOTALL)
+_BLOCK_RE = re.compile(r"</?(p|div|h[1-6]|li|tr|br|section|article)\b[^>]*>", re.IGNORECASE)
+_TERM_RE = re.compile(r"\w+")
+
+
+def content_text(value: Any) -> str:
+    """HTML body as plain text, keeping block boundaries as sentence breaks."""
+    value = _BLOCK_RE.sub(". ", _SCRIPT_RE.sub(" ", str(value or "")))
+    text = strip_html(value)
+    return re.sub(r"(\s*\.\s*){2,}", ". ", text).strip(" .")
+
+
+def chunk_text(text: str, size: int = CONTENT_CHUNK_CHARS) -> List[str]:
+    """Split text into passages of about `size` characters at sentence (or word) boundaries."""
+    if len(text) <= size:
+        return [text] if text else []
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = text.rfind(". ", start + size // 2, end)
+            cut = cut + 1 if cut != -1 else text.rfind(" ", start + size // 2, end)
+            end = cut if cut > start else end
+        chunks.append(text[start:end].strip())
+        start = end
+    return [c for c in chunks if c]
+
+
+def query_terms(query: str) -> List[str]:
+    """Search terms of a free-text question (stop words dropped unless nothing else is left)."""
+    terms = [t.lower() for t in _TERM_RE.findall(query or "")]
+    kept = [t for t in terms if t not in STOP_WORDS]
+    return list(dict.fromkeys(kept or terms))
+
+
+def _doc_hash(title: Optional[str], text: str) -> str:
+    return hashlib.sha1(json.dumps([title, text]).encode()).hexdigest()
+
+
+class ContentIndex:
+    """Passage-level search over each user's course pages, syllabi and announcements."""
+
+    def __init__(self, path: str = None, interval: float = CONTENT_CRAWL_INTERVAL,
+                 concurrency: int = CONTENT_CRAWL_CONCURRENCY):
+        self.path = path or CONTENT_INDEX_PATH
+        self.interval = interval
+        self.concurrency = concurrency
+        self.conn: Any = None
+        self.fts = False
+        self._open_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._crawled: Dict[Tuple[str, int], float] = {}
+        self._inflight: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "crawls": 0,
+            "crawl_errors": 0,
+            "call_errors": 0,
+            "api_calls": 0,
+            "pages_skipped": 0,
+            "docs_indexed": 0,
+            "docs_unchanged": 0,
+            "docs_deleted": 0,
+            "chunks_indexed": 0,
+            "ingested": 0,
+            "marked_stale": 0,
+            "searches": 0,
+            "background_passes": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return CONTENT_INDEX_ENABLED
+
+    @property
+    def table(self) -> str:
+        return "content_fts" if self.fts else "content_chunks"
+
+    async def open(self) -> bool:
+        """Open the database (idempotent); False when the index is disabled or cannot open."""
+        if self.conn is not None:
+            return True
+        if not self.enabled:
+            return False
+        async with self._open_lock:
+            if self.conn is None:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    conn = await aiosqlite.connect(self.path)
+                    await conn.execute("PRAGMA journal_mode=WAL")
+                    await conn.execute("PRAGMA synchronous=NORMAL")
+                    await conn.executescript(SCHEMA)
+                    try:
+                        await conn.executescript(FTS_SCHEMA)
+                        self.fts = True
+                    except Exception as e:
+                        print(f"[CONTENT] FTS5 unavailable ({e}), using LIKE search", file=sys.stderr)
+                        await conn.executescript(PLAIN_SCHEMA)
+                        self.fts = False
+                    await conn.commit()
+                    async with conn.execute("SELECT identity, course_id, crawled_at FROM content_state") as cur:
+                        async for identity, course_id, crawled_at in cur:
+                            self._crawled[(identity, course_id)] = crawled_at
+                    self._semaphore = asyncio.Semaphore(max(1, self.concurrency))
+                    self.conn = conn
+                    print(f"[CONTENT] Content index open ({self.path}, {'fts5' if self.fts else 'like'})",
+                          file=sys.stderr)
+                except Exception as e:
+                    print(f"[ERROR] Content index failed to open: {e}", file=sys.stderr)
+                    return False
+        return True
+
+    async def start(self) -> None:
+        """Open the index and start the background crawler."""
+        if await self.open() and self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        inflight = list(self._inflight.values())
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_all()
+            except Exception as e:
+                print(f"[CONTENT] Background crawl failed: {e}", file=sys.stderr)
+
+    async def refresh_all(self) -> int:
+        """Re-crawl the stale courses the current user has searched or read content from.
+
+        Only the identity of the configured token is crawled: the transport
+        cannot act as any other user.
+        """
+        self._stats["background_passes"] += 1
+        identity = cache_identity()
+        crawled = 0
+        for course_id in await self._known_courses(identity):
+            if self._stale(identity, course_id):
+                crawled += await self._crawl(identity, course_id)
+        return crawled
+
+    async def _known_courses(self, identity: str) -> List[int]:
+        """Courses already crawled (searched) or holding ingested documents for the user."""
+        courses = {course_id for i, course_id in self._crawled if i == identity}
+        async with self.conn.execute("SELECT DISTINCT course_id FROM content_docs WHERE identity = ?",
+                                     (identity,)) as cur:
+            courses.update([row[0] async for row in cur])
+        return sorted(courses)
+
+    # --- Crawl ---
+
+    def _stale(self, identity: str, course_id: int) -> bool:
+        crawled_at = self._crawled.get((identity, course_id))
+        return crawled_at is None or time.time() - crawled_at > CONTENT_INDEX_TTL
+
+    async def ensure_indexed(self, course_id: int, identity: str = None) -> bool:
+        """Make sure the course has been crawled once; a stale index is refreshed in the background.
+
+        Returns:
+            True when the course has index data to search.
+        """
+        if not await self.open():
+            return False
+        identity = identity or cache_identity()
+        key = (identity, int(course_id))
+        if key not in self._crawled:
+            await asyncio.shield(self._crawl_task(*key))
+        elif self._stale(*key):
+            self._crawl_task(*key)
+        return key in self._crawled
+
+    async def _crawl(self, identity: str, course_id: int) -> int:
+        return await asyncio.shield(self._crawl_task(identity, course_id))
+
+    def _crawl_task(self, identity: str, course_id: int) -> asyncio.Task:
+        """Crawl task of one course; concurrent callers share the same crawl."""
+        key = (identity, course_id)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._crawl_course(identity, course_id))
+            task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+        return task
+
+    async def _call(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Parsed transport result, or None when the call fails (e.g. pages disabled in the course)."""
+        try:
+            async with self._semaphore:
+                self._stats["api_calls"] += 1
+                raw = await get_transport().call_tool(tool_name, arguments)
+            return json.loads(raw) if isinstance(raw, str) else raw
+        except Exception as e:
+            self._stats["call_errors"] += 1
+            print(f"[CONTENT] {tool_name} {arguments} failed: {e}", file=sys.stderr)
+            return None
+
+    async def _crawl_course(self, identity: str, course_id: int) -> int:
+        pages, syllabus, announcements = await asyncio.gather(
+            self._call("canvas_list_pages", {"course_id": course_id}),
+            self._call("canvas_get_syllabus", {"course_id": course_id}),
+            self._call("canvas_list_announcements", {"course_id": course_id}),
+        )
+        if pages is None and syllabus is None and announcements is None:
+            self._stats["crawl_errors"] += 1
+            return 0
+        docs, keep = [], {}
+        if isinstance(pages, list):
+            pages = sorted((p for p in pages if isinstance(p, dict) and p.get("url")),
+                           key=lambda p: utc_iso(p.get("updated_at")) or "", reverse=True)[:CONTENT_MAX_PAGES]
+            # Fetch only pages whose updated_at moved since they were indexed
+            known = await self._doc_versions(identity, course_id, "page")
+            to_fetch = [p for p in pages if known.get(p["url"]) != utc_iso(p.get("updated_at"))]
+            self._stats["pages_skipped"] += len(pages) - len(to_fetch)
+            fetched = await asyncio.gather(*(self._call("canvas_get_page", {"course_id": course_id,
+                                                                             "page_url": p["url"]})
+                                             for p in to_fetch))
+            docs += [self._page_doc(page) for page in fetched if isinstance(page, dict) and page.get("url")]
+            keep["page"] = {p["url"] for p in pages}
+        if isinstance(syllabus, dict):
+            if syllabus.get("syllabus_body"):
+                docs.append(self._syllabus_doc(course_id, syllabus))
+            keep["syllabus"] = {"syllabus"} if syllabus.get("syllabus_body") else set()
+        records = _records(announcements)
+        if records is not None:
+            docs += [self._announcement_doc(a) for a in records]
+            keep["announcement"] = {str(a["id"]) for a in records}
+
+        async with self._write_lock:
+            for doc in docs:
+                await self._put(identity, course_id, *doc)
+            await self._drop_missing(identity, course_id, keep)
+            now = time.time()
+            await self.conn.execute(
+                "INSERT INTO content_state (identity, course_id, crawled_at, docs) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(identity, course_id) DO UPDATE SET crawled_at = excluded.crawled_at, "
+                "docs = excluded.docs",
+                (identity, course_id, now, sum(len(ids) for ids in keep.values()))
+            )
+            await self.conn.commit()
+        self._crawled[(identity, course_id)] = now
+        self._stats["crawls"] += 1
+        return 1
+
+    # Document builders: record -> (kind, doc_id, title, url, updated_at, text)
+    @staticmethod
+    def _page_doc(page: Dict[str, Any]) -> Tuple:
+        return ("page", page.get("url"), page.get("title"), page.get("html_url"),
+                utc_iso(page.get("updated_at")), content_text(page.get("body")))
+
+    @staticmethod
+    def _syllabus_doc(course_id: int, syllabus: Dict[str, Any]) -> Tuple:
+        url = f"{get_canvas_base_url()}/courses/{course_id}/assignments/syllabus"
+        return ("syllabus", "syllabus", "Syllabus", url, None, content_text(syllabus.get("syllabus_body")))
+
+    @staticmethod
+    def _announcement_doc(announcement: Dict[str, Any]) -> Tuple:
+        return ("announcement", str(announcement["id"]), announcement.get("title"), announcement.get("html_url"),
+                utc_iso(announcement.get("posted_at")), content_text(announcement.get("message")))
+
+    async def _doc_versions(self, identity: str, course_id: int, kind: str) -> Dict[str, Optional[str]]:
+        async with self.conn.execute(
+                "SELECT doc_id, updated_at FROM content_docs WHERE identity = ? AND course_id = ? AND kind = ?",
+                (identity, course_id, kind)) as cur:
+            return {doc_id: updated_at async for doc_id, updated_at in cur}
+
+    async def _put(self, identity: str, course_id: int, kind: str, doc_id: str, title: Optional[str],
+                   url: Optional[str], updated_at: Optional[str], text: str) -> bool:
+        """Index one document, replacing its passages only when its text changed."""
+        row_hash = _doc_hash(title, text)
+        async with self.conn.execute(
+                "SELECT row_hash FROM content_docs WHERE identity = ? AND course_id = ? AND kind = ? AND doc_id = ?",
+                (identity, course_id, kind, doc_id)) as cur:
+            existing = await cur.fetchone()
+        if existing and existing[0] == row_hash:
+            self._stats["docs_unchanged"] += 1
+            return False
+        chunks = chunk_text(text)
+        await self.conn.execute(
+            f"DELETE FROM {self.table} WHERE identity = ? AND course_id = ? AND kind = ? AND doc_id = ?",
+            (identity, course_id, kind, doc_id))
+        await self.conn.executemany(
+            f"INSERT INTO {self.table} (title, body, identity, course_id, kind, doc_id, url) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(title, chunk, identity, course_id, kind, doc_id, url) for chunk in chunks])
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO content_docs (identity, course_id, kind, doc_id, title, url, updated_at, chunks, "
+            "row_hash, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (identity, course_id, kind, doc_id, title, url, updated_at, len(chunks), row_hash, time.time()))
+        self._stats["docs_indexed"] += 1
+        self._stats["chunks_indexed"] += len(chunks)
+        return True
+
+    async def _drop_missing(self, identity: str, course_id: int, keep: Dict[str, Set[str]]) -> None:
+        """Delete documents of the crawled kinds that no longer exist in Canvas."""
+        for kind, doc_ids in keep.items():
+            gone = [doc_id for doc_id in await self._doc_versions(identity, course_id, kind) if doc_id not in doc_ids]
+            for doc_id in gone:
+                params = (identity, course_id, kind, doc_id)
+                await self.conn.execute(f"DELETE FROM {self.table} WHERE identity = ? AND course_id = ? "
+                                        "AND kind = ? AND doc_id = ?", params)
+                await self.conn.execute("DELETE FROM content_docs WHERE identity = ? AND course_id = ? "
+                                        "AND kind = ? AND doc_id = ?", params)
+            self._stats["docs_deleted"] += len(gone)
+
+    async def ingest(self, tool_name: str, arguments: Dict[str, Any], raw: Any, identity: str = None) -> None:
+        """Index page, syllabus and announcement results that passed through run_mcp_tool."""
+        if self.conn is None or tool_name not in CONTENT_TOOLS:
+            return
+        # SIS-style ids are skipped; the index keys courses by Canvas id
+        course_id = course_key(normalize_args(arguments).get("course_id"))
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw
+        except ValueError:
+            return
+        if course_id is None or not isinstance(data, (dict, list)):
+            return
+        if tool_name == "canvas_get_page" and isinstance(data, dict) and data.get("url"):
+            docs = [self._page_doc(data)]
+        elif tool_name == "canvas_get_syllabus" and isinstance(data, dict) and data.get("syllabus_body"):
+            docs = [self._syllabus_doc(course_id, data)]
+        elif tool_name == "canvas_list_announcements":
+            docs = [self._announcement_doc(a) for a in _records(data) or []]
+        else:
+            return
+        identity = identity or cache_identity()
+        async with self._write_lock:
+            for doc in docs:
+                await self._put(identity, course_id, *doc)
+            await self.conn.commit()
+        self._stats["ingested"] += 1
+
+    def note_write(self, tool_name: str, arguments: Dict[str, Any], identity: str = None) -> int:
+        """Mark the written course for a re-crawl when the write can change its content."""
+        if not tool_name.startswith(WRITE_PREFIXES):
+            return 0
+        targets = WRITE_INVALIDATES.get(tool_name)
+        if targets is not None and not targets & CONTENT_TOOLS:
+            return 0
+        identity = identity or cache_identity()
+        # A course id the index cannot key on marks all of the user's courses
+        course_id = course_key(normalize_args(arguments).get("course_id"))
+        stale = [key for key in self._crawled if key[0] == identity and (course_id is None or key[1] == course_id)]
+        for key in stale:
+            self._crawled[key] = min(self._crawled[key], time.time() - CONTENT_INDEX_TTL - 1)
+        self._stats["marked_stale"] += len(stale)
+        return len(stale)
+
+    # --- Search ---
+
+    async def search(self, course_id: int, query: str, limit: int = CONTENT_SEARCH_LIMIT,
+                     kinds: Sequence[str] = None) -> List[Dict[str, Any]]:
+        """Best-matching passages of a course for a free-text query, best first.
+
+        Returns:
+            Rows with kind, title, url, updated_at and snippet (matched terms
+            in **bold**), the best passage of each document only.
+        """
+        identity = cache_identity()
+        if not await self.ensure_indexed(course_id, identity):
+            return []
+        terms = query_terms(query)
+        if not terms:
+            return []
+        self._stats["searches"] += 1
+        search = self._search_fts if self.fts else self._search_like
+        # All terms first; any term when that finds nothing
+        rows = await search(identity, int(course_id), terms, limit * 4, kinds, match_all=True)
+        if not rows and len(terms) > 1:
+            rows = await search(identity, int(course_id), terms, limit * 4, kinds, match_all=False)
+        best = {}
+        for row in rows:
+            best.setdefault((row.pop("doc_id"), row["kind"]), row)
+        return list(best.values())[:limit]
+
+    def _kind_filter(self, kinds: Optional[Sequence[str]], params: List[Any]) -> str:
+        if not kinds:
+            return ""
+        params.extend(kinds)
+        return f" AND f.kind IN ({', '.join('?' * len(kinds))})"
+
+    async def _search_fts(self, identity: str, course_id: int, terms: List[str], limit: int,
+                          kinds: Optional[Sequence[str]], match_all: bool) -> List[Dict[str, Any]]:
+        match = (" AND " if match_all else " OR ").join(f'"{t}"' for t in terms)
+        params: List[Any] = [CONTENT_SNIPPET_TOKENS, match, identity, course_id]
+        sql = ("SELECT f.kind, f.doc_id, f.title, f.url, d.updated_at, "
+               "snippet(content_fts, 1, '**', '**', ' ... ', ?) AS snippet, bm25(content_fts, 5.0, 1.0) AS rank "
+               "FROM content_fts f LEFT JOIN content_docs d ON d.identity = f.identity AND d.course_id = f.course_id "
+               "AND d.kind = f.kind AND d.doc_id = f.doc_id "
+               "WHERE content_fts MATCH ? AND f.identity = ? AND f.course_id = ?")
+        sql += self._kind_filter(kinds, params)
+        async with self.conn.execute(sql + " ORDER BY rank LIMIT ?", (*params, limit)) as cur:
+            columns = [c[0] for c in cur.description]
+            return [dict(zip(columns, row)) async for row in cur]
+
+    async def _search_like(self, identity: str, course_id: int, terms: List[str], limit: int,
+                           kinds: Optional[Sequence[str]], match_all: bool) -> List[Dict[str, Any]]:
+        like = (" AND " if match_all else " OR ").join(["lower(f.title || ' ' || f.body) LIKE ?"] * len(terms))
+        params: List[Any] = [identity, course_id, *(f"%{t}%" for t in terms)]
+        sql = ("SELECT f.kind, f.doc_id, f.title, f.url, d.updated_at, f.body "
+               "FROM content_chunks f LEFT JOIN content_docs d ON d.identity = f.identity "
+               "AND d.course_id = f.course_id AND d.kind = f.kind AND d.doc_id = f.doc_id "
+               f"WHERE f.identity = ? AND f.course_id = ? AND ({like})")
+        sql += self._kind_filter(kinds, params)
+        async with self.conn.execute(sql, params) as cur:
+            columns = [c[0] for c in cur.description]
+            rows = [dict(zip(columns, row)) async for row in cur]
+        for row in rows:
+            body, title = row.pop("body").lower(), (row["title"] or "").lower()
+            row["rank"] = -sum(body.count(t) + 5 * title.count(t) for t in terms)
+            row["snippet"] = self._like_snippet(body, terms)
+        return sorted(rows, key=lambda r: r["rank"])[:limit]
+
+    @staticmethod
+    def _like_snippet(body: str, terms: List[str]) -> str:
+        hits = [body.find(t) for t in terms if t in body]
+        at = min(hits) if hits else 0
+        width = CONTENT_SNIPPET_TOKENS * 6
+        start = max(0, at - width // 3)
+        text = body[start:start + width]
+        for term in terms:
+            text = re.sub(rf"({re.escape(term)}\w*)", r"**\1**", text)
+        return ("... " if start else "") + text + (" ..." if start + width < len(body) else "")
+
+    def last_crawled(self, course_id: int, identity: str = None) -> Optional[float]:
+        crawled_at = self._crawled.get((identity or cache_identity(), int(course_id)))
+        return crawled_at or None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "open": self.conn is not None,
+            "backend": ("fts5" if self.fts else "like") if self.conn is not None else None,
+            "indexed_courses": len(self._crawled),
+            "crawling": len(self._inflight),
+            "path": self.path,
+        }
+
+
+# Global index used by search_course_content and the server lifespan
+content_index = ContentIndex()
@@ -3,39 +3,149 @@ Native OpenTelemetry setup for Keywords AI tracing.
 
 This module configures OpenTelemetry with OTLP export to Keywords AI dashboard.
 Provides robust async tracing for LangGraph multi-agent nodes.
+
+Two span processors are available (KEYWORDS_AI_SPAN_EXPORT):
+- "background" (default): BoundedSpanExportProcessor keeps ended spans in a
+  fixed-size ring buffer and a daemon thread exports them in gzip-compressed
+  batches, so neither span creation nor flushing blocks request handling
+- "manual": ManualSpanCollector buffers spans (bounded) until
+  ingest_trace_to_keywords() is called
+Per-span-name head sampling is configured with OTEL_SPAN_SAMPLE_RATES,
+e.g. "Supervisor=1,canvas_*=0.1,*=1".
 """
 
+import fnmatch
+import gzip
+import json
 import os
 import sys
+import threading
+import time
+from collections import deque
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from threading import Lock
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider, ReadableSpan
 from opentelemetry.sdk.trace.export import SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    Decision, Sampler, SamplingResult, TraceIdRatioBased, ALWAYS_ON
+)
 from opentelemetry.sdk.resources import Resource, SERVICE_NAME
 
+from src.agents.context import get_request_context
+
+
+KEYWORDS_AI_TRACES_ENDPOINT = os.getenv(
+    "KEYWORDS_AI_TRACES_ENDPOINT", "https://api.keywordsai.co/api/openai/v1/traces/ingest"
+)
+KEYWORDS_AI_SPAN_EXPORT = os.getenv("KEYWORDS_AI_SPAN_EXPORT", "background").lower()
+OTEL_SPAN_QUEUE_SIZE = int(os.getenv("OTEL_SPAN_QUEUE_SIZE", "2048"))
+OTEL_SPAN_BATCH_SIZE = int(os.getenv("OTEL_SPAN_BATCH_SIZE", "256"))
+OTEL_SPAN_EXPORT_INTERVAL = float(os.getenv("OTEL_SPAN_EXPORT_INTERVAL", "5"))
+OTEL_SPAN_EXPORT_TIMEOUT = float(os.getenv("OTEL_SPAN_EXPORT_TIMEOUT", "10"))
+OTEL_SPAN_COMPRESSION = os.getenv("OTEL_SPAN_COMPRESSION", "gzip").lower()
+OTEL_SPAN_SAMPLE_RATES = os.getenv("OTEL_SPAN_SAMPLE_RATES", "")
+
+
+def span_to_dict(span: ReadableSpan, thread_id: str = None) -> Dict[str, Any]:
+    """Convert a span to the Keywords AI ingestion format."""
+    # Each span becomes a dict with trace_unique_id, span_unique_id, span_name
+    span_dict = {
+        "trace_unique_id": format(span.context.trace_id, "032x"),
+        "span_unique_id": format(span.context.span_id, "016x"),
+        "span_name": span.name,
+        "start_time": span.start_time,
+        "end_time": span.end_time,
+    }
+
+    # Add attributes if present
+    if span.attributes:
+        span_dict.update({
+            f"attr_{k}": str(v)
+            for k, v in span.attributes.items()
+        })
+
+    # Add parent span ID if present
+    if span.parent:
+        span_dict["parent_span_id"] = format(span.parent.span_id, "016x")
+
+    # Add thread_id if provided (for grouping)
+    if thread_id:
+        span_dict["thread_id"] = thread_id
+
+    return span_dict
+
+
+def parse_sample_rates(spec: str) -> List[Tuple[str, float]]:
+    """Parse "name=rate,pattern*=rate" into (glob pattern, rate) pairs."""
+    rates = []
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        pattern, rate = item.rsplit("=", 1)
+        try:
+            rates.append((pattern.strip(), min(1.0, max(0.0, float(rate)))))
+        except ValueError:
+            print(f"[OTEL] Ignoring invalid sample rate '{item}'", file=sys.stderr)
+    return rates
+
+
+class SpanNameSampler(Sampler):
+    """Head sampler with a per-span-name rate (first matching glob wins).
+
+    Decisions are derived from the trace id, so all spans of one name in a
+    trace agree; names without a matching pattern are always sampled.
+    Children of a dropped span are dropped too, so no orphans are exported.
+    """
+
+    def __init__(self, rates: Sequence[Tuple[str, float]]):
+        self.rates = list(rates)
+        self._samplers = {rate: TraceIdRatioBased(rate) for _, rate in self.rates}
+        self.sampled_out = 0
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None,
+                      trace_state=None) -> SamplingResult:
+        parent = trace.get_current_span(parent_context).get_span_context()
+        if parent.is_valid and not parent.trace_flags.sampled:
+            return SamplingResult(Decision.DROP)
+        for pattern, rate in self.rates:
+            if fnmatch.fnmatchcase(name, pattern):
+                result = self._samplers[rate].should_sample(
+                    parent_context, trace_id, name, kind, attributes, links, trace_state
+                )
+                if result.decision == Decision.DROP:
+                    self.sampled_out += 1
+                return result
+        return ALWAYS_ON.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def get_description(self) -> str:
+        return f"SpanNameSampler({self.rates})"
+
 
 class ManualSpanCollector(SpanProcessor):
-    """Collects spans in memory for manual ingestion to Keywords AI."""
+    """Collects spans in memory (bounded) for manual ingestion to Keywords AI."""
 
-    def __init__(self):
-        self.spans: List[ReadableSpan] = []
+    def __init__(self, max_spans: int = OTEL_SPAN_QUEUE_SIZE):
+        self.spans: deque = deque(maxlen=max_spans)
         self.lock = Lock()
+        self.dropped = 0
 
     def on_start(self, span: ReadableSpan, parent_context=None) -> None:
         """Called when a span starts."""
         pass
 
     def on_end(self, span: ReadableSpan) -> None:
-        """Called when a span ends - collect it."""
+        """Called when a span ends - collect it (oldest is dropped when full)."""
         with self.lock:
+            if len(self.spans) == self.spans.maxlen:
+                self.dropped += 1
             self.spans.append(span)
 
     def get_and_clear_spans(self) -> List[ReadableSpan]:
         """Get all collected spans and clear the buffer."""
         with self.lock:
-            spans = self.spans.copy()
+            spans = list(self.spans)
             self.spans.clear()
             return spans
 
@@ -48,9 +158,150 @@ class ManualSpanCollector(SpanProcessor):
         return True
 
 
+class BoundedSpanExportProcessor(SpanProcessor):
+    """Ring-buffered span processor with a background export thread.
+
+    - on_end only appends to a fixed-size deque (oldest spans are dropped
+      and counted when the exporter falls behind)
+    - A daemon thread exports every `schedule_delay` seconds, or as soon as
+      `batch_size` spans are waiting, as gzip-compressed JSON batches
+    - force_flush() waits (bounded) until everything queued is exported
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        endpoint: str = KEYWORDS_AI_TRACES_ENDPOINT,
+        max_queue: int = OTEL_SPAN_QUEUE_SIZE,
+        batch_size: int = OTEL_SPAN_BATCH_SIZE,
+        schedule_delay: float = OTEL_SPAN_EXPORT_INTERVAL,
+        export_timeout: float = OTEL_SPAN_EXPORT_TIMEOUT,
+        compression: str = OTEL_SPAN_COMPRESSION
+    ):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.batch_size = max(1, batch_size)
+        self.schedule_delay = schedule_delay
+        self.export_timeout = export_timeout
+        self.compression = compression
+        self._queue: deque = deque(maxlen=max_queue)
+        self._condition = threading.Condition()
+        self._exporting = 0
+        self._stop = False
+        self._session = requests.Session()
+        self._stats = {
+            "received": 0,
+            "exported": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "bytes_raw": 0,
+            "bytes_sent": 0,
+            "last_export_ms": 0.0,
+            "total_export_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_start(self, span: ReadableSpan, parent_context=None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        # Capture the thread id now: on_end runs in the request's context
+        thread_id = get_request_context().get("thread_identifier")
+        with self._condition:
+            if self._stop:
+                return
+            self._stats["received"] += 1
+            if len(self._queue) == self._queue.maxlen:
+                self._stats["dropped"] += 1
+            self._queue.append((span, thread_id))
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stop and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.schedule_delay)
+                if self._stop and not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._exporting += 1
+            try:
+                if batch:
+                    self._export(batch)
+            finally:
+                with self._condition:
+                    self._exporting -= 1
+                    self._condition.notify_all()
+
+    def _export(self, batch: List[Tuple[ReadableSpan, Optional[str]]]) -> bool:
+        start = time.perf_counter()
+        body = json.dumps([span_to_dict(span, thread_id) for span, thread_id in batch], default=str).encode()
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        self._stats["bytes_raw"] += len(body)
+        if self.compression == "gzip":
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self._stats["bytes_sent"] += len(body)
+
+        ok = False
+        try:
+            response = self._session.post(self.endpoint, data=body, headers=headers, timeout=self.export_timeout)
+            ok = response.status_code == 200
+            if not ok:
+                print(f"[TRACE] Export failed: {response.status_code} - {response.text[:200]}", file=sys.stderr)
+        except Exception as e:
+            print(f"[TRACE] Export error: {e}", file=sys.stderr)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._condition:
+            self._stats["batches"] += 1
+            self._stats["exported" if ok else "failed"] += len(batch)
+            self._stats["last_export_ms"] = round(elapsed, 2)
+            self._stats["total_export_ms"] += elapsed
+        return ok
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Wake the exporter and wait until the queue is drained (or timeout)."""
+        deadline = time.monotonic() + timeout_millis / 1000.0
+        with self._condition:
+            while self._queue or self._exporting:
+                self._condition.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    return False
+                self._condition.wait(min(remaining, 0.05))
+        return True
+
+    def shutdown(self) -> None:
+        """Export what is left and stop the thread."""
+        self.force_flush(int(self.export_timeout * 1000))
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        self._thread.join(self.export_timeout)
+        self._session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._queue)
+        stats["total_export_ms"] = round(stats["total_export_ms"], 2)
+        return stats
+
+
 # Global span collector instance
 span_collector = ManualSpanCollector()
 
+# Background exporter, created by setup_otel() when KEYWORDS_AI_SPAN_EXPORT=background
+span_exporter: Optional[BoundedSpanExportProcessor] = None
+span_sampler: Optional[SpanNameSampler] = None
+
 
 def ingest_trace_to_keywords(api_key: str, thread_id: str = None) -> bool:
     """
@@ -63,46 +314,20 @@ def ingest_trace_to_keywords(api_key: str, thread_id: str = None) -> bool:
     Returns:
         bool: True if ingestion succeeded, False otherwise
     """
+    if span_exporter is not None:
+        # Spans are exported continuously; just push out whatever is queued
+        return span_exporter.force_flush()
+
     try:
         spans = span_collector.get_and_clear_spans()
         if not spans:
             print("[TRACE] No spans to ingest", file=sys.stderr)
             return True
 
-        # Convert spans to Keywords AI format
-        # Each span becomes a dict with trace_unique_id, span_unique_id, span_name
-        trace_data = []
-        for span in spans:
-            trace_id = format(span.context.trace_id, "032x")
-            span_id = format(span.context.span_id, "016x")
-
-            span_dict = {
-                "trace_unique_id": trace_id,
-                "span_unique_id": span_id,
-                "span_name": span.name,
-                "start_time": span.start_time,
-                "end_time": span.end_time,
-            }
-
-            # Add attributes if present
-            if span.attributes:
-                span_dict.update({
-                    f"attr_{k}": str(v)
-                    for k, v in span.attributes.items()
-                })
-
-            # Add parent span ID if present
-            if span.parent:
-                span_dict["parent_span_id"] = format(span.parent.span_id, "016x")
-
-            # Add thread_id if provided (for grouping)
-            if thread_id:
-                span_dict["thread_id"] = thread_id
-
-            trace_data.append(span_dict)
+        trace_data = [span_to_dict(span, thread_id) for span in spans]
 
         # Send to Keywords AI ingestion endpoint
-        endpoint = "https://api.keywordsai.co/api/openai/v1/traces/ingest"
+        endpoint = KEYWORDS_AI_TRACES_ENDPOINT
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -138,9 +363,11 @@ def setup_otel():
     This setup:
     1. Creates a TracerProvider with service identification
     2. Configures OTLP exporter to send traces to Keywords AI
-    3. Uses BatchSpanProcessor for efficient async trace export
-    4. Enables force_flush() for immediate export before FastAPI responses
+    3. Exports spans from a background thread (KEYWORDS_AI_SPAN_EXPORT=background)
+       or collects them for manual ingestion (KEYWORDS_AI_SPAN_EXPORT=manual)
+    4. Applies per-span-name head sampling from OTEL_SPAN_SAMPLE_RATES
     """
+    global span_exporter, span_sampler
 
     # Get configuration from environment
     service_name = os.getenv("OTEL_SERVICE_NAME", "canvas-lms-agent")
@@ -163,18 +390,27 @@ def setup_otel():
         "service.version": "1.0.0"
     })
 
-    # Create TracerProvider
-    provider = TracerProvider(resource=resource)
+    # Create TracerProvider (with per-span-name sampling if configured)
+    rates = parse_sample_rates(OTEL_SPAN_SAMPLE_RATES)
+    if rates:
+        span_sampler = SpanNameSampler(rates)
+        provider = TracerProvider(resource=resource, sampler=span_sampler)
+    else:
+        provider = TracerProvider(resource=resource)
 
-    # Add manual span collector for Keywords AI ingestion
-    # We collect spans in memory and send them manually after the request
-    provider.add_span_processor(span_collector)
+    if KEYWORDS_AI_SPAN_EXPORT == "background":
+        # Spans are queued in a ring buffer and exported by a daemon thread
+        span_exporter = BoundedSpanExportProcessor(api_key=api_key)
+        provider.add_span_processor(span_exporter)
+    else:
+        # We collect spans in memory and send them manually after the request
+        provider.add_span_processor(span_collector)
 
     # Set as global tracer provider
     trace.set_tracer_provider(provider)
 
     print(f"[OTEL] TracerProvider initialized for service: {service_name}")
-    print(f"[OTEL] Exporting traces to: https://api.keywordsai.co")
+    print(f"[OTEL] Exporting traces to: {KEYWORDS_AI_TRACES_ENDPOINT} ({KEYWORDS_AI_SPAN_EXPORT})")
 
     return provider
 
@@ -195,3 +431,14 @@ def get_tracer(name: str = "canvas-lms-agent"):
 def get_api_key():
     """Get the Keywords AI API key from environment."""
     return os.getenv("KEYWORDS_AI_API_KEY")
+
+
+def get_span_export_stats() -> Dict[str, Any]:
+    """Counters for exported, dropped and sampled-out spans."""
+    stats = span_exporter.stats() if span_exporter else {
+        "queued": len(span_collector.spans),
+        "dropped": span_collector.dropped
+    }
+    stats["mode"] = "background" if span_exporter else "manual"
+    stats["sampled_out"] = span_sampler.sampled_out if span_sampler else 0
+    return stats
@@ -1,6 +1,8 @@
 import os
 import sys
 import json
+import time
+import asyncio
 
 # Add the project root to the python path FIRST
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -39,15 +41,14 @@ except Exception as e:
 
 # Now import everything else
 
-from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import uvicorn
 import nest_asyncio
 from langchain_core.messages import AIMessage, ToolMessage, HumanMessage
-import httpx
 import secrets
 import urllib.parse
 from typing import Optional, Dict, Any, List
@@ -59,13 +60,44 @@ nest_asyncio.apply()
 
 # Import the Agent (AFTER OTel is fully initialized)
 try:
-    from src.agents.graph import app, set_request_context
+    from src.agents.graph import app, create_agent_app, set_request_context, reset_request_context
+    from src.agents.checkpointing import checkpointer_manager
+    from src.agents.checkpoint_maintenance import checkpoint_compactor, get_maintenance_stats
 except ImportError as e:
     print(f"Error importing app: {e}", file=sys.stderr)
     import traceback
     traceback.print_exc()
     app = None
+    create_agent_app = None
+    checkpointer_manager = None
+    checkpoint_compactor = None
+    get_maintenance_stats = None
     set_request_context = None
+    reset_request_context = None
+
+# Pooled MCP sessions (warm Canvas MCP servers shared by all tool calls)
+try:
+    from src.tools.mcp_pool import mcp_pool, MCP_POOL_ENABLED
+except ImportError as e:
+    print(f"Error importing MCP session pool: {e}", file=sys.stderr)
+    mcp_pool = None
+    MCP_POOL_ENABLED = False
+
+from src.tools.canvas_http import canvas_clients, iter_pages, CANVAS_PER_PAGE
+from src.api.fanout import fan_out
+from src.tools.tool_cache import tool_cache
+from src.tools.singleflight import tool_flights
+from src.agents.llm_registry import llm_registry, executor_registry, close_llm_clients, EXECUTOR_PREBUILD
+from src.agents.router import get_router_stats
+from src.agents.windowing import get_window_stats
+from src.token_counting import get_encoding
+from src.tools.projection import get_projection_stats
+from src.agents.tool_scheduler import get_tool_scheduler_stats
+from src.tools.course_index import course_index
+from src.memory.canvas_mirror import canvas_mirror
+from src.memory.content_index import content_index
+from src.agents.run_memo import start_run_memo, finish_run_memo, get_run_memo, get_run_memo_stats
+from src.keywordsai_utils import log_exporter
 
 # OAuth2 Configuration
 CANVAS_CLIENT_ID = os.getenv("CANVAS_CLIENT_ID")
@@ -75,6 +107,12 @@ CANVAS_API_TOKEN = os.getenv("CANVAS_API_TOKEN") # Direct API Token
 JWT_SECRET = os.getenv("JWT_SECRET", secrets.token_urlsafe(32))
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+# Per-section deadlines (seconds) for the /api/dashboard fan-out
+DASHBOARD_DEADLINES = {
+    "dashboard_cards": float(os.getenv("DASHBOARD_CARDS_DEADLINE", "5")),
+    "planner_items": float(os.getenv("DASHBOARD_PLANNER_DEADLINE", "5"))
+}
+
 # OAuth2 Session Storage (in production, use Redis or database)
 oauth_sessions: Dict[str, Dict[str, Any]] = {}
 
@@ -130,18 +168,130 @@ RECENT_RUNS = [
     }
 ]
 
+# Trace export runs off the request path: periodically, on shutdown, or
+# (opt-in per request) as a background task after the response is sent
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "10"))
+TRACE_EXPORT_METRICS = {
+    "flushes": 0,
+    "errors": 0,
+    "last_ms": 0.0,
+    "max_ms": 0.0,
+    "total_ms": 0.0,
+    "by_trigger": {}
+}
+
+
+def flush_telemetry(trigger: str = "periodic") -> None:
+    """Export pending traces and record how long it took (blocking; run in a thread)."""
+    if not telemetry or not hasattr(telemetry, "flush"):
+        return
+    start = time.perf_counter()
+    try:
+        telemetry.flush()
+    except Exception as e:
+        TRACE_EXPORT_METRICS["errors"] += 1
+        print(f"[TRACE] Telemetry flush failed ({trigger}): {e}", file=sys.stderr)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        TRACE_EXPORT_METRICS["flushes"] += 1
+        TRACE_EXPORT_METRICS["last_ms"] = round(elapsed, 2)
+        TRACE_EXPORT_METRICS["max_ms"] = round(max(TRACE_EXPORT_METRICS["max_ms"], elapsed), 2)
+        TRACE_EXPORT_METRICS["total_ms"] += elapsed
+        TRACE_EXPORT_METRICS["by_trigger"][trigger] = TRACE_EXPORT_METRICS["by_trigger"].get(trigger, 0) + 1
+
+
+async def _periodic_telemetry_flush():
+    """Flush traces every TELEMETRY_FLUSH_INTERVAL seconds in a worker thread."""
+    while True:
+        await asyncio.sleep(TELEMETRY_FLUSH_INTERVAL)
+        await asyncio.to_thread(flush_telemetry, "periodic")
+
+
+def trace_export_stats() -> Dict[str, Any]:
+    flushes = TRACE_EXPORT_METRICS["flushes"]
+    return {
+        **TRACE_EXPORT_METRICS,
+        "total_ms": round(TRACE_EXPORT_METRICS["total_ms"], 2),
+        "avg_ms": round(TRACE_EXPORT_METRICS["total_ms"] / flushes, 2) if flushes else 0,
+        "interval_seconds": TELEMETRY_FLUSH_INTERVAL,
+        "supported": bool(telemetry and hasattr(telemetry, "flush"))
+    }
+
+
 # Lifespan context manager for startup/shutdown events
 @asynccontextmanager
 async def lifespan(api: FastAPI):
+    global app
     # Startup
     print("[INFO] FastAPI application starting...", file=sys.stderr)
 
+    # Open the persistent checkpointer in this loop and recompile the graph on it
+    if app is not None and checkpointer_manager:
+        try:
+            app = create_agent_app(await checkpointer_manager.start())
+            # Retention/expiry job and the tool-result blob store
+            await checkpoint_compactor.start(checkpointer_manager)
+        except Exception as e:
+            print(f"[ERROR] Failed to open checkpointer: {e}", file=sys.stderr)
+
+    if mcp_pool and MCP_POOL_ENABLED:
+        try:
+            await mcp_pool.start()
+        except Exception as e:
+            print(f"[ERROR] Failed to start MCP session pool: {e}", file=sys.stderr)
+
+    # Load the tokenizer off the event loop (the first load may download its BPE file)
+    await asyncio.to_thread(get_encoding)
+
+    # Warm the shared Canvas HTTP client for the configured domain
+    canvas_clients.get(CANVAS_DOMAIN)
+
+    # Background exporter for Keywords AI logs (keeps logging off the request path)
+    log_exporter.start()
+
+    # Local Canvas mirror: keeps the data cross-course tools have synced fresh
+    await canvas_mirror.start()
+
+    # Course content search index: background crawler of pages, syllabi and announcements
+    await content_index.start()
+
+    # Compile Canvas_Executor graphs for the common tool subsets up front
+    if app is not None and EXECUTOR_PREBUILD:
+        try:
+            from src.agents.graph import prebuild_canvas_executors
+            built = await asyncio.to_thread(prebuild_canvas_executors)
+            print(f"[INFO] Prebuilt {built} Canvas_Executor graphs", file=sys.stderr)
+        except Exception as e:
+            print(f"[ERROR] Failed to prebuild executors: {e}", file=sys.stderr)
+
+    flush_task = None
+    if telemetry and TELEMETRY_FLUSH_INTERVAL > 0:
+        flush_task = asyncio.create_task(_periodic_telemetry_flush())
+
     yield
 
-    # Shutdown - flush any remaining traces
+    if flush_task:
+        flush_task.cancel()
+        await asyncio.gather(flush_task, return_exceptions=True)
+
+    # Stop mirror syncs and content crawls before the transports they use
+    await canvas_mirror.close()
+    await content_index.close()
+
+    # Shutdown - stop pooled MCP sessions
+    if mcp_pool:
+        await mcp_pool.close()
+    await tool_cache.close()
+    await canvas_clients.close()
+    await close_llm_clients()
+    await log_exporter.shutdown()
+    if checkpointer_manager:
+        await checkpoint_compactor.close()
+        await checkpointer_manager.close()
+
+    # Flush any remaining traces
     print("[INFO] Shutting down server, flushing traces...", file=sys.stderr)
-    if telemetry:
-        telemetry.flush()
+    await asyncio.to_thread(flush_telemetry, "shutdown")
     print("[INFO] Shutdown complete", file=sys.stderr)
 
 api = FastAPI(lifespan=lifespan)
@@ -165,6 +315,7 @@ class ChatRequest(BaseModel):
     thread_id: str = "demo-1"
     customer_id: Optional[str] = None  # For Keywords AI user tracking
     metadata: Optional[Dict[str, Any]] = None  # Custom metadata for Keywords AI
+    flush_traces: bool = False  # Export traces right after the response is sent
 
 
 class FeedbackRequest(BaseModel):
@@ -211,19 +362,18 @@ async def login(request: Request):
         print("[INFO] Using direct CANVAS_API_TOKEN for login", file=sys.stderr)
         try:
             # Verify the token works by fetching user profile
-            async with httpx.AsyncClient() as client:
-                user_response = await client.get(
-                    f"https://{CANVAS_DOMAIN}/api/v1/users/self/profile",
-                    headers={"Authorization": f"Bearer {CANVAS_API_TOKEN}"}
-                )
-                
-                if user_response.status_code == 200:
-                    user_data = user_response.json()
-                    # Create JWT with the direct token
-                    jwt_token = create_jwt_token(user_data["id"], CANVAS_DOMAIN, CANVAS_API_TOKEN)
-                    return RedirectResponse(url=f"{FRONTEND_URL}?token={jwt_token}")
-                else:
-                    print(f"[ERROR] Direct token validation failed: {user_response.status_code} - {user_response.text}", file=sys.stderr)
+            user_response = await canvas_clients.request(
+                CANVAS_DOMAIN, "GET", "/api/v1/users/self/profile", route="auth",
+                headers={"Authorization": f"Bearer {CANVAS_API_TOKEN}"}
+            )
+
+            if user_response.status_code == 200:
+                user_data = user_response.json()
+                # Create JWT with the direct token
+                jwt_token = create_jwt_token(user_data["id"], CANVAS_DOMAIN, CANVAS_API_TOKEN)
+                return RedirectResponse(url=f"{FRONTEND_URL}?token={jwt_token}")
+            else:
+                print(f"[ERROR] Direct token validation failed: {user_response.status_code} - {user_response.text}", file=sys.stderr)
         except Exception as e:
             print(f"[ERROR] Direct token login error: {e}", file=sys.stderr)
 
@@ -269,27 +419,26 @@ async def auth_callback(code: str, state: str):
             "code": code
         }
         
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                f"https://{CANVAS_DOMAIN}/login/oauth2/token",
-                data=token_data
-            )
-            
-            if token_response.status_code != 200:
-                print(f"[ERROR] Token exchange failed: {token_response.text}", file=sys.stderr)
-                raise HTTPException(status_code=400, detail="Failed to obtain access token")
-            
-            access_token = token_response.json().get("access_token")
-            
-            user_response = await client.get(
-                f"https://{CANVAS_DOMAIN}/api/v1/users/self/profile",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            
-            user_data = user_response.json()
-            jwt_token = create_jwt_token(user_data["id"], CANVAS_DOMAIN, access_token)
-            
-            return RedirectResponse(url=f"{FRONTEND_URL}?token={jwt_token}")
+        token_response = await canvas_clients.request(
+            CANVAS_DOMAIN, "POST", "/login/oauth2/token", route="auth",
+            data=token_data
+        )
+
+        if token_response.status_code != 200:
+            print(f"[ERROR] Token exchange failed: {token_response.text}", file=sys.stderr)
+            raise HTTPException(status_code=400, detail="Failed to obtain access token")
+
+        access_token = token_response.json().get("access_token")
+
+        user_response = await canvas_clients.request(
+            CANVAS_DOMAIN, "GET", "/api/v1/users/self/profile", route="auth",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+        user_data = user_response.json()
+        jwt_token = create_jwt_token(user_data["id"], CANVAS_DOMAIN, access_token)
+
+        return RedirectResponse(url=f"{FRONTEND_URL}?token={jwt_token}")
             
     except Exception as e:
         print(f"[ERROR] OAuth callback failed: {e}", file=sys.stderr)
@@ -318,20 +467,19 @@ async def get_user_profile(request: Request):
         canvas_domain = payload.get("canvas_domain")
         
         if canvas_token:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"https://{canvas_domain}/api/v1/users/self/profile",
-                    headers={"Authorization": f"Bearer {canvas_token}"}
-                )
-                
-                if response.status_code == 200:
-                    profile = response.json()
-                    # Add a title/role field if not present (Canvas doesn't always provide this in profile)
-                    profile["title"] = "Faculty" # Default for this agent context
-                    return profile
-                else:
-                    print(f"[ERROR] Canvas API Error: {response.text}", file=sys.stderr)
-                    raise HTTPException(status_code=response.status_code, detail="Failed to fetch user profile")
+            response = await canvas_clients.shared_get(
+                canvas_domain, "/api/v1/users/self/profile", route="profile",
+                headers={"Authorization": f"Bearer {canvas_token}"}
+            )
+
+            if response.status_code == 200:
+                profile = response.json()
+                # Add a title/role field if not present (Canvas doesn't always provide this in profile)
+                profile["title"] = "Faculty" # Default for this agent context
+                return profile
+            else:
+                print(f"[ERROR] Canvas API Error: {response.text}", file=sys.stderr)
+                raise HTTPException(status_code=response.status_code, detail="Failed to fetch user profile")
         
         # Fallback if no canvas token (shouldn't happen in this flow but good for safety)
         raise HTTPException(status_code=400, detail="No Canvas token found")
@@ -363,36 +511,53 @@ async def get_dashboard(request: Request):
         canvas_domain = payload.get("canvas_domain")
         
         if canvas_token:
-            async with httpx.AsyncClient() as client:
-                # Fetch Dashboard Cards
-                cards_response = await client.get(
-                    f"https://{canvas_domain}/api/v1/dashboard/dashboard_cards",
-                    headers={"Authorization": f"Bearer {canvas_token}"}
-                )
-                
-                # Fetch Planner Items (Todos)
-                # start_date = now, end_date = 2 weeks from now
-                start_date = datetime.utcnow().isoformat()
-                end_date = (datetime.utcnow() + timedelta(days=14)).isoformat()
-                
-                planner_response = await client.get(
-                    f"https://{canvas_domain}/api/v1/planner/items?start_date={start_date}&end_date={end_date}",
-                    headers={"Authorization": f"Bearer {canvas_token}"}
+            headers = {"Authorization": f"Bearer {canvas_token}"}
+
+            async def fetch_json(path: str, params: Dict[str, Any] = None):
+                response = await canvas_clients.shared_get(
+                    canvas_domain, path, route="dashboard", params=params, headers=headers
                 )
-                
-                dashboard_data = {
-                    "dashboard_cards": cards_response.json() if cards_response.status_code == 200 else [],
-                    "planner_items": planner_response.json() if planner_response.status_code == 200 else []
-                }
-                
-                return dashboard_data
-        
+                if response.status_code != 200:
+                    raise RuntimeError(f"Canvas returned HTTP {response.status_code}")
+                return response.json()
+
+            # Planner Items (Todos): start_date = now, end_date = 2 weeks from now.
+            # Truncated to the minute so concurrent identical requests coalesce.
+            now = datetime.utcnow().replace(second=0, microsecond=0)
+            start_date = now.isoformat()
+            end_date = (now + timedelta(days=14)).isoformat()
+
+            # Cards and planner items are independent: fetch them concurrently
+            outcome = await fan_out(
+                {
+                    "dashboard_cards": lambda: fetch_json("/api/v1/dashboard/dashboard_cards"),
+                    "planner_items": lambda: fetch_json(
+                        "/api/v1/planner/items", {"start_date": start_date, "end_date": end_date}
+                    )
+                },
+                deadlines=DASHBOARD_DEADLINES
+            )
+
+            dashboard_data = {
+                "dashboard_cards": outcome.results.get("dashboard_cards", []),
+                "planner_items": outcome.results.get("planner_items", []),
+                "partial": outcome.partial,
+                "missing_sections": sorted(outcome.missing)
+            }
+
+            return dashboard_data
+
         raise HTTPException(status_code=400, detail="No Canvas token found")
             
     except Exception as e:
         print(f"[ERROR] Failed to fetch dashboard data: {e}", file=sys.stderr)
         # Return empty structure instead of failing completely
-        return {"dashboard_cards": [], "planner_items": []}
+        return {
+            "dashboard_cards": [],
+            "planner_items": [],
+            "partial": True,
+            "missing_sections": ["dashboard_cards", "planner_items"]
+        }
 
 @api.get("/api/agent/status")
 async def get_agent_status():
@@ -416,6 +581,7 @@ async def get_agent_status():
             "status": canvas_status,
             "token_valid": True, # Simplified check
             "mcp_health": "healthy",
+            "mcp_pool": mcp_pool.stats() if mcp_pool else None,
             "available_tools": 15, # Hardcoded for now
             "last_successful_call": last_run
         },
@@ -423,6 +589,53 @@ async def get_agent_status():
         "recent_runs": RECENT_RUNS[:5]
     }
 
+@api.get("/api/metrics")
+async def get_metrics():
+    """Connection pool and upstream usage metrics for the API tier."""
+    return {
+        "http_pool": canvas_clients.stats(),
+        "mcp_pool": mcp_pool.stats() if mcp_pool else None,
+        "tool_cache": tool_cache.stats(),
+        "tool_coalescing": tool_flights.stats(),
+        "llm_clients": llm_registry.stats(),
+        "executors": executor_registry.stats(),
+        "keywordsai_logs": log_exporter.stats(),
+        "trace_export": trace_export_stats(),
+        "router": get_router_stats(),
+        "context_window": get_window_stats(),
+        "tool_projection": get_projection_stats(),
+        "tool_scheduling": get_tool_scheduler_stats(),
+        "run_memo": get_run_memo_stats(),
+        "course_index": course_index.stats(),
+        "canvas_mirror": canvas_mirror.stats(),
+        "content_index": content_index.stats(),
+        "checkpointer": checkpointer_manager.stats() if checkpointer_manager else None,
+        "checkpoint_maintenance": get_maintenance_stats() if get_maintenance_stats else None
+    }
+
+async def _stream_courses(canvas_domain: str, first_response, headers: Dict[str, str]):
+    """Stream {"courses": [...]} page by page instead of building it in memory.
+
+    If a later page fails the array is closed early and flagged as truncated,
+    since the 200 status has already been sent.
+    """
+    count = 0
+    yield '{"courses": ['
+    try:
+        async for page in iter_pages(canvas_domain, first_response, route="courses", headers=headers):
+            if not page:
+                continue
+            chunk = ",".join(json.dumps(course, default=str) for course in page)
+            yield ("," if count else "") + chunk
+            count += len(page)
+        yield ']}'
+    except Exception as e:
+        print(f"[ERROR] Course pagination failed after {count} courses: {e}", file=sys.stderr)
+        yield '], "truncated": true}'
+        return
+    print(f"[DEBUG] Successfully streamed {count} courses from Canvas API", file=sys.stderr)
+
+
 @api.get("/api/courses")
 async def get_courses(request: Request):
     """Get user's Canvas courses"""
@@ -451,34 +664,37 @@ async def get_courses(request: Request):
         print(f"[DEBUG] Using Canvas Token: {canvas_token[:10]}... on domain: {canvas_domain}", file=sys.stderr)
         
         if canvas_token:
-            async with httpx.AsyncClient() as client:
-                # Try fetching courses with pagination handling (basic)
-                # Including 'teacher', 'student', 'ta' enrollments to be safe
-                url = f"https://{canvas_domain}/api/v1/courses?enrollment_state=active&include[]=total_students&include[]=term"
-                print(f"[DEBUG] Requesting Canvas API: {url}", file=sys.stderr)
-                
-                response = await client.get(
-                    url,
-                    headers={"Authorization": f"Bearer {canvas_token}"}
+            # Fetch the first page; its Link header tells us how many pages follow.
+            # Including 'teacher', 'student', 'ta' enrollments to be safe
+            headers = {"Authorization": f"Bearer {canvas_token}"}
+            params = {
+                "enrollment_state": "active",
+                "include[]": ["total_students", "term"],
+                "per_page": CANVAS_PER_PAGE
+            }
+            print(f"[DEBUG] Requesting Canvas API: {canvas_domain}/api/v1/courses", file=sys.stderr)
+
+            response = await canvas_clients.shared_get(
+                canvas_domain, "/api/v1/courses", route="courses",
+                params=params, headers=headers
+            )
+
+            print(f"[DEBUG] Canvas API Response Status: {response.status_code}", file=sys.stderr)
+
+            if response.status_code == 200:
+                # Remaining pages are fetched concurrently and streamed as they arrive
+                return StreamingResponse(
+                    _stream_courses(canvas_domain, response, headers),
+                    media_type="application/json"
                 )
-                
-                print(f"[DEBUG] Canvas API Response Status: {response.status_code}", file=sys.stderr)
-                
-                if response.status_code == 200:
-                    courses = response.json()
-                    print(f"[DEBUG] Successfully fetched {len(courses)} courses from Canvas API", file=sys.stderr)
-                    # Log first course to debug structure
-                    if len(courses) > 0:
-                        print(f"[DEBUG] First course sample: {json.dumps(courses[0], default=str)}", file=sys.stderr)
-                    return {"courses": courses}
-                else:
-                    print(f"[ERROR] Canvas API Error: {response.text}", file=sys.stderr)
-                    # Don't fail immediately, try the tool fallback
-        
+            else:
+                print(f"[ERROR] Canvas API Error: {response.text}", file=sys.stderr)
+                # Don't fail immediately, try the tool fallback
+
         # Fallback to agent tool (uses env var token)
         print("[INFO] Fallback to agent tool for fetching courses", file=sys.stderr)
-        from src.agents.tools import get_canvas_courses
-        courses_result = await get_canvas_courses()
+        from src.agents.tools import run_mcp_tool
+        courses_result = await run_mcp_tool("canvas_list_courses", {"include_ended": False}, project=False)
         
         try:
             courses_data = json.loads(courses_result)
@@ -493,23 +709,86 @@ async def get_courses(request: Request):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="Failed to fetch courses")
 
+def _is_routing_message(content: str) -> bool:
+    """True for supervisor routing signals like {"next": "FINISH"} (optionally fenced)."""
+    try:
+        # cleanup markdown code blocks first
+        content_to_check = content.strip()
+        if "```json" in content_to_check:
+            content_to_check = content_to_check.split("```json")[1].split("```")[0].strip()
+        elif "```" in content_to_check:
+            content_to_check = content_to_check.split("```")[1].strip()
+
+        parsed = json.loads(content_to_check)
+        # If it parses as JSON with 'next' key, it's a routing signal
+        return isinstance(parsed, dict) and "next" in parsed
+    except (json.JSONDecodeError, ValueError):
+        # Not JSON, this is a real response
+        return False
+
+
+def _final_message_content(messages: List[Any]) -> str:
+    """Last meaningful AIMessage of the current turn, skipping supervisor routing JSON."""
+    # Iterate backwards through messages to find first meaningful AIMessage
+    for msg in reversed(messages or []):
+        # The thread history accumulates; stop at the user's message for this turn
+        if isinstance(msg, HumanMessage):
+            break
+        # Check if it's an AIMessage with non-empty content
+        if isinstance(msg, AIMessage) and msg.content and not _is_routing_message(msg.content):
+            return msg.content
+
+    # If no meaningful message found, return default
+    return "Process completed."
+
+
+def _record_agent_run(message: str, duration: float, status: str = "success") -> None:
+    """Update AGENT_METRICS and RECENT_RUNS for a finished chat (call inside the run's memo scope)."""
+    memo = get_run_memo()
+    AGENT_METRICS["conversations_today"] += 1
+    AGENT_METRICS["agent_runs_today"] += 1
+    AGENT_METRICS["total_response_time"] += duration
+    AGENT_METRICS["avg_response_time"] = round(AGENT_METRICS["total_response_time"] / AGENT_METRICS["agent_runs_today"], 2)
+
+    # Record run
+    RECENT_RUNS.insert(0, {
+        "id": secrets.token_hex(4),
+        "intent": message[:50] + "..." if len(message) > 50 else message,
+        "tools": ["supervisor"], # Simplified
+        "duration": f"{duration:.2f}s",
+        "status": status,
+        "tool_calls": memo.report() if memo else None,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+    if len(RECENT_RUNS) > 20:
+        RECENT_RUNS.pop()
+
+
 @api.post("/chat")
 @workflow(name="Clai_Workflow")
-async def chat(request: ChatRequest):
-    """Process chat request with Keywords AI tracing."""
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
+    """Process chat request with Keywords AI tracing.
+
+    Traces are exported by the periodic flush task; with `flush_traces`
+    set they are also flushed right after this response is sent.
+    """
     if app is None:
         return {"error": "Agent app not initialized"}
 
     config = {"configurable": {"thread_id": request.thread_id}}
     start_time = datetime.utcnow()
 
-    # Set Keywords AI request context for metadata tracking
+    # Set Keywords AI request context for metadata tracking. It is a context
+    # variable, so concurrent requests each see their own identifiers.
+    context_token = None
     if set_request_context:
-        set_request_context(
+        context_token = set_request_context(
             customer_identifier=request.customer_id,
             thread_identifier=request.thread_id,
             metadata=request.metadata or {"source": "canvas-lms-agent"}
         )
+    # Repeated reads within this run (e.g. course lookups) are answered once
+    memo_token = start_run_memo()
 
     try:
         # Invoke the multi-agent graph
@@ -526,57 +805,13 @@ async def chat(request: ChatRequest):
 
         # Calculate duration and update metrics
         duration = (datetime.utcnow() - start_time).total_seconds()
-        AGENT_METRICS["conversations_today"] += 1
-        AGENT_METRICS["agent_runs_today"] += 1
-        AGENT_METRICS["total_response_time"] += duration
-        AGENT_METRICS["avg_response_time"] = round(AGENT_METRICS["total_response_time"] / AGENT_METRICS["agent_runs_today"], 2)
-
-        # Record run
-        RECENT_RUNS.insert(0, {
-            "id": secrets.token_hex(4),
-            "intent": request.message[:50] + "..." if len(request.message) > 50 else request.message,
-            "tools": ["supervisor"], # Simplified
-            "duration": f"{duration:.2f}s",
-            "status": "success",
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        if len(RECENT_RUNS) > 20:
-            RECENT_RUNS.pop()
+        _record_agent_run(request.message, duration)
 
-        # Flush traces to Keywords AI
-        if telemetry:
-            telemetry.flush()
+        # Optionally flush traces to Keywords AI once the response is sent
+        if request.flush_traces:
+            background_tasks.add_task(flush_telemetry, "request")
 
-    # Iterate backwards through messages to find first meaningful AIMessage
-    final_message_content = None
-    if result.get("messages"):
-        for msg in reversed(result["messages"]):
-            # Check if it's an AIMessage with non-empty content
-            if isinstance(msg, AIMessage) and msg.content:
-                # Skip supervisor routing JSON messages
-                try:
-                    # cleanup markdown code blocks first
-                    content_to_check = msg.content.strip()
-                    if "```json" in content_to_check:
-                        content_to_check = content_to_check.split("```json")[1].split("```")[0].strip()
-                    elif "```" in content_to_check:
-                        content_to_check = content_to_check.split("```")[1].strip()
-
-                    parsed = json.loads(content_to_check)
-                    # If it parses as JSON with 'next' key, it's a routing signal
-                    if isinstance(parsed, dict) and "next" in parsed:
-                        continue
-                except (json.JSONDecodeError, ValueError):
-                    # Not JSON, this is a real response
-                    pass
-
-                # Found a meaningful message
-                final_message_content = msg.content
-                break
-
-        # If no meaningful message found, return default
-        if final_message_content is None:
-            final_message_content = "Process completed."
+        final_message_content = _final_message_content(result.get("messages", []))
 
         print(f"[INFO] Chat completed successfully, thread_id={request.thread_id}", file=sys.stderr)
         return {"response": final_message_content, "content": final_message_content, "status": "success"}
@@ -586,6 +821,158 @@ async def chat(request: ChatRequest):
         import traceback
         traceback.print_exc()
         return {"error": str(e)}
+    finally:
+        finish_run_memo(memo_token, f"thread_id={request.thread_id}")
+        if context_token is not None:
+            reset_request_context(context_token)
+
+
+# Graph nodes reported as transitions by /chat/stream
+AGENT_NODES = ("supervisor", "Canvas_Executor", "Content_Specialist")
+# Nodes whose LLM tokens are streamed to the client as they are generated
+TOKEN_STREAM_NODES = ("Content_Specialist",)
+CHAT_STREAM_HEARTBEAT = float(os.getenv("CHAT_STREAM_HEARTBEAT", "15"))
+CHAT_STREAM_TOOL_OUTPUT_CHARS = int(os.getenv("CHAT_STREAM_TOOL_OUTPUT_CHARS", "500"))
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _stream_event_to_sse(event: Dict[str, Any]) -> Optional[str]:
+    """Map a LangGraph astream_events (v2) event to an SSE frame, or None to skip it."""
+    kind, name = event["event"], event.get("name")
+    node = event.get("metadata", {}).get("langgraph_node")
+
+    if kind in ("on_chain_start", "on_chain_end") and name in AGENT_NODES and node == name:
+        data = {"node": name, "status": "start" if kind == "on_chain_start" else "end"}
+        output = event.get("data", {}).get("output")
+        if kind == "on_chain_end" and name == "supervisor" and isinstance(output, dict):
+            data["next"] = output.get("next")
+        return _sse("node", data)
+
+    if kind == "on_tool_start":
+        return _sse("tool_start", {"tool": name, "node": node, "input": event.get("data", {}).get("input")})
+
+    if kind == "on_tool_end":
+        output = event.get("data", {}).get("output")
+        output = getattr(output, "content", output)
+        return _sse("tool_end", {"tool": name, "node": node, "output": str(output)[:CHAT_STREAM_TOOL_OUTPUT_CHARS]})
+
+    if kind == "on_chat_model_stream" and node in TOKEN_STREAM_NODES:
+        chunk = event.get("data", {}).get("chunk")
+        delta = getattr(chunk, "content", None)
+        if delta:
+            return _sse("token", {"node": node, "delta": delta})
+
+    return None
+
+
+async def _chat_event_stream(request: ChatRequest, http_request: Request):
+    """Run the graph with astream_events and yield SSE frames.
+
+    The graph runs in a producer task feeding a queue, so heartbeats can be
+    sent while a node is busy. If the client disconnects (or the response is
+    cancelled) the producer is cancelled, which stops the in-flight run.
+    """
+    config = {"configurable": {"thread_id": request.thread_id}}
+    start_time = datetime.utcnow()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    # The producer task inherits this context (per-request identifiers)
+    context_token = None
+    if set_request_context:
+        context_token = set_request_context(
+            customer_identifier=request.customer_id,
+            thread_identifier=request.thread_id,
+            metadata=request.metadata or {"source": "canvas-lms-agent"}
+        )
+    memo_token = start_run_memo()
+
+    async def produce():
+        try:
+            async for event in app.astream_events(
+                {"messages": [HumanMessage(content=request.message)]},
+                config=config,
+                version="v2"
+            ):
+                await queue.put(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(done)
+
+    producer = asyncio.create_task(produce())
+    final_state = None
+    status = "success"
+    try:
+        yield _sse("start", {"thread_id": request.thread_id})
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=CHAT_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if await http_request.is_disconnected():
+                    status = "cancelled"
+                    break
+                yield ": heartbeat\n\n"
+                continue
+
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                status = "error"
+                print(f"[ERROR] Chat stream failed: {item}", file=sys.stderr)
+                yield _sse("error", {"error": str(item)})
+                break
+
+            # The root graph's end event carries the final state
+            if item["event"] == "on_chain_end" and not item.get("parent_ids"):
+                final_state = item.get("data", {}).get("output")
+            frame = _stream_event_to_sse(item)
+            if frame:
+                yield frame
+
+        if status == "success":
+            messages = final_state.get("messages", []) if isinstance(final_state, dict) else []
+            final_message_content = _final_message_content(messages)
+            duration = (datetime.utcnow() - start_time).total_seconds()
+            _record_agent_run(request.message, duration)
+            yield _sse("done", {"response": final_message_content, "duration": round(duration, 3)})
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    finally:
+        if not producer.done():
+            producer.cancel()
+            print(f"[INFO] Chat stream {status}, cancelled graph run for thread_id={request.thread_id}",
+                  file=sys.stderr)
+        await asyncio.gather(producer, return_exceptions=True)
+        finish_run_memo(memo_token, f"thread_id={request.thread_id}")
+        if context_token is not None:
+            reset_request_context(context_token)
+
+
+@api.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Stream a chat run as Server-Sent Events.
+
+    Events: `start`, `node` (agent transitions, with the supervisor's
+    routing decision), `tool_start` / `tool_end`, `token` (Content_Specialist
+    deltas), `done` (final response) or `error`. Comment heartbeats are sent
+    every CHAT_STREAM_HEARTBEAT seconds while the graph is busy.
+    """
+    if app is None:
+        return JSONResponse({"error": "Agent app not initialized"}, status_code=503)
+
+    return StreamingResponse(
+        _chat_event_stream(request, http_request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ========== KEYWORDS AI FEATURE ENDPOINTS ==========
@@ -0,0 +1,41 @@
+"""
+LLM token counting shared by the agent windows and the tool projections.
+
+Tokens are counted with tiktoken's o200k_base encoding (the gpt-4o family)
+when it loads, otherwise estimated at about 4 characters per token.
+
+tiktoken reads the encoding's BPE file from TIKTOKEN_CACHE_DIR and downloads
+it there when it is missing. The server lifespan loads it in a worker thread
+at startup so that download never blocks the event loop; point
+TIKTOKEN_CACHE_DIR at a directory that ships with the deployment (or a
+persistent volume) on hosts without network access.
+"""
+
+import sys
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    """tiktoken's o200k_base encoding, or None (loaded once; never retried)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"[TOKENS] tiktoken unavailable ({type(e).__name__}), estimating tokens", file=sys.stderr)
+    return _encoding
+
+
+def count_text_tokens(text: str) -> int:
+    """Tokens in a string (tiktoken when available, else ~4 chars per token)."""
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
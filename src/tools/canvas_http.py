@@ -0,0 +1,292 @@
+"""
+Shared async HTTP clients for talking to the Canvas REST API directly.
+
+One httpx.AsyncClient is kept per Canvas domain so connections (and TLS
+sessions) stay warm across requests. Clients are created in the FastAPI
+lifespan (or lazily on first use of a new domain) and closed on shutdown.
+HTTP/2 is enabled when the optional `h2` package is installed
+(`pip install httpx[http2]`).
+"""
+
+import asyncio
+import os
+import sys
+import time
+import urllib.parse
+from collections import deque
+from typing import Dict, Any, Optional, AsyncIterator, List
+
+import httpx
+
+from src.tools.singleflight import http_flights, request_key, token_fingerprint
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+CANVAS_HTTP_TIMEOUT = float(os.getenv("CANVAS_HTTP_TIMEOUT", "30"))
+CANVAS_HTTP_CONNECT_TIMEOUT = float(os.getenv("CANVAS_HTTP_CONNECT_TIMEOUT", "5"))
+CANVAS_HTTP_MAX_CONNECTIONS = int(os.getenv("CANVAS_HTTP_MAX_CONNECTIONS", "100"))
+CANVAS_HTTP_MAX_KEEPALIVE = int(os.getenv("CANVAS_HTTP_MAX_KEEPALIVE", "20"))
+CANVAS_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CANVAS_HTTP_KEEPALIVE_EXPIRY", "60"))
+CANVAS_VERIFY_SSL = os.getenv("CANVAS_VERIFY_SSL", "true").lower() == "true"
+CANVAS_PER_PAGE = int(os.getenv("CANVAS_PER_PAGE", "100"))
+CANVAS_PAGE_CONCURRENCY = int(os.getenv("CANVAS_PAGE_CONCURRENCY", "8"))
+
+# Per-route read timeouts (seconds) for the API tier
+ROUTE_TIMEOUTS = {
+    "auth": float(os.getenv("CANVAS_TIMEOUT_AUTH", "10")),
+    "profile": float(os.getenv("CANVAS_TIMEOUT_PROFILE", "10")),
+    "dashboard": float(os.getenv("CANVAS_TIMEOUT_DASHBOARD", "15")),
+    "courses": float(os.getenv("CANVAS_TIMEOUT_COURSES", "30")),
+    "default": CANVAS_HTTP_TIMEOUT,
+}
+
+
+def get_canvas_base_url() -> str:
+    """Base URL of the Canvas instance used by the agent tools (without /api/v1)."""
+    api_url = os.getenv("CANVAS_API_URL")
+    if api_url:
+        api_url = api_url.rstrip("/")
+        if api_url.endswith("/api/v1"):
+            api_url = api_url[:-len("/api/v1")]
+        return api_url
+    return canvas_base_url(os.getenv("CANVAS_DOMAIN", "canvas.instructure.com"))
+
+
+def canvas_base_url(domain: str) -> str:
+    """Normalize a Canvas domain (with or without scheme) to a base URL."""
+    domain = domain.rstrip("/")
+    if domain.startswith("http://") or domain.startswith("https://"):
+        return domain
+    return f"https://{domain}"
+
+
+def route_timeout(route: str) -> httpx.Timeout:
+    """Timeout for a named API route, falling back to the default."""
+    read = ROUTE_TIMEOUTS.get(route, ROUTE_TIMEOUTS["default"])
+    return httpx.Timeout(read, connect=CANVAS_HTTP_CONNECT_TIMEOUT)
+
+
+def create_canvas_client(base_url: str = None, timeout: float = CANVAS_HTTP_TIMEOUT) -> httpx.AsyncClient:
+    """Create a keep-alive AsyncClient for a Canvas instance."""
+    return httpx.AsyncClient(
+        base_url=base_url or "",
+        http2=HTTP2_AVAILABLE,
+        verify=CANVAS_VERIFY_SSL,
+        timeout=httpx.Timeout(timeout, connect=CANVAS_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=CANVAS_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=CANVAS_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=CANVAS_HTTP_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+class CanvasClientPool:
+    """One app-scoped AsyncClient per Canvas domain, with usage metrics."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, domain: str) -> httpx.AsyncClient:
+        """Return the client for a domain, creating it on first use."""
+        base_url = canvas_base_url(domain)
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = create_canvas_client(base_url)
+            self._clients[base_url] = client
+            self._stats.setdefault(base_url, {
+                "requests": 0,
+                "errors": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0,
+                "total_time": 0.0,
+                "routes": {}
+            })
+            print(f"[HTTP] Created Canvas client for {base_url} (http2={HTTP2_AVAILABLE})", file=sys.stderr)
+        return client
+
+    async def request(self, domain: str, method: str, url: str, route: str = "default", **kwargs) -> httpx.Response:
+        """Send a request through the domain's shared client and record metrics.
+
+        `url` may be a path (relative to the domain) or an absolute URL,
+        e.g. a pagination link returned by Canvas.
+        """
+        client = self.get(domain)
+        stats = self._stats[canvas_base_url(domain)]
+        route_stats = stats["routes"].setdefault(route, {"requests": 0, "errors": 0, "total_time": 0.0})
+        kwargs.setdefault("timeout", route_timeout(route))
+
+        stats["requests"] += 1
+        route_stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        start = time.perf_counter()
+        try:
+            return await client.request(method, url, **kwargs)
+        except Exception:
+            stats["errors"] += 1
+            route_stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats["in_flight"] -= 1
+            stats["total_time"] += elapsed
+            route_stats["total_time"] += elapsed
+
+    async def shared_get(self, domain: str, url: str, route: str = "default", **kwargs) -> httpx.Response:
+        """GET through the shared client, coalescing identical concurrent requests.
+
+        Requests with the same domain, URL, params and Authorization header
+        that overlap in time share one upstream response (see singleflight).
+        """
+        headers = kwargs.get("headers") or {}
+        key = request_key(
+            canvas_base_url(domain), url, kwargs.get("params"),
+            token_fingerprint(headers.get("Authorization", ""))
+        )
+        return await http_flights.do(key, lambda: self.request(domain, "GET", url, route=route, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage per domain: request counters plus live connection counts."""
+        report = {}
+        for base_url, stats in self._stats.items():
+            client = self._clients.get(base_url)
+            connections, idle = _connection_counts(client)
+            report[base_url] = {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "in_flight": stats["in_flight"],
+                "peak_in_flight": stats["peak_in_flight"],
+                "avg_latency_ms": round(stats["total_time"] / stats["requests"] * 1000, 2) if stats["requests"] else 0,
+                "connections": connections,
+                "idle_connections": idle,
+                "routes": {
+                    route: {
+                        "requests": r["requests"],
+                        "errors": r["errors"],
+                        "avg_latency_ms": round(r["total_time"] / r["requests"] * 1000, 2) if r["requests"] else 0
+                    }
+                    for route, r in stats["routes"].items()
+                }
+            }
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "limits": {
+                "max_connections": CANVAS_HTTP_MAX_CONNECTIONS,
+                "max_keepalive_connections": CANVAS_HTTP_MAX_KEEPALIVE,
+                "keepalive_expiry": CANVAS_HTTP_KEEPALIVE_EXPIRY
+            },
+            "domains": report,
+            "coalescing": http_flights.stats()
+        }
+
+    async def close(self) -> None:
+        """Close every client (called from the FastAPI lifespan)."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+def _connection_counts(client: Optional[httpx.AsyncClient]):
+    """Best-effort (total, idle) connection counts from the underlying httpcore pool."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None, None
+    return len(connections), sum(1 for c in connections if c.is_idle())
+
+
+class CanvasHTTPError(Exception):
+    """Raised when Canvas answers a page request with an error status."""
+
+    def __init__(self, response: httpx.Response):
+        self.status_code = response.status_code
+        super().__init__(f"Canvas API error {response.status_code}: {response.text[:500]}")
+
+
+def _page_url(link_url: str, page: int) -> str:
+    """Rewrite the `page` query parameter of a Canvas pagination link."""
+    parts = urllib.parse.urlsplit(link_url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    query = [(k, v) for k, v in query if k != "page"] + [("page", str(page))]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def last_page_number(response: httpx.Response) -> Optional[int]:
+    """Page number from the Link header's rel="last" URL.
+
+    Returns None when Canvas does not send a last link or uses opaque
+    bookmark pagination, in which case pages must be followed via rel="next".
+    """
+    last_url = response.links.get("last", {}).get("url")
+    if not last_url:
+        return None
+    page = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(last_url).query)).get("page")
+    return int(page) if page and page.isdigit() else None
+
+
+async def iter_pages(
+    domain: str,
+    first_response: httpx.Response,
+    route: str = "default",
+    concurrency: int = CANVAS_PAGE_CONCURRENCY,
+    **kwargs
+) -> AsyncIterator[List[Any]]:
+    """Yield every page of a paginated Canvas list, in order.
+
+    The first page is the already-fetched `first_response`. When the Link
+    header names a numeric last page, the remaining pages are fetched
+    concurrently with at most `concurrency` requests in flight (and at most
+    that many pages buffered); otherwise rel="next" links are followed.
+    `kwargs` (e.g. headers) are passed to every page request.
+    """
+    yield first_response.json()
+
+    async def fetch(url: str) -> httpx.Response:
+        response = await canvas_clients.shared_get(domain, url, route=route, **kwargs)
+        if response.status_code != 200:
+            raise CanvasHTTPError(response)
+        return response
+
+    last_page = last_page_number(first_response)
+    if last_page is None:
+        next_url = first_response.links.get("next", {}).get("url")
+        while next_url:
+            response = await fetch(next_url)
+            yield response.json()
+            next_url = response.links.get("next", {}).get("url")
+        return
+
+    last_url = first_response.links["last"]["url"]
+    pending = deque(range(2, last_page + 1))
+    window: deque = deque()
+    try:
+        while pending or window:
+            # Keep up to `concurrency` page requests in flight, yielded in page order
+            while pending and len(window) < max(1, concurrency):
+                window.append(asyncio.create_task(fetch(_page_url(last_url, pending.popleft()))))
+            response = await window.popleft()
+            yield response.json()
+    finally:
+        for task in window:
+            task.cancel()
+
+
+# Global pool shared by the API routes and the REST transport
+canvas_clients = CanvasClientPool()
+
+
+def get_canvas_client() -> httpx.AsyncClient:
+    """Return the shared client for the agent's configured Canvas instance."""
+    return canvas_clients.get(get_canvas_base_url())
+
+
+async def close_canvas_client() -> None:
+    """Close all shared Canvas clients."""
+    await canvas_clients.close()
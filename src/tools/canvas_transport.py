@@ -0,0 +1,361 @@
+"""
+Pluggable transports behind run_mcp_tool.
+
+Every agent tool calls a `canvas_*` tool name with a dict of arguments and
+gets back the text the MCP server would return (pretty-printed JSON).
+Two backends implement that contract:
+- "mcp":  the TypeScript MCP server over stdio (pooled sessions when the
+          server lifespan has started the pool)
+- "rest": a native Python mapping of the same tool names onto the Canvas
+          REST API through a shared keep-alive httpx.AsyncClient
+
+The backend is chosen with the CANVAS_TRANSPORT environment variable.
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client
+
+from src.tools.canvas_http import (
+    canvas_clients, get_canvas_base_url, iter_pages, CanvasHTTPError, CANVAS_PER_PAGE
+)
+from src.tools.mcp_pool import MCPSessionPool, mcp_pool
+
+
+CANVAS_TRANSPORT = os.getenv("CANVAS_TRANSPORT", "mcp").lower()
+
+
+class CanvasToolError(Exception):
+    """Raised when a Canvas tool call fails in a transport."""
+
+
+def _extract_text(result) -> str:
+    """Extract text content from an MCP tool result."""
+    text_content = ""
+    if hasattr(result, 'content') and isinstance(result.content, list):
+        for item in result.content:
+            if hasattr(item, 'text'):
+                text_content += item.text
+    else:
+        text_content = str(result)
+    return text_content
+
+
+class CanvasTransport(ABC):
+    """Base class: execute a canvas_* tool and return its text result."""
+
+    name = "base"
+
+    @abstractmethod
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Run one canvas_* tool and return its text result."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MCPTransport(CanvasTransport):
+    """Calls the TypeScript MCP server over stdio."""
+
+    name = "mcp"
+
+    def __init__(self, pool: MCPSessionPool = None):
+        self.pool = pool or mcp_pool
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        if self.pool.started:
+            async with self.pool.lease() as session:
+                result = await session.call_tool(tool_name, arguments=arguments)
+        else:
+            # No pool running (CLI usage): spawn a one-off server for this call
+            async with stdio_client(self.pool.server_params_factory()) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    result = await session.call_tool(tool_name, arguments=arguments)
+        return _extract_text(result)
+
+
+# ---------------------------------------------------------------------------
+# Native REST mapping of the canvas_* tool names
+# ---------------------------------------------------------------------------
+
+class CanvasRoute(NamedTuple):
+    """A single Canvas REST call that implements a tool."""
+    method: str
+    path: str
+    params: Optional[Dict[str, Any]] = None
+    body: Optional[Dict[str, Any]] = None
+    paginate: bool = False
+    transform: Optional[Callable[[Any], Any]] = None
+
+
+def _rest(args: Dict[str, Any], *keys: str) -> Dict[str, Any]:
+    """Return args without the given (path) keys."""
+    return {k: v for k, v in args.items() if k not in keys}
+
+
+def _list_courses(args):
+    params = {"include[]": ["total_students", "teachers", "term", "course_progress"]}
+    if not args.get("include_ended"):
+        params["state[]"] = ["available", "completed"]
+    return CanvasRoute("GET", "/courses", params=params, paginate=True)
+
+
+def _list_assignments(args):
+    include = ["assignment_group", "rubric", "due_at"]
+    if args.get("include_submissions"):
+        include.append("submission")
+    return CanvasRoute("GET", f"/courses/{args['course_id']}/assignments",
+                       params={"include[]": include}, paginate=True)
+
+
+def _get_assignment(args):
+    include = ["assignment_group", "rubric"]
+    if args.get("include_submission"):
+        include.append("submission")
+    return CanvasRoute("GET", f"/courses/{args['course_id']}/assignments/{args['assignment_id']}",
+                       params={"include[]": include})
+
+
+def _submit_assignment(args):
+    submission = {"submission_type": args["submission_type"]}
+    for key in ("body", "url", "file_ids"):
+        if args.get(key):
+            submission[key] = args[key]
+    return CanvasRoute("POST", f"/courses/{args['course_id']}/assignments/{args['assignment_id']}/submissions",
+                       body={"submission": submission})
+
+
+def _submit_grade(args):
+    body = {"submission": {"posted_grade": args["grade"]}}
+    if args.get("comment"):
+        body["comment"] = {"text_comment": args["comment"]}
+    return CanvasRoute("PUT", f"/courses/{args['course_id']}/assignments/{args['assignment_id']}"
+                              f"/submissions/{args['user_id']}", body=body)
+
+
+def _list_files(args):
+    if args.get("folder_id"):
+        return CanvasRoute("GET", f"/folders/{args['folder_id']}/files", paginate=True)
+    return CanvasRoute("GET", f"/courses/{args['course_id']}/files", paginate=True)
+
+
+def _list_calendar_events(args):
+    params = {"type": "event", "all_events": "true"}
+    if args.get("start_date"):
+        params["start_date"] = args["start_date"]
+    if args.get("end_date"):
+        params["end_date"] = args["end_date"]
+    return CanvasRoute("GET", "/calendar_events", params=params, paginate=True)
+
+
+def _create_announcement(args):
+    body = {"title": args["title"], "message": args["message"], "is_announcement": True}
+    if args.get("delayed_post_at"):
+        body["delayed_post_at"] = args["delayed_post_at"]
+    return CanvasRoute("POST", f"/courses/{args['course_id']}/discussion_topics", body=body)
+
+
+def _enroll_user(args):
+    enrollment = {
+        "user_id": args["user_id"],
+        "type": args.get("role", "StudentEnrollment"),
+        "enrollment_state": args.get("enrollment_state", "active")
+    }
+    return CanvasRoute("POST", f"/courses/{args['course_id']}/enrollments", body={"enrollment": enrollment})
+
+
+def _health_check(profile):
+    return {"status": "ok", "timestamp": datetime.utcnow().isoformat() + "Z", "user": profile}
+
+
+REST_ROUTES: Dict[str, Callable[[Dict[str, Any]], CanvasRoute]] = {
+    # Core
+    "canvas_health_check": lambda a: CanvasRoute("GET", "/users/self/profile", transform=_health_check),
+
+    # Courses
+    "canvas_list_courses": _list_courses,
+    "canvas_get_course": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}",
+        params={"include[]": ["total_students", "teachers", "term", "course_progress", "sections", "syllabus_body"]}),
+    "canvas_create_course": lambda a: CanvasRoute(
+        "POST", f"/accounts/{a['account_id']}/courses", body={"course": _rest(a, "account_id")}),
+    "canvas_update_course": lambda a: CanvasRoute(
+        "PUT", f"/courses/{a['course_id']}", body={"course": _rest(a, "course_id")}),
+    "canvas_get_syllabus": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}", params={"include[]": ["syllabus_body"]},
+        transform=lambda c: {"course_id": a["course_id"], "syllabus_body": c.get("syllabus_body")}),
+
+    # Assignments
+    "canvas_list_assignments": _list_assignments,
+    "canvas_get_assignment": _get_assignment,
+    "canvas_create_assignment": lambda a: CanvasRoute(
+        "POST", f"/courses/{a['course_id']}/assignments", body={"assignment": _rest(a, "course_id")}),
+    "canvas_update_assignment": lambda a: CanvasRoute(
+        "PUT", f"/courses/{a['course_id']}/assignments/{a['assignment_id']}",
+        body={"assignment": _rest(a, "course_id", "assignment_id")}),
+    "canvas_list_assignment_groups": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/assignment_groups", params={"include[]": ["assignments"]}, paginate=True),
+    "canvas_get_upcoming_assignments": lambda a: CanvasRoute(
+        "GET", "/users/self/upcoming_events", params={"limit": a.get("limit", 10)},
+        transform=lambda events: [e for e in events if e.get("assignment")]),
+
+    # Submissions & grading
+    "canvas_get_submission": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/assignments/{a['assignment_id']}/submissions/{a.get('user_id') or 'self'}",
+        params={"include[]": ["submission_comments", "rubric_assessment", "assignment"]}),
+    "canvas_submit_assignment": _submit_assignment,
+    "canvas_submit_grade": _submit_grade,
+
+    # Announcements & discussions
+    "canvas_create_announcement": _create_announcement,
+    "canvas_list_announcements": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/discussion_topics",
+        params={"only_announcements": "true", "include[]": ["assignment"]}, paginate=True),
+    "canvas_list_discussion_topics": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/discussion_topics", params={"include[]": ["assignment"]}, paginate=True),
+    "canvas_get_discussion_topic": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/discussion_topics/{a['topic_id']}", params={"include[]": ["assignment"]}),
+    "canvas_post_to_discussion": lambda a: CanvasRoute(
+        "POST", f"/courses/{a['course_id']}/discussion_topics/{a['topic_id']}/entries",
+        body={"message": a["message"]}),
+
+    # Modules
+    "canvas_list_modules": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/modules", params={"include[]": ["items"]}, paginate=True),
+    "canvas_get_module": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/modules/{a['module_id']}", params={"include[]": ["items"]}),
+    "canvas_list_module_items": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/modules/{a['module_id']}/items",
+        params={"include[]": ["content_details"]}, paginate=True),
+    "canvas_get_module_item": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/modules/{a['module_id']}/items/{a['item_id']}",
+        params={"include[]": ["content_details"]}),
+    "canvas_mark_module_item_complete": lambda a: CanvasRoute(
+        "PUT", f"/courses/{a['course_id']}/modules/{a['module_id']}/items/{a['item_id']}/done"),
+
+    # Quizzes
+    "canvas_list_quizzes": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/quizzes", paginate=True),
+    "canvas_get_quiz": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/quizzes/{a['quiz_id']}"),
+    "canvas_create_quiz": lambda a: CanvasRoute(
+        "POST", f"/courses/{a['course_id']}/quizzes", body={"quiz": _rest(a, "course_id")}),
+    "canvas_start_quiz_attempt": lambda a: CanvasRoute(
+        "POST", f"/courses/{a['course_id']}/quizzes/{a['quiz_id']}/submissions"),
+    "canvas_create_quiz_question": lambda a: CanvasRoute(
+        "POST", f"/courses/{a['course_id']}/quizzes/{a['quiz_id']}/questions",
+        body={"question": _rest(a, "course_id", "quiz_id")}),
+
+    # Files & pages
+    "canvas_list_files": _list_files,
+    "canvas_get_file": lambda a: CanvasRoute("GET", f"/files/{a['file_id']}"),
+    "canvas_list_folders": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/folders", paginate=True),
+    "canvas_list_pages": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/pages", paginate=True),
+    "canvas_get_page": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/pages/{a['page_url']}"),
+
+    # Users, enrollments & grades
+    "canvas_get_user_profile": lambda a: CanvasRoute("GET", "/users/self/profile"),
+    "canvas_update_user_profile": lambda a: CanvasRoute("PUT", "/users/self", body={"user": a}),
+    "canvas_enroll_user": _enroll_user,
+    "canvas_get_course_grades": lambda a: CanvasRoute(
+        "GET", f"/courses/{a['course_id']}/enrollments",
+        params={"include[]": ["grades", "observed_users"]}, paginate=True),
+    "canvas_get_user_grades": lambda a: CanvasRoute("GET", "/users/self/grades"),
+
+    # Accounts
+    "canvas_get_account": lambda a: CanvasRoute("GET", f"/accounts/{a['account_id']}"),
+    "canvas_list_account_courses": lambda a: CanvasRoute(
+        "GET", f"/accounts/{a['account_id']}/courses", params=_rest(a, "account_id"), paginate=True),
+    "canvas_list_account_users": lambda a: CanvasRoute(
+        "GET", f"/accounts/{a['account_id']}/users", params=_rest(a, "account_id"), paginate=True),
+    "canvas_create_user": lambda a: CanvasRoute(
+        "POST", f"/accounts/{a['account_id']}/users", body=_rest(a, "account_id")),
+
+    # Calendar, dashboard, rubrics, messaging
+    "canvas_list_calendar_events": _list_calendar_events,
+    "canvas_get_dashboard": lambda a: CanvasRoute("GET", "/users/self/dashboard"),
+    "canvas_get_dashboard_cards": lambda a: CanvasRoute("GET", "/dashboard/dashboard_cards"),
+    "canvas_list_rubrics": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/rubrics", paginate=True),
+    "canvas_get_rubric": lambda a: CanvasRoute("GET", f"/courses/{a['course_id']}/rubrics/{a['rubric_id']}"),
+    "canvas_list_conversations": lambda a: CanvasRoute("GET", "/conversations", paginate=True),
+    "canvas_get_conversation": lambda a: CanvasRoute("GET", f"/conversations/{a['conversation_id']}"),
+    "canvas_create_conversation": lambda a: CanvasRoute(
+        "POST", "/conversations",
+        body={"recipients": a["recipients"], "body": a["body"], "subject": a.get("subject")}),
+    "canvas_list_notifications": lambda a: CanvasRoute("GET", "/users/self/activity_stream", paginate=True),
+}
+
+
+class RestTransport(CanvasTransport):
+    """Maps canvas_* tool names straight onto the Canvas REST API."""
+
+    name = "rest"
+
+    def __init__(self, base_url: str = None, token: str = None):
+        self.base_url = (base_url or get_canvas_base_url()).rstrip("/")
+        self.token = token or os.getenv("CANVAS_API_TOKEN")
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def request(self, route: CanvasRoute) -> Any:
+        url = f"{self.base_url}/api/v1{route.path}"
+        params = dict(route.params or {})
+        if route.paginate:
+            params.setdefault("per_page", CANVAS_PER_PAGE)
+        response = await canvas_clients.request(
+            self.base_url, route.method, url, route="tools",
+            params=params or None, json=route.body, headers=self._headers()
+        )
+        if response.status_code >= 400:
+            raise CanvasToolError(f"Canvas API error {response.status_code}: {response.text[:500]}")
+        data = response.json() if response.content else {}
+
+        # Fetch every page so list tools return complete data, like the MCP server
+        if route.paginate and isinstance(data, list):
+            data = []
+            try:
+                async for page in iter_pages(self.base_url, response, route="tools", headers=self._headers()):
+                    data.extend(page)
+            except CanvasHTTPError as e:
+                raise CanvasToolError(str(e))
+
+        return data
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        builder = REST_ROUTES.get(tool_name)
+        if builder is None:
+            raise CanvasToolError(f"Unknown tool: {tool_name}")
+
+        route = builder(arguments)
+        data = await self.request(route)
+        if route.transform:
+            data = route.transform(data)
+        return json.dumps(data, indent=2)
+
+
+TRANSPORTS = {
+    "mcp": MCPTransport,
+    "rest": RestTransport,
+}
+
+_transport: Optional[CanvasTransport] = None
+
+
+def get_transport() -> CanvasTransport:
+    """Return the configured transport (CANVAS_TRANSPORT=mcp|rest)."""
+    global _transport
+    if _transport is None:
+        transport_cls = TRANSPORTS.get(CANVAS_TRANSPORT, MCPTransport)
+        _transport = transport_cls()
+    return _transport
+
+
+def set_transport(transport: CanvasTransport) -> None:
+    """Override the active transport (benchmarks, alternative backends)."""
+    global _transport
+    _transport = transport
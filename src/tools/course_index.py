@@ -0,0 +1,372 @@
+"""
+Per-user index of Canvas courses for resolving course names to ids.
+
+The executor used to resolve "History 101" with a full get_canvas_courses
+listing and an LLM turn to read it. Instead, every course payload that
+passes through run_mcp_tool is folded into a small in-memory index per
+Canvas user:
+- canvas_list_courses results (re)build the user's index
+- canvas_get_course / canvas_create_course / canvas_update_course results
+  upsert the one course they return, so the index follows changes made
+  through the agent without another listing
+- an index older than COURSE_INDEX_TTL answers immediately and is rebuilt
+  in the background; a name that matches nothing triggers one synchronous
+  reload if the index is older than COURSE_INDEX_MISS_RELOAD
+
+Each course is indexed by name, original name (when the user set a
+nickname), course code and term. A query is matched by exact alias, then
+by tokens ("hist 101" matches "HIST101", "History 101 Fall" uses the
+term), then fuzzily for typos (rapidfuzz when installed, difflib
+otherwise). Resolutions are cached per index version, so repeated lookups
+cost microseconds.
+"""
+
+import asyncio
+import difflib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    from rapidfuzz import fuzz
+
+    def _similarity(a: str, b: str, cutoff: float = 0.0) -> float:
+        """Similarity ratio (0-1) of two strings, 0.0 below cutoff."""
+        return fuzz.ratio(a, b, score_cutoff=cutoff * 100) / 100.0
+except ImportError:
+    def _similarity(a: str, b: str, cutoff: float = 0.0) -> float:
+        """Similarity ratio (0-1) of two strings, 0.0 below cutoff."""
+        matcher = difflib.SequenceMatcher(None, a, b)
+        if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+            return 0.0
+        ratio = matcher.ratio()
+        return ratio if ratio >= cutoff else 0.0
+
+
+COURSE_INDEX_ENABLED = os.getenv("COURSE_INDEX_ENABLED", "true").lower() == "true"
+# Seconds before a user's index is rebuilt in the background
+COURSE_INDEX_TTL = float(os.getenv("COURSE_INDEX_TTL", "900"))
+# An unmatched name reloads the index once if it is older than this (seconds)
+COURSE_INDEX_MISS_RELOAD = float(os.getenv("COURSE_INDEX_MISS_RELOAD", "30"))
+# Minimum match score (0-1) and lead over the runner-up for a confident match
+COURSE_MATCH_MIN_SCORE = float(os.getenv("COURSE_MATCH_MIN_SCORE", "0.6"))
+COURSE_MATCH_MARGIN = float(os.getenv("COURSE_MATCH_MARGIN", "0.1"))
+# Users kept in memory
+COURSE_INDEX_MAX_USERS = int(os.getenv("COURSE_INDEX_MAX_USERS", "1000"))
+
+# Tools whose results carry a single course record
+SINGLE_COURSE_TOOLS = ("canvas_get_course", "canvas_create_course", "canvas_update_course")
+
+_SPLIT_RE = re.compile(r"(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: Any) -> str:
+    """Lowercase words with letters and digits split apart ("HIST-101a" -> "hist 101 a")."""
+    text = _NON_ALNUM_RE.sub(" ", str(text or "").lower())
+    return " ".join(_SPLIT_RE.sub(" ", text).split())
+
+
+@dataclass
+class CourseEntry:
+    id: int
+    name: str
+    course_code: str = ""
+    term: str = ""
+    aliases: Tuple[str, ...] = ()
+    alias_tokens: Tuple[Tuple[str, ...], ...] = ()
+    tokens: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> Optional["CourseEntry"]:
+        if not isinstance(record, dict) or record.get("id") is None or not record.get("name"):
+            return None
+        term = record.get("term")
+        term = term.get("name") if isinstance(term, dict) else term
+        names = (record.get("name"), record.get("original_name"), record.get("nickname"), record.get("course_code"))
+        aliases = tuple(dict.fromkeys(a for a in (normalize(n) for n in names) if a))
+        term_norm = normalize(term)
+        try:
+            course_id = int(record["id"])
+        except (TypeError, ValueError):
+            return None
+        return cls(
+            id=course_id,
+            name=str(record["name"]),
+            course_code=str(record.get("course_code") or ""),
+            term=str(term or ""),
+            aliases=aliases,
+            alias_tokens=tuple(tuple(alias.split()) for alias in aliases),
+            tokens={token for alias in aliases for token in alias.split()} | set(term_norm.split()) | {str(course_id)},
+        )
+
+
+@dataclass
+class CourseMatch:
+    course: CourseEntry
+    score: float
+
+
+def expand_tokens(query_tokens: Sequence[str], vocabulary: Iterable[str], fuzzy: bool) -> Dict[str, Dict[str, float]]:
+    """Indexed tokens each query token stands for, with weights (1.0 exact, 0.8 close spelling)."""
+    expanded: Dict[str, Dict[str, float]] = {}
+    for token in query_tokens:
+        matches = {token: 1.0} if token in vocabulary else {}
+        if fuzzy and not matches and len(token) >= 4:
+            matches = {word: 0.8 for word in vocabulary
+                       if abs(len(word) - len(token)) <= 2 and _similarity(token, word, 0.8)}
+        expanded[token] = matches
+    return expanded
+
+
+def score_course(query: str, expanded: Dict[str, Dict[str, float]], course: CourseEntry,
+                 fuzzy: bool = False) -> float:
+    """Match score (0-1) of a normalized query (tokens from expand_tokens) against one course."""
+    if query in course.aliases or query == str(course.id):
+        return 1.0
+    if not expanded:
+        return 0.0
+    coverage = 0.0
+    used = set()
+    for words in expanded.values():
+        weight = 0.0
+        for word, w in words.items():
+            if word in course.tokens:
+                used.add(word)
+                weight = max(weight, w)
+        coverage += weight
+    coverage /= len(expanded)
+    # Share of the closest alias the query accounts for ("history 101" beats "history 101 honors")
+    alias_coverage = max((sum(t in used for t in alias) / len(alias) for alias in course.alias_tokens), default=0.0)
+    score = 0.75 * coverage + 0.25 * alias_coverage if coverage else 0.0
+    if fuzzy and coverage < 0.5:
+        # Run-together or badly misspelled names: compare whole strings
+        cutoff = COURSE_MATCH_MIN_SCORE / 0.95
+        score = max(score, 0.95 * max((_similarity(query, alias, cutoff) for alias in course.aliases), default=0.0))
+    return min(score, 0.99)
+
+
+class _UserCourses:
+    """One user's courses and resolution cache."""
+
+    def __init__(self):
+        self.courses: Dict[int, CourseEntry] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.built_at = 0.0
+        self.version = 0
+        self.listing_hash: Optional[int] = None
+        self.resolutions: "OrderedDict[str, List[CourseMatch]]" = OrderedDict()
+        self.refresh: Optional[asyncio.Task] = None
+
+    def changed(self) -> None:
+        self.postings = {}
+        for course in self.courses.values():
+            for token in course.tokens:
+                self.postings.setdefault(token, set()).add(course.id)
+        self.version += 1
+        self.resolutions.clear()
+
+
+class CourseIndex:
+    """Per-user course name -> course_id index fed by course tool results."""
+
+    def __init__(self, max_users: int = COURSE_INDEX_MAX_USERS):
+        self.max_users = max_users
+        self._users: "OrderedDict[str, _UserCourses]" = OrderedDict()
+        self._stats = {
+            "lookups": 0,
+            "resolved": 0,
+            "ambiguous": 0,
+            "unmatched": 0,
+            "cached_lookups": 0,
+            "builds": 0,
+            "upserts": 0,
+            "background_refreshes": 0,
+            "miss_reloads": 0,
+            "lookup_us": 0.0,  # matching time, excluding index loads
+        }
+
+    def _user(self, identity: str) -> _UserCourses:
+        user = self._users.get(identity)
+        if user is None:
+            user = self._users[identity] = _UserCourses()
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(identity)
+        return user
+
+    def observe(self, tool_name: str, raw: Any, identity: str = "") -> None:
+        """Fold a course tool's raw result into the user's index (other tools are ignored)."""
+        if not COURSE_INDEX_ENABLED or not isinstance(raw, str):
+            return
+        if tool_name == "canvas_list_courses":
+            self._build(identity, raw)
+        elif tool_name in SINGLE_COURSE_TOOLS:
+            self._upsert(identity, raw)
+
+    def _build(self, identity: str, raw: str) -> None:
+        user = self._user(identity)
+        listing_hash = hash(raw)
+        if listing_hash == user.listing_hash:
+            user.built_at = time.monotonic()
+            return
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        records = data.get("courses") if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            return
+        entries = (CourseEntry.from_record(record) for record in records)
+        user.courses = {entry.id: entry for entry in entries if entry is not None}
+        user.listing_hash = listing_hash
+        user.built_at = time.monotonic()
+        user.changed()
+        self._stats["builds"] += 1
+
+    def _upsert(self, identity: str, raw: str) -> None:
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        entry = CourseEntry.from_record(data[0] if isinstance(data, list) and data else data)
+        if entry is None:
+            return
+        user = self._user(identity)
+        user.courses[entry.id] = entry
+        user.listing_hash = None
+        user.changed()
+        self._stats["upserts"] += 1
+
+    def match(self, query: str, identity: str = "") -> List[CourseMatch]:
+        """Courses matching `query` above COURSE_MATCH_MIN_SCORE, best first."""
+        user = self._user(identity)
+        query = normalize(query)
+        cached = user.resolutions.get(query)
+        if cached is not None:
+            self._stats["cached_lookups"] += 1
+            user.resolutions.move_to_end(query)
+            return cached
+        tokens = query.split()
+        scored = self._score(user, query, tokens, fuzzy=False)
+        # Typo matching only when no course matches on exact tokens
+        if not any(m.score >= 0.9 for m in scored):
+            scored = self._score(user, query, tokens, fuzzy=True)
+        matches = sorted((m for m in scored if m.score >= COURSE_MATCH_MIN_SCORE), key=lambda m: -m.score)
+        user.resolutions[query] = matches
+        if len(user.resolutions) > 256:
+            user.resolutions.popitem(last=False)
+        return matches
+
+    @staticmethod
+    def _score(user: _UserCourses, query: str, tokens: List[str], fuzzy: bool) -> List[CourseMatch]:
+        expanded = expand_tokens(tokens, user.postings.keys(), fuzzy)
+        # Only courses sharing a token with the query can score, except whole-string typo matches
+        ids = {course_id for words in expanded.values() for word in words for course_id in user.postings[word]}
+        courses = user.courses.values() if fuzzy else (user.courses[i] for i in ids)
+        return [CourseMatch(c, score_course(query, expanded, c, fuzzy)) for c in courses]
+
+    async def resolve(self, query: str, load: Callable[[bool], Awaitable[Any]], identity: str = "") -> List[CourseMatch]:
+        """Resolve a course name, loading or refreshing the user's index as needed.
+
+        Args:
+            query: Course name, code or nickname as the user wrote it
+            load: Coroutine factory that lists the user's courses through
+                run_mcp_tool (which feeds observe); called with fresh=True
+                when cached listings must be bypassed
+            identity: Canvas user partition
+
+        Returns:
+            Matching courses, best first; a single entry (or a clear lead
+            of the first) means the name resolved.
+        """
+        self._stats["lookups"] += 1
+        user = self._user(identity)
+        loaded = False
+        if not user.built_at:
+            await load(False)
+            loaded = True
+        elif time.monotonic() - user.built_at > COURSE_INDEX_TTL:
+            self._refresh(user, load)
+
+        start = time.perf_counter()
+        matches = self.match(query, identity)
+        self._stats["lookup_us"] += (time.perf_counter() - start) * 1e6
+        if not matches and not loaded and time.monotonic() - user.built_at > COURSE_INDEX_MISS_RELOAD:
+            self._stats["miss_reloads"] += 1
+            await load(True)
+            matches = self.match(query, identity)
+
+        if not matches:
+            self._stats["unmatched"] += 1
+        elif is_confident(matches):
+            self._stats["resolved"] += 1
+        else:
+            self._stats["ambiguous"] += 1
+        return matches
+
+    def _refresh(self, user: _UserCourses, load: Callable[[bool], Awaitable[Any]]) -> None:
+        """Rebuild a stale index in the background (one refresh per user at a time)."""
+        if user.refresh is not None and not user.refresh.done():
+            return
+        self._stats["background_refreshes"] += 1
+
+        async def refresh():
+            try:
+                await load(True)
+            except Exception as e:
+                print(f"[COURSES] Background course index refresh failed: {e}", file=sys.stderr)
+
+        user.refresh = asyncio.create_task(refresh())
+
+    def invalidate(self, identity: str = None) -> None:
+        """Forget one user's index (all users when identity is None)."""
+        if identity is None:
+            self._users.clear()
+        else:
+            self._users.pop(identity, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["lookups"]
+        return {
+            **{k: v for k, v in self._stats.items() if k != "lookup_us"},
+            "enabled": COURSE_INDEX_ENABLED,
+            "users": len(self._users),
+            "courses": sum(len(u.courses) for u in self._users.values()),
+            "avg_lookup_us": round(self._stats["lookup_us"] / lookups, 1) if lookups else 0.0,
+        }
+
+
+def is_confident(matches: List[CourseMatch]) -> bool:
+    """True when the best match clearly beats the runner-up."""
+    if not matches:
+        return False
+    if len(matches) == 1 or matches[0].score - matches[1].score >= COURSE_MATCH_MARGIN:
+        return True
+    # An exact name/code match wins over near misses, but not over another exact match
+    return matches[0].score == 1.0 and matches[1].score < 1.0
+
+
+def _describe(course: CourseEntry) -> str:
+    return " | ".join(str(v) for v in (course.id, course.name, course.course_code, course.term) if v != "")
+
+
+def format_resolution(query: str, matches: List[CourseMatch], limit: int = 5) -> str:
+    """Tool output for resolve_course: the course_id, the candidates, or a miss."""
+    if not matches:
+        return f"No course matches '{query}'. Use get_canvas_courses to list all courses."
+    if is_confident(matches):
+        return f"course_id={matches[0].course.id} ({_describe(matches[0].course)})"
+    lines = [f"Several courses match '{query}'; ask the user which one if the request does not say:",
+             "id | name | course_code | term"]
+    lines += [_describe(m.course) for m in matches[:limit]]
+    return "\n".join(lines)
+
+
+# Global index used by run_mcp_tool and resolve_course
+course_index = CourseIndex()
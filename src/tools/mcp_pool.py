@@ -0,0 +1,296 @@
+"""
+Pooled MCP sessions for the Canvas LMS MCP server.
+
+Starting the `canvas-lms-agent-mcp-canvas-lms` container and running the MCP
+handshake dominates the latency of a single tool call. This module keeps a
+fixed number of initialized ClientSessions alive and hands them out with
+lease/return semantics:
+- Each session is owned by its own background task (the stdio/anyio context
+  managers must be entered and exited by the same task)
+- Dead or failed sessions are respawned automatically
+- A background health check pings idle sessions periodically
+"""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+
+# Pool configuration (overridable from the environment)
+MCP_POOL_ENABLED = os.getenv("MCP_POOL_ENABLED", "true").lower() == "true"
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+MCP_POOL_LEASE_TIMEOUT = float(os.getenv("MCP_POOL_LEASE_TIMEOUT", "30"))
+MCP_POOL_STARTUP_TIMEOUT = float(os.getenv("MCP_POOL_STARTUP_TIMEOUT", "60"))
+MCP_POOL_HEALTH_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "30"))
+MCP_POOL_PING_TIMEOUT = float(os.getenv("MCP_POOL_PING_TIMEOUT", "5"))
+
+
+def get_server_params() -> StdioServerParameters:
+    """Parameters used to spawn the Canvas MCP server over stdio."""
+    return StdioServerParameters(
+        command="docker",
+        args=["run", "--rm", "-i", "--env-file", ".env", "canvas-lms-agent-mcp-canvas-lms"],
+        env=None
+    )
+
+
+class PooledSession:
+    """A single long-lived MCP session owned by a background task."""
+
+    def __init__(self, server_params: StdioServerParameters, slot: int):
+        self.server_params = server_params
+        self.slot = slot
+        self.session: Optional[ClientSession] = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float = MCP_POOL_STARTUP_TIMEOUT) -> "PooledSession":
+        """Spawn the server process and wait until the session is initialized."""
+        self._task = asyncio.create_task(self._run(), name=f"mcp-session-{self.slot}")
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise TimeoutError(f"MCP session {self.slot} did not initialize within {timeout}s")
+
+        if self._error is not None:
+            raise RuntimeError(f"MCP session {self.slot} failed to start: {self._error}")
+        return self
+
+    async def _run(self) -> None:
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self._error = e
+            print(f"[MCP_POOL] Session {self.slot} terminated: {e}", file=sys.stderr)
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def ping(self, timeout: float = MCP_POOL_PING_TIMEOUT) -> bool:
+        """Return True if the server answers an MCP ping in time."""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self, timeout: float = 10) -> None:
+        """Stop the owning task, which tears down the session and the process."""
+        self._stop.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+
+
+class MCPSessionPool:
+    """Fixed-size pool of warm MCP sessions with lease/return semantics."""
+
+    def __init__(
+        self,
+        size: int = MCP_POOL_SIZE,
+        lease_timeout: float = MCP_POOL_LEASE_TIMEOUT,
+        health_interval: float = MCP_POOL_HEALTH_INTERVAL,
+        server_params_factory=get_server_params
+    ):
+        self.size = max(1, size)
+        self.lease_timeout = lease_timeout
+        self.health_interval = health_interval
+        self.server_params_factory = server_params_factory
+        self.started = False
+        self._idle: Optional[asyncio.Queue] = None
+        self._sessions: Dict[int, PooledSession] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self._background: set = set()
+        self._stats = {
+            "leases": 0,
+            "lease_timeouts": 0,
+            "respawns": 0,
+            "respawn_failures": 0,
+            "health_checks": 0,
+            "health_failures": 0,
+        }
+
+    async def start(self) -> None:
+        """Spawn all sessions concurrently and start the health check loop."""
+        if self.started:
+            return
+
+        self._idle = asyncio.Queue()
+        print(f"[MCP_POOL] Starting {self.size} MCP sessions...", file=sys.stderr)
+        results = await asyncio.gather(
+            *(self._spawn(slot) for slot in range(self.size)),
+            return_exceptions=True
+        )
+
+        for slot, result in enumerate(results):
+            if isinstance(result, BaseException):
+                # Keep the slot; it will be respawned on first lease or health check
+                print(f"[MCP_POOL] Slot {slot} failed to start: {result}", file=sys.stderr)
+                self._sessions[slot] = PooledSession(self.server_params_factory(), slot)
+            self._idle.put_nowait(self._sessions[slot])
+
+        self.started = True
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop(), name="mcp-pool-health")
+
+        alive = sum(1 for s in self._sessions.values() if s.alive)
+        print(f"[MCP_POOL] Pool ready: {alive}/{self.size} sessions alive", file=sys.stderr)
+
+    async def close(self) -> None:
+        """Stop health checks and tear down every session."""
+        if not self.started:
+            return
+        self.started = False
+
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._health_task = None
+
+        for task in list(self._background):
+            task.cancel()
+
+        await asyncio.gather(*(s.close() for s in self._sessions.values()), return_exceptions=True)
+        self._sessions.clear()
+        print("[MCP_POOL] Pool shut down", file=sys.stderr)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease a warm ClientSession; it is returned to the pool on exit.
+
+        Sessions that raise while leased are recycled in the background
+        instead of being handed to the next caller.
+        """
+        if not self.started:
+            raise RuntimeError("MCP session pool is not started")
+
+        pooled = await self._acquire()
+        failed = False
+        try:
+            yield pooled.session
+        except Exception:
+            failed = True
+            raise
+        finally:
+            pooled.last_used = time.monotonic()
+            pooled.uses += 1
+            if failed or not pooled.alive:
+                self._run_in_background(self._recycle(pooled))
+            else:
+                self._idle.put_nowait(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage counters for status endpoints."""
+        idle = self._idle.qsize() if self._idle else 0
+        return {
+            "enabled": self.started,
+            "size": self.size,
+            "alive": sum(1 for s in self._sessions.values() if s.alive),
+            "idle": idle,
+            "in_use": self.size - idle if self.started else 0,
+            **self._stats
+        }
+
+    async def _spawn(self, slot: int) -> PooledSession:
+        pooled = PooledSession(self.server_params_factory(), slot)
+        await pooled.start()
+        self._sessions[slot] = pooled
+        return pooled
+
+    async def _respawn(self, pooled: PooledSession) -> PooledSession:
+        await pooled.close()
+        try:
+            fresh = await self._spawn(pooled.slot)
+        except Exception:
+            self._stats["respawn_failures"] += 1
+            raise
+        self._stats["respawns"] += 1
+        print(f"[MCP_POOL] Respawned session in slot {pooled.slot}", file=sys.stderr)
+        return fresh
+
+    async def _acquire(self) -> PooledSession:
+        try:
+            pooled = await asyncio.wait_for(self._idle.get(), self.lease_timeout)
+        except asyncio.TimeoutError:
+            self._stats["lease_timeouts"] += 1
+            raise TimeoutError(f"No MCP session available within {self.lease_timeout}s")
+
+        if not pooled.alive:
+            try:
+                pooled = await self._respawn(pooled)
+            except Exception:
+                # Give the slot back so another caller can retry the respawn
+                self._idle.put_nowait(self._sessions.get(pooled.slot, pooled))
+                raise
+
+        self._stats["leases"] += 1
+        return pooled
+
+    async def _recycle(self, pooled: PooledSession) -> None:
+        try:
+            if not await pooled.ping():
+                pooled = await self._respawn(pooled)
+        except Exception as e:
+            print(f"[MCP_POOL] Recycling slot {pooled.slot} failed: {e}", file=sys.stderr)
+            pooled = self._sessions.get(pooled.slot, pooled)
+        finally:
+            if self.started:
+                self._idle.put_nowait(pooled)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            # Only check sessions that are idle right now; leased ones are in use
+            for _ in range(self._idle.qsize()):
+                try:
+                    pooled = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+
+                self._stats["health_checks"] += 1
+                if not await pooled.ping():
+                    self._stats["health_failures"] += 1
+                    try:
+                        pooled = await self._respawn(pooled)
+                    except Exception as e:
+                        print(f"[MCP_POOL] Health respawn failed for slot {pooled.slot}: {e}", file=sys.stderr)
+                        pooled = self._sessions.get(pooled.slot, pooled)
+                self._idle.put_nowait(pooled)
+
+    def _run_in_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# Global pool instance, started and stopped by the FastAPI lifespan
+mcp_pool = MCPSessionPool()
@@ -0,0 +1,249 @@
+"""
+Compact projections of Canvas tool results for the LLM context.
+
+Read tools return raw Canvas JSON: dozens of fields per record (permissions,
+lock info, rubric settings, HTML descriptions ...) that no prompt needs.
+Before a result reaches the agent it is projected:
+- Only the fields listed for the tool are kept (nested fields as "a.b")
+- HTML text fields are reduced to plain text and truncated
+- Lists of records become a compact pipe table (one header line + one line
+  per record) instead of indented JSON
+- Anything that is not JSON (errors, plain text) passes through unchanged
+
+The raw result is kept in a small per-user store and the projection ends
+with a reference, so the agent can still call get_full_canvas_record(ref,
+record_id) when it needs a field that was left out.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.token_counting import count_text_tokens
+
+
+TOOL_PROJECTION_ENABLED = os.getenv("TOOL_PROJECTION_ENABLED", "true").lower() == "true"
+# Lists with at least this many records are rendered as a table
+PROJECTION_TABLE_MIN_ROWS = int(os.getenv("PROJECTION_TABLE_MIN_ROWS", "3"))
+# Characters kept from long text fields (descriptions, messages, syllabus)
+PROJECTION_TEXT_CHARS = int(os.getenv("PROJECTION_TEXT_CHARS", "400"))
+# Raw results kept for get_full_canvas_record
+PROJECTION_RAW_STORE_SIZE = int(os.getenv("PROJECTION_RAW_STORE_SIZE", "256"))
+# Tokenize the first and then every Nth projection per tool for the token metrics
+PROJECTION_TOKEN_SAMPLE = max(1, int(os.getenv("PROJECTION_TOKEN_SAMPLE", "20")))
+
+# Fields kept per tool (MCP tool names, as passed to run_mcp_tool)
+PROJECTIONS: Dict[str, Tuple[str, ...]] = {
+    "canvas_list_courses": ("id", "name", "course_code", "workflow_state", "term.name", "start_at", "end_at"),
+    "canvas_get_course": ("id", "name", "course_code", "workflow_state", "term.name", "start_at", "end_at",
+                          "total_students", "html_url", "syllabus_body"),
+    "canvas_list_account_courses": ("id", "name", "course_code", "workflow_state", "start_at"),
+    "canvas_get_dashboard_cards": ("id", "shortName", "courseCode", "term", "href"),
+    "canvas_list_assignments": ("id", "name", "due_at", "points_possible", "workflow_state", "published",
+                                "submission_types", "html_url"),
+    "canvas_get_assignment": ("id", "name", "description", "due_at", "lock_at", "unlock_at", "points_possible",
+                              "grading_type", "submission_types", "workflow_state", "published",
+                              "needs_grading_count", "html_url"),
+    "canvas_get_upcoming_assignments": ("id", "name", "course_id", "due_at", "points_possible", "html_url"),
+    "canvas_list_assignment_groups": ("id", "name", "position", "group_weight"),
+    "canvas_get_submission": ("id", "user_id", "assignment_id", "workflow_state", "submitted_at", "late",
+                              "missing", "score", "grade", "attempt", "preview_url"),
+    "canvas_get_course_grades": ("id", "user_id", "user.name", "grades.current_score", "grades.final_score",
+                                 "grades.current_grade", "enrollment_state"),
+    "canvas_get_user_grades": ("id", "course_id", "grades.current_score", "grades.current_grade",
+                               "grades.final_score", "enrollment_state"),
+    "canvas_list_account_users": ("id", "name", "sortable_name", "login_id", "email"),
+    "canvas_get_user_profile": ("id", "name", "short_name", "primary_email", "login_id", "time_zone", "bio"),
+    "canvas_list_announcements": ("id", "title", "posted_at", "message", "html_url"),
+    "canvas_list_discussion_topics": ("id", "title", "posted_at", "discussion_subentry_count", "unread_count",
+                                      "html_url"),
+    "canvas_get_discussion_topic": ("id", "title", "message", "posted_at", "discussion_subentry_count",
+                                    "author.display_name", "html_url"),
+    "canvas_list_modules": ("id", "name", "position", "state", "items_count", "published"),
+    "canvas_get_module": ("id", "name", "position", "state", "items_count", "published", "unlock_at"),
+    "canvas_list_module_items": ("id", "title", "type", "content_id", "position", "completion_requirement.type",
+                                 "html_url"),
+    "canvas_list_quizzes": ("id", "title", "quiz_type", "due_at", "points_possible", "question_count",
+                            "time_limit", "published", "html_url"),
+    "canvas_get_quiz": ("id", "title", "description", "quiz_type", "due_at", "points_possible", "question_count",
+                        "time_limit", "allowed_attempts", "published", "html_url"),
+    "canvas_list_files": ("id", "display_name", "content-type", "size", "updated_at", "url"),
+    "canvas_list_folders": ("id", "name", "full_name", "files_count", "folders_count"),
+    "canvas_list_pages": ("page_id", "url", "title", "updated_at", "published"),
+    "canvas_list_calendar_events": ("id", "title", "start_at", "end_at", "context_code", "location_name",
+                                    "html_url"),
+    "canvas_list_conversations": ("id", "subject", "last_message", "last_message_at", "message_count",
+                                  "workflow_state"),
+    "canvas_list_notifications": ("id", "title", "message", "created_at", "html_url"),
+    "canvas_list_rubrics": ("id", "title", "points_possible", "context_id"),
+}
+
+# Fields holding (often HTML) prose: reduced to plain text and truncated
+TEXT_FIELDS = {"description", "message", "syllabus_body", "bio", "last_message", "public_description"}
+
+TAG = re.compile(r"<[^>]+>")
+SPACE = re.compile(r"\s+")
+
+
+def _get_path(record: Dict[str, Any], path: str) -> Any:
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _plain_text(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    text = SPACE.sub(" ", html.unescape(TAG.sub(" ", value))).strip()
+    if len(text) > PROJECTION_TEXT_CHARS:
+        text = text[:PROJECTION_TEXT_CHARS].rstrip() + "..."
+    return text
+
+
+def project_record(record: Any, fields: Sequence[str]) -> Any:
+    """Keep only `fields` of a record (missing and null fields are omitted)."""
+    if not isinstance(record, dict):
+        return record
+    projected = {}
+    for field in fields:
+        value = _get_path(record, field)
+        if value is None:
+            continue
+        projected[field] = _plain_text(value) if field.split(".")[-1] in TEXT_FIELDS else value
+    return projected
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, separators=(",", ":"))
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def to_table(records: List[Dict[str, Any]], fields: Sequence[str]) -> str:
+    """Render projected records as "a | b | c" lines with a header."""
+    columns = [f for f in fields if any(f in r for r in records)]
+    lines = [" | ".join(columns)]
+    for record in records:
+        lines.append(" | ".join(_cell(record.get(f, "")) for f in columns))
+    return "\n".join(lines)
+
+
+class RawResultStore:
+    """Recent raw tool results, per user, for get_full_canvas_record."""
+
+    def __init__(self, max_entries: int = PROJECTION_RAW_STORE_SIZE):
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    def put(self, identity: str, tool_name: str, arguments: Dict[str, Any], raw: str) -> str:
+        ref = hashlib.sha256(
+            json.dumps([tool_name, arguments], sort_keys=True, default=str).encode()
+        ).hexdigest()[:10]
+        self._results[(identity, ref)] = raw
+        self._results.move_to_end((identity, ref))
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return ref
+
+    def get(self, identity: str, ref: str) -> Optional[str]:
+        return self._results.get((identity, ref))
+
+
+raw_results = RawResultStore()
+projection_stats: Dict[str, Dict[str, int]] = {}
+
+
+def project_result(tool_name: str, arguments: Dict[str, Any], raw: str, identity: str = "") -> str:
+    """Compact form of a tool result for the LLM (raw text when there is no projection).
+
+    Args:
+        tool_name: MCP tool name
+        arguments: Tool arguments (identify the result for get_full_canvas_record)
+        raw: Raw tool output
+        identity: Cache identity of the Canvas user (scopes the stored raw result)
+    """
+    fields = PROJECTIONS.get(tool_name)
+    if not TOOL_PROJECTION_ENABLED or not fields or not raw:
+        return raw
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return raw
+
+    if isinstance(data, list):
+        records = [project_record(r, fields) for r in data]
+        if len(records) >= PROJECTION_TABLE_MIN_ROWS and all(isinstance(r, dict) for r in records):
+            body = f"{len(records)} records:\n" + to_table(records, fields)
+        else:
+            body = json.dumps(records, separators=(",", ":"), default=str)
+    elif isinstance(data, dict):
+        if "errors" in data:
+            return raw
+        body = json.dumps(project_record(data, fields), separators=(",", ":"), default=str)
+    else:
+        return raw
+
+    ref = raw_results.put(identity, tool_name, arguments, raw)
+    projected = f'{body}\n[Fields trimmed. Full data: get_full_canvas_record(ref="{ref}", record_id=<id>)]'
+
+    stats = projection_stats.setdefault(tool_name, {"calls": 0, "raw_chars": 0, "projected_chars": 0,
+                                                     "sampled_calls": 0, "sampled_raw_chars": 0,
+                                                     "sampled_projected_chars": 0, "sampled_raw_tokens": 0,
+                                                     "sampled_projected_tokens": 0})
+    stats["calls"] += 1
+    stats["raw_chars"] += len(raw)
+    stats["projected_chars"] += len(projected)
+    # Tokenizing costs CPU in proportion to the payload, so only a sample is counted
+    if (stats["calls"] - 1) % PROJECTION_TOKEN_SAMPLE == 0:
+        stats["sampled_calls"] += 1
+        stats["sampled_raw_chars"] += len(raw)
+        stats["sampled_projected_chars"] += len(projected)
+        stats["sampled_raw_tokens"] += count_text_tokens(raw)
+        stats["sampled_projected_tokens"] += count_text_tokens(projected)
+    return projected
+
+
+def full_record(ref: str, record_id: Any = None, identity: str = "") -> str:
+    """Raw JSON behind a projection, or one record of it by id."""
+    raw = raw_results.get(identity, ref)
+    if raw is None:
+        return f"Error: no stored result for ref {ref} (it expired); call the original tool again."
+    if record_id is None:
+        return raw
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, ValueError):
+        return raw
+    records = data if isinstance(data, list) else [data]
+    for record in records:
+        if isinstance(record, dict) and str(record.get("id", record.get("page_id"))) == str(record_id):
+            return json.dumps(record, indent=2)
+    return f"Error: record {record_id} not found in ref {ref}."
+
+
+def get_projection_stats() -> Dict[str, Any]:
+    """Per-tool projected vs. raw size in characters and LLM tokens (for /api/metrics).
+
+    Tokens are counted on a sample of the calls (PROJECTION_TOKEN_SAMPLE) with
+    tiktoken when the encoding loads, otherwise estimated at 4 characters per
+    token (see src/token_counting.py), and scaled to all calls by the sampled
+    tokens per character.
+    """
+    result = {}
+    for tool, stats in projection_stats.items():
+        raw_tokens = round(stats["raw_chars"] * stats["sampled_raw_tokens"] / max(1, stats["sampled_raw_chars"]))
+        projected_tokens = round(stats["projected_chars"] * stats["sampled_projected_tokens"]
+                                 / max(1, stats["sampled_projected_chars"]))
+        result[tool] = {"calls": stats["calls"], "raw_chars": stats["raw_chars"],
+                        "projected_chars": stats["projected_chars"], "token_sampled_calls": stats["sampled_calls"],
+                        "raw_tokens": raw_tokens, "projected_tokens": projected_tokens,
+                        "token_ratio": round(projected_tokens / raw_tokens, 3) if raw_tokens else None,
+                        "tokens_saved": raw_tokens - projected_tokens}
+    return result
@@ -0,0 +1,97 @@
+"""
+Single-flight coalescing of identical concurrent Canvas reads.
+
+While a call for a key is in flight, further callers with the same key
+await the same upstream task instead of issuing their own request:
+- The result (or exception) of the shared call is delivered to every waiter
+- A waiter being cancelled only detaches that waiter; the shared call is
+  cancelled once no waiters are left
+- The key is released as soon as the call finishes, so later callers always
+  trigger a fresh request (caching is the tool cache's job, not this one)
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    """One in-flight upstream call and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key."""
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = {
+            "calls": 0,
+            "upstream": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "cancelled": 0,
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` for `key`, or join the identical call already in flight.
+
+        Args:
+            key: Hashable identity of the request (include the user!)
+            fn: Zero-argument coroutine factory performing the real call
+
+        Returns:
+            The shared result; exceptions raised by `fn` propagate to every waiter.
+        """
+        self._stats["calls"] += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self._stats["upstream"] += 1
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, key=key, flight=flight: self._finish(key, flight, task))
+        else:
+            self._stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Last interested caller left: stop the upstream call too
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: Hashable, flight: _Flight, task: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if task.cancelled():
+            self._stats["cancelled"] += 1
+        elif task.exception() is not None:
+            self._stats["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._flights)}
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for a request; secrets (tokens) should be passed already hashed."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def token_fingerprint(token: str) -> str:
+    """Short non-reversible id for a bearer token, used to partition keys per user."""
+    return hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+
+# Coalescing groups for agent tool calls and for the API tier's GET requests
+tool_flights = SingleFlight("tools")
+http_flights = SingleFlight("http")
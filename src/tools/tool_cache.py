@@ -0,0 +1,314 @@
+"""
+Response cache for read-only Canvas tools.
+
+Results of canvas_* read tools are cached per Canvas user, keyed by
+(user, tool name, normalized arguments):
+- Each tool has its own TTL (TOOL_TTLS); tools not listed are never cached
+- The cache is bounded (LRU eviction once TOOL_CACHE_MAX_ENTRIES is reached)
+- Stale-while-revalidate: for TOOL_CACHE_STALE_TTL seconds after expiry the
+  old value is served immediately while one background refresh runs
+- Write tools invalidate the read tools they affect (WRITE_INVALIDATES),
+  scoped to the written course when the arguments carry a course_id
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Set
+
+from src.tools.canvas_http import get_canvas_base_url
+
+
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+TOOL_CACHE_STALE_TTL = float(os.getenv("TOOL_CACHE_STALE_TTL", "300"))
+# Multiplies every per-tool TTL (0 disables caching without turning off invalidation)
+TOOL_CACHE_TTL_SCALE = float(os.getenv("TOOL_CACHE_TTL_SCALE", "1"))
+
+# Fresh lifetime (seconds) of each cacheable read tool
+TOOL_TTLS = {
+    "canvas_list_courses": 300,
+    "canvas_get_course": 300,
+    "canvas_get_syllabus": 600,
+    "canvas_list_assignments": 120,
+    "canvas_get_assignment": 120,
+    "canvas_list_assignment_groups": 300,
+    "canvas_get_upcoming_assignments": 60,
+    "canvas_list_announcements": 60,
+    "canvas_get_submission": 30,
+    "canvas_list_discussion_topics": 60,
+    "canvas_get_discussion_topic": 60,
+    "canvas_list_quizzes": 300,
+    "canvas_get_quiz": 300,
+    "canvas_list_modules": 300,
+    "canvas_get_module": 300,
+    "canvas_list_module_items": 300,
+    "canvas_get_module_item": 300,
+    "canvas_list_files": 300,
+    "canvas_get_file": 300,
+    "canvas_list_folders": 300,
+    "canvas_list_pages": 300,
+    "canvas_get_page": 300,
+    "canvas_get_user_profile": 600,
+    "canvas_get_course_grades": 60,
+    "canvas_get_user_grades": 60,
+    "canvas_list_calendar_events": 120,
+    "canvas_get_dashboard": 120,
+    "canvas_get_dashboard_cards": 120,
+    "canvas_list_rubrics": 600,
+    "canvas_get_rubric": 600,
+}
+
+# Read tools whose cached results a successful write makes stale
+WRITE_INVALIDATES = {
+    "canvas_create_course": {"canvas_list_courses", "canvas_get_dashboard", "canvas_get_dashboard_cards"},
+    "canvas_update_course": {"canvas_list_courses", "canvas_get_course", "canvas_get_syllabus",
+                             "canvas_get_dashboard", "canvas_get_dashboard_cards"},
+    "canvas_create_assignment": {"canvas_list_assignments", "canvas_list_assignment_groups",
+                                 "canvas_get_upcoming_assignments", "canvas_list_calendar_events"},
+    "canvas_update_assignment": {"canvas_list_assignments", "canvas_get_assignment",
+                                 "canvas_get_upcoming_assignments", "canvas_list_calendar_events"},
+    "canvas_submit_assignment": {"canvas_get_submission", "canvas_list_assignments", "canvas_get_assignment",
+                                 "canvas_get_upcoming_assignments"},
+    "canvas_submit_grade": {"canvas_get_submission", "canvas_get_course_grades", "canvas_get_user_grades"},
+    "canvas_create_announcement": {"canvas_list_announcements", "canvas_list_discussion_topics"},
+    "canvas_post_to_discussion": {"canvas_list_discussion_topics", "canvas_get_discussion_topic"},
+    "canvas_create_quiz": {"canvas_list_quizzes", "canvas_get_quiz"},
+    "canvas_create_quiz_question": {"canvas_get_quiz"},
+    "canvas_start_quiz_attempt": {"canvas_get_quiz"},
+    "canvas_mark_module_item_complete": {"canvas_list_modules", "canvas_get_module",
+                                         "canvas_list_module_items", "canvas_get_module_item"},
+    "canvas_enroll_user": {"canvas_get_course"},
+    "canvas_update_user_profile": {"canvas_get_user_profile"},
+}
+
+# Prefixes of tools that change Canvas state; unknown ones drop the user's whole cache
+WRITE_PREFIXES = ("canvas_create_", "canvas_update_", "canvas_submit_", "canvas_post_",
+                  "canvas_mark_", "canvas_enroll_", "canvas_start_", "canvas_delete_")
+
+
+def normalize_args(arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Canonical form of tool arguments: drop None values, coerce numeric *_id strings."""
+    normalized = {}
+    for key, value in (arguments or {}).items():
+        if value is None:
+            continue
+        if key.endswith("_id") and isinstance(value, str) and value.isdigit():
+            value = int(value)
+        normalized[key] = value
+    return normalized
+
+
+def cache_identity() -> str:
+    """Opaque id of the Canvas user whose credentials the tools run with."""
+    raw = f"{get_canvas_base_url()}|{os.getenv('CANVAS_API_TOKEN', '')}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def is_write_tool(tool_name: str) -> bool:
+    return tool_name in WRITE_INVALIDATES or tool_name.startswith(WRITE_PREFIXES)
+
+
+class CacheEntry(NamedTuple):
+    value: str
+    stored_at: float
+    ttl: float
+    identity: str
+    tool_name: str
+    course_id: Optional[int]
+
+
+class ToolResponseCache:
+    """Per-user LRU cache of read-tool results with stale-while-revalidate."""
+
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES, stale_ttl: float = TOOL_CACHE_STALE_TTL,
+                 ttls: Dict[str, float] = None, enabled: bool = TOOL_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.ttls = {name: ttl * TOOL_CACHE_TTL_SCALE for name, ttl in (ttls or TOOL_TTLS).items()}
+        self.enabled = enabled
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        # Bumped on invalidation so in-flight refreshes don't store pre-write data
+        self._generations: Dict[str, int] = {}
+        self._refreshing: Dict[tuple, asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    def _key(self, identity: str, tool_name: str, arguments: Dict[str, Any]) -> tuple:
+        return identity, tool_name, json.dumps(arguments, sort_keys=True, default=str)
+
+    def _store(self, key: tuple, value: str, tool_name: str, arguments: Dict[str, Any], generation: int) -> None:
+        identity = key[0]
+        if self._generations.get(identity, 0) != generation:
+            return  # a write happened while this value was being fetched
+        self._entries[key] = CacheEntry(
+            value=value,
+            stored_at=time.monotonic(),
+            ttl=self.ttls[tool_name],
+            identity=identity,
+            tool_name=tool_name,
+            course_id=arguments.get("course_id")
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def call(
+        self,
+        tool_name: str,
+        arguments: Optional[Dict[str, Any]],
+        fetch: Callable[[], Awaitable[str]],
+        identity: str = None
+    ) -> str:
+        """Return the tool result through the cache.
+
+        Args:
+            tool_name: Canvas tool name (e.g. "canvas_list_courses")
+            arguments: Tool arguments
+            fetch: Zero-argument coroutine factory performing the real call;
+                exceptions propagate and are never cached
+            identity: Cache partition (defaults to the configured Canvas user)
+
+        Returns:
+            The cached or freshly fetched tool result text.
+        """
+        if not self.enabled:
+            return await fetch()
+
+        identity = identity or cache_identity()
+        arguments = normalize_args(arguments)
+
+        if is_write_tool(tool_name):
+            result = await fetch()
+            self.invalidate_for_write(tool_name, arguments, identity)
+            return result
+
+        if not self.ttls.get(tool_name):
+            return await fetch()
+
+        key = self._key(identity, tool_name, arguments)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            age = now - entry.stored_at
+            if age < entry.ttl:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < entry.ttl + self.stale_ttl:
+                self._stats["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                self._refresh(key, tool_name, arguments, fetch)
+                return entry.value
+            del self._entries[key]
+
+        self._stats["misses"] += 1
+        generation = self._generations.get(identity, 0)
+        value = await fetch()
+        if _cacheable(value):
+            self._store(key, value, tool_name, arguments, generation)
+        return value
+
+    def _refresh(self, key: tuple, tool_name: str, arguments: Dict[str, Any],
+                 fetch: Callable[[], Awaitable[str]]) -> None:
+        """Start one background refresh for a stale key (no-op if already running)."""
+        if key in self._refreshing:
+            return
+        generation = self._generations.get(key[0], 0)
+
+        async def refresh():
+            try:
+                value = await fetch()
+                if _cacheable(value):
+                    self._store(key, value, tool_name, arguments, generation)
+                self._stats["refreshes"] += 1
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                print(f"[CACHE] Background refresh of {tool_name} failed: {e}", file=sys.stderr)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def invalidate_for_write(self, tool_name: str, arguments: Dict[str, Any], identity: str = None) -> int:
+        """Drop the cached reads a write tool may have changed.
+
+        Known writes drop their dependent tools, limited to the written course
+        when a course_id is given; unknown writes drop the user's whole cache.
+        """
+        identity = identity or cache_identity()
+        targets = WRITE_INVALIDATES.get(tool_name)
+        course_id = normalize_args(arguments).get("course_id")
+
+        def affected(entry: CacheEntry) -> bool:
+            if entry.identity != identity:
+                return False
+            if targets is None:
+                return True
+            if entry.tool_name not in targets:
+                return False
+            # Course-scoped writes leave other courses' entries alone
+            return course_id is None or entry.course_id is None or entry.course_id == course_id
+
+        return self._invalidate(identity, affected)
+
+    def invalidate(self, identity: str = None, tool_name: str = None) -> int:
+        """Drop entries for a user (default: the configured one), optionally for one tool."""
+        identity = identity or cache_identity()
+        return self._invalidate(
+            identity, lambda e: e.identity == identity and (tool_name is None or e.tool_name == tool_name)
+        )
+
+    def _invalidate(self, identity: str, predicate: Callable[[CacheEntry], bool]) -> int:
+        self._generations[identity] = self._generations.get(identity, 0) + 1
+        stale_keys = [key for key, entry in self._entries.items() if predicate(entry)]
+        for key in stale_keys:
+            del self._entries[key]
+        self._stats["invalidations"] += len(stale_keys)
+        return len(stale_keys)
+
+    def clear(self) -> None:
+        for identity in list(self._generations):
+            self._generations[identity] += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "refreshing": len(self._refreshing),
+            "hit_ratio": round((self._stats["hits"] + self._stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        }
+
+    async def close(self) -> None:
+        """Cancel background refreshes (called from the FastAPI lifespan)."""
+        tasks: Set[asyncio.Task] = set(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
+
+
+def _cacheable(value: Any) -> bool:
+    """Only cache real payloads, not error text surfaced by a transport."""
+    return isinstance(value, str) and not value.lstrip().lower().startswith(("error", "canvas api error"))
+
+
+# Global cache used by run_mcp_tool
+tool_cache = ToolResponseCache()